@@ -0,0 +1,188 @@
+"""
+Analytics Store
+Columnar, pre-indexed storage for the daily analytics history.
+"""
+
+import numpy as np
+
+
+class AnalyticsStore:
+    """Analytics rows held as NumPy columns sorted by (platform, date).
+
+    Platforms are stored as categorical integer codes. ``offsets[code]`` and
+    ``offsets[code + 1]`` delimit the rows of one platform, so any per-platform
+    or date-window lookup is a slice rather than a scan.
+    """
+
+    COLUMNS = {
+        'followers': np.int64,
+        'engagement': np.float64,
+        'reach': np.int64,
+        'posts': np.int32,
+    }
+
+    def __init__(self, platforms=()):
+        self.platforms = []
+        self._codes = {}
+        self.codes = np.empty(0, dtype=np.int32)
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.int64)
+        for platform in platforms:
+            self.code_for(platform)
+
+    @classmethod
+    def from_columns(cls, platforms, codes, dates, columns):
+        """Adopt columns already sorted by (code, date) without copying them.
+
+        Read-only or memory-mapped arrays are fine: appends build new arrays
+        rather than writing into the adopted ones.
+        """
+        store = cls(platforms)
+        store.codes = codes
+        store.dates = dates
+        store.columns = {name: columns[name] for name in cls.COLUMNS}
+        store._keys = None
+        store._reindex()
+        return store
+
+    def __len__(self):
+        return len(self.codes)
+
+    def copy(self):
+        """A copy to append to without changing this store.
+
+        Cheap: the column arrays are shared, since appends build new arrays
+        rather than writing into the old ones.
+        """
+        store = AnalyticsStore.__new__(AnalyticsStore)
+        store.platforms = list(self.platforms)
+        store._codes = dict(self._codes)
+        store.codes = self.codes
+        store.dates = self.dates
+        store.columns = dict(self.columns)
+        store.offsets = self.offsets
+        store._keys = self._keys
+        return store
+
+    def code_for(self, platform):
+        """Return the categorical code for a platform, registering it if new."""
+        code = self._codes.get(platform)
+        if code is None:
+            code = len(self.platforms)
+            self.platforms.append(platform)
+            self._codes[platform] = code
+            self.offsets = np.append(self.offsets, self.offsets[-1])
+        return code
+
+    @staticmethod
+    def _sort_keys(codes, dates):
+        return (codes.astype(np.int64) << 32) | (dates.astype(np.int64) & 0xFFFFFFFF)
+
+    def append(self, rows):
+        """Append analytics rows given as dicts with ``date`` and ``platform`` keys.
+
+        Returns the appended batch as sorted ``(codes, dates, columns)`` arrays.
+        """
+        rows = list(rows)
+        if not rows:
+            return self._empty_batch()
+        codes = np.fromiter((self.code_for(r['platform']) for r in rows), dtype=np.int32, count=len(rows))
+        dates = np.array([r['date'] for r in rows], dtype='datetime64[D]')
+        columns = {name: np.fromiter((r[name] for r in rows), dtype=dtype, count=len(rows))
+                   for name, dtype in self.COLUMNS.items()}
+        return self.append_columns(codes, dates, columns)
+
+    def _empty_batch(self):
+        return (np.empty(0, dtype=np.int32), np.empty(0, dtype='datetime64[D]'),
+                {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()})
+
+    def append_columns(self, codes, dates, columns):
+        """Merge already-columnar rows into the store, keeping the sort order.
+
+        The new rows are sorted on their own and then inserted with a single
+        ``searchsorted``, so an append costs O(N + m log N) rather than a full
+        re-sort of the history. Returns the batch in its sorted order.
+        """
+        codes = np.asarray(codes, dtype=np.int32)
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        if not len(codes):
+            return self._empty_batch()
+        keys = self._sort_keys(codes, dates)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        codes = codes[order]
+        dates = dates[order]
+        columns = {name: np.asarray(columns[name], dtype=dtype)[order] for name, dtype in self.COLUMNS.items()}
+
+        if self._keys is None:
+            self._keys = self._sort_keys(self.codes, self.dates)
+        if len(self._keys) and keys[0] < self._keys[-1]:
+            positions = np.searchsorted(self._keys, keys, side='right')
+            merge = lambda old, new: np.insert(old, positions, new)
+        else:
+            merge = lambda old, new: np.concatenate([old, new])
+
+        self._keys = merge(self._keys, keys)
+        self.codes = merge(self.codes, codes)
+        self.dates = merge(self.dates, dates)
+        for name in self.COLUMNS:
+            self.columns[name] = merge(self.columns[name], columns[name])
+        self._reindex()
+        return codes, dates, columns
+
+    def _reindex(self):
+        self.offsets = np.searchsorted(self.codes, np.arange(len(self.platforms) + 1), side='left').astype(np.int64)
+
+    def platform_slice(self, platform):
+        """Return the slice holding every row of ``platform``."""
+        code = self._codes.get(platform)
+        if code is None:
+            return slice(0, 0)
+        return slice(int(self.offsets[code]), int(self.offsets[code + 1]))
+
+    def tail(self, platform, n):
+        """Return the slice of the latest ``n`` rows of ``platform``."""
+        rows = self.platform_slice(platform)
+        return slice(max(rows.start, rows.stop - n), rows.stop)
+
+    def window(self, platform, start, end):
+        """Return the slice of ``platform`` rows dated within ``[start, end]``."""
+        rows = self.platform_slice(platform)
+        dates = self.dates[rows]
+        lo = np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        hi = np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+        return slice(rows.start + int(lo), rows.start + int(hi))
+
+    def rows_between(self, start, end):
+        """Return the row indices of every platform dated within ``[start, end]``.
+
+        One ``searchsorted`` over the (code, date) keys finds each platform's
+        window, so the cost is independent of how much history lies outside it.
+        """
+        if self._keys is None:
+            self._keys = self._sort_keys(self.codes, self.dates)
+        codes = np.arange(len(self.platforms), dtype=np.int32)
+        lo = np.searchsorted(self._keys, self._sort_keys(codes, np.full(len(codes), start, dtype='datetime64[D]')),
+                             side='left')
+        hi = np.searchsorted(self._keys, self._sort_keys(codes, np.full(len(codes), end, dtype='datetime64[D]')),
+                             side='right')
+        counts = hi - lo
+        firsts = np.cumsum(counts) - counts
+        return np.repeat(lo - firsts, counts) + np.arange(counts.sum())
+
+    def last_date(self):
+        """Return the most recent date in the store, or None if it is empty."""
+        return self.dates.max() if len(self.dates) else None
+
+    def records(self):
+        """Yield rows in the legacy list-of-dicts shape."""
+        for i in range(len(self)):
+            record = {
+                'date': str(self.dates[i]),
+                'platform': self.platforms[self.codes[i]],
+            }
+            for name in self.COLUMNS:
+                record[name] = self.columns[name][i].item()
+            yield record
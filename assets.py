@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Assets
+Content-hashed, precompressed static files for the dashboard page.
+
+The page in ``static/`` has no server-side variables, so it is built once:
+every file it links to under ``/assets/`` is renamed after a hash of its
+content (and can be cached forever), and each file gets gzip and, with
+``brotli`` installed, brotli variants. The app serves the bundle from
+memory; ``python assets.py build`` writes it out for a reverse proxy.
+
+Chart.js is never loaded from its CDN: vendor it once, checking the digest
+of the release you trust, and commit it or copy it in with the sources. A
+page linking to a file that is missing fails to build.
+
+    python assets.py vendor --sha256 <hex>    # fetch Chart.js into static/vendor
+    python assets.py check                    # fail unless every linked file exists
+    python assets.py build --output static/dist
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import urllib.request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only with brotli
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+PAGE = 'index.html'
+HASH_LENGTH = 12
+CHART_JS = 'vendor/chart.umd.js'
+CHART_JS_URL = 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js'
+LINK = re.compile(r'(?P<attr>src|href)="/assets/(?P<path>[^"]+)"')
+
+
+def compress(body):
+    """Compressed variants of ``body`` by content coding, where they are smaller."""
+    variants = {'gzip': gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+class Asset:
+    """One file of the bundle: its body, served name, ETag and compressed variants."""
+
+    def __init__(self, path, body, hashed=True):
+        self.path = path
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        root, ext = os.path.splitext(path)
+        self.name = f"{root}.{self.etag}{ext}" if hashed else path
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.encodings = compress(body)
+
+
+class AssetBundle:
+    """The page and every file in ``source``, built once."""
+
+    def __init__(self, source=None):
+        source = source or STATIC_DIR
+        self.assets = {}
+        paths = {}
+        for directory, dirnames, filenames in os.walk(source):
+            dirnames[:] = [name for name in dirnames if name != 'dist']
+            for filename in filenames:
+                path = os.path.relpath(os.path.join(directory, filename), source).replace(os.sep, '/')
+                if path == PAGE or filename.startswith('.'):
+                    continue
+                with open(os.path.join(directory, filename), 'rb') as f:
+                    asset = Asset(path, f.read())
+                self.assets[asset.name] = asset
+                paths[path] = asset.name
+        with open(os.path.join(source, PAGE), encoding='utf-8') as f:
+            page = f.read()
+        self.page = Asset(PAGE, self._link(page, paths).encode(), hashed=False)
+
+    @staticmethod
+    def _link(page, paths):
+        def replace(match):
+            path = match['path']
+            if path in paths:
+                return f'{match["attr"]}="/assets/{paths[path]}"'
+            if path == CHART_JS:
+                raise ValueError(f"{PAGE} links to {path}, which is not vendored; run 'python assets.py vendor'")
+            raise ValueError(f"{PAGE} links to missing asset: {path}")
+        return LINK.sub(replace, page)
+
+    def get(self, name):
+        """The asset served as ``/assets/<name>``, or None."""
+        return self.assets.get(name)
+
+    def write(self, directory):
+        """Write the page, hashed assets, their variants and a manifest to ``directory``."""
+        suffixes = {'gzip': '.gz', 'br': '.br'}
+        manifest = {}
+        for asset in [self.page, *self.assets.values()]:
+            target = os.path.join(directory, PAGE if asset is self.page else os.path.join('assets', asset.name))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            for suffix, body in [('', asset.body)] + [(suffixes[e], data) for e, data in asset.encodings.items()]:
+                with open(target + suffix, 'wb') as f:
+                    f.write(body)
+            manifest[asset.path] = asset.name
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        return manifest
+
+
+def vendor(sha256, source=None):
+    """Download the pinned Chart.js bundle into ``source``.
+
+    Raises ValueError, writing nothing, unless its sha256 is ``sha256``.
+    """
+    with urllib.request.urlopen(CHART_JS_URL, timeout=30) as response:
+        body = response.read()
+    digest = hashlib.sha256(body).hexdigest()
+    if digest != sha256.lower():
+        raise ValueError(f"{CHART_JS_URL} has sha256 {digest}, expected {sha256}")
+    target = os.path.join(source or STATIC_DIR, CHART_JS)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='write the bundle for a reverse proxy')
+    build.add_argument('--output', default=os.path.join(STATIC_DIR, 'dist'))
+    fetch = commands.add_parser('vendor', help=f'download {CHART_JS_URL}')
+    fetch.add_argument('--sha256', required=True, help='digest the download must have')
+    commands.add_parser('check', help='fail unless every file the page links to exists')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'vendor':
+            vendor(args.sha256)
+            print(f"{CHART_JS}: sha256 {args.sha256}")
+        elif args.command == 'check':
+            print(f"{len(AssetBundle().assets)} assets, {PAGE} links resolve")
+        else:
+            for path, name in sorted(AssetBundle().write(args.output).items()):
+                print(f"{path} -> {name}")
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Endpoint Benchmarks
+pytest-benchmark suite for SocialMediaData and the /api views at several data sizes.
+
+    python -m pytest benchmarks/bench_endpoints.py --benchmark-json=results.json
+    python -m pytest benchmarks/bench_endpoints.py --benchmark-compare
+
+The ``uncached`` cases call the view body directly, bypassing the response
+cache, so they measure the full compute and serialization cost.
+"""
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from benchmarks.datasets import SIZES, build_columns, build_data, use_data
+from analytics_store import AnalyticsStore
+from rollups import RollupEngine
+from trends import compute_trends
+
+IDS = [f'{days}d-{accounts}acct' for days, accounts in SIZES]
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=IDS)
+def data(request):
+    original = dashboard.social_data
+    data = build_data(*request.param)
+    use_data(data)
+    yield data
+    use_data(original)
+
+
+def call_view(view, path):
+    with dashboard.app.test_request_context(path):
+        return view()
+
+
+def test_construction_mock_pipeline(benchmark):
+    """SocialMediaData() generating its mock dataset with synthetic.generate."""
+    benchmark(dashboard.SocialMediaData)
+
+
+@pytest.mark.parametrize('size', SIZES, ids=IDS)
+def test_construction_from_columns(benchmark, size):
+    """Adopting a columnar history and building its rollups."""
+    names, codes, dates, columns = build_columns(*size)
+    benchmark.pedantic(lambda: RollupEngine(AnalyticsStore.from_columns(names, codes, dates, columns)),
+                       rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize('size', SIZES, ids=IDS)
+def test_compute_trends(benchmark, size):
+    """Growth, rolling means and z-scores for every account in one pass."""
+    names, codes, dates, columns = build_columns(*size)
+    store = AnalyticsStore.from_columns(names, codes, dates, columns)
+    benchmark(compute_trends, store, store.last_date())
+
+
+@pytest.mark.parametrize('path', [
+    '/api/analytics',
+    '/api/analytics?granularity=week&range=12w',
+    '/api/analytics?granularity=month&range=1y',
+    '/api/analytics?range=5y&max_points=200',
+])
+def test_get_analytics_uncached(benchmark, data, path):
+    benchmark(call_view, dashboard.get_analytics.__wrapped__, path)
+
+
+def test_get_stats_uncached(benchmark, data):
+    benchmark(call_view, dashboard.get_stats.__wrapped__, '/api/stats')
+
+
+def test_get_posts_uncached(benchmark, data):
+    benchmark(call_view, dashboard.get_posts.__wrapped__, '/api/posts')
+
+
+@pytest.mark.parametrize('path', [
+    '/api/posts/search?q=%23launch',
+    '/api/posts/search?q=sample+%23tips&platform=Instagram',
+    '/api/posts/search?q=sample&since=2000-01-01',
+])
+def test_search_posts_uncached(benchmark, data, path):
+    call_view(dashboard.search_posts.__wrapped__, path)  # build the index outside the timing
+    benchmark(call_view, dashboard.search_posts.__wrapped__, path)
+
+
+@pytest.mark.parametrize('path', ['/api/audience?range=30', '/api/audience?granularity=month&range=1y'])
+def test_get_audience_uncached(benchmark, data, path):
+    benchmark(call_view, dashboard.get_audience.__wrapped__, path)
+
+
+def test_get_dashboard_uncached(benchmark, data):
+    """The combined first-paint payload, parts computed on the thread pool."""
+    benchmark(call_view, dashboard.get_dashboard.__wrapped__, '/api/dashboard')
+
+
+@pytest.mark.parametrize('path', ['/api/stats', '/api/analytics', '/api/posts'])
+def test_cached(benchmark, data, path):
+    """Full request through the test client with a warm response cache."""
+    client = dashboard.app.test_client()
+    client.get(path)
+    benchmark(client.get, path)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Post Memory Benchmark
+Bytes per post for the legacy dict representation versus Post records.
+
+    python benchmarks/bench_post_memory.py --posts 200000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from posts_index import Post, PostIndex
+
+PLATFORMS = ['Facebook', 'Instagram', 'Twitter', 'LinkedIn', 'TikTok']
+
+
+def legacy_posts(n, seed=0):
+    """Posts in the original list-of-dicts shape with ISO string timestamps."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    posts = []
+    for i in range(n):
+        platform = rng.choice(PLATFORMS)
+        posts.append({
+            'id': i + 1,
+            'platform': platform,
+            'content': f"Sample post content for {platform} #{i+1}",
+            'timestamp': (now - timedelta(seconds=rng.randint(1, 10 ** 7))).isoformat(),
+            'likes': rng.randint(10, 500),
+            'comments': rng.randint(2, 50),
+            'shares': rng.randint(1, 25),
+            'engagement_rate': rng.uniform(2, 8)
+        })
+    return posts
+
+
+def measure(build):
+    """Return ``(result, bytes allocated by build())``."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def run(n):
+    # Only what each representation keeps alive is counted; the temporary
+    # dicts behind the records are freed before measuring.
+    _, dict_bytes = measure(lambda: legacy_posts(n))
+    records, record_bytes = measure(lambda: [Post.from_dict(post) for post in legacy_posts(n)])
+    _, content_bytes = measure(lambda: [post['content'] for post in legacy_posts(n)])
+    _, index_bytes = measure(lambda: PostIndex(records))
+    return {
+        'posts': n,
+        'dict_bytes_per_post': dict_bytes / n,
+        'record_bytes_per_post': record_bytes / n,
+        'content_bytes_per_post': content_bytes / n,
+        'index_bytes_per_post': index_bytes / n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    result = run(args.posts)
+    if args.json:
+        print(json.dumps(result))
+        return
+    content = result['content_bytes_per_post']
+    print(f"{args.posts} posts")
+    print(f"{'representation':<16}{'bytes/post':>12}{'excluding content':>20}")
+    for label, key in [('dict', 'dict_bytes_per_post'), ('Post record', 'record_bytes_per_post')]:
+        print(f"{label:<16}{result[key]:>12.0f}{result[key] - content:>20.0f}")
+    print(f"{'index overhead':<16}{result['index_bytes_per_post']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Scheduler Benchmark
+Measures scheduling throughput and dispatch lag of the post scheduler.
+
+Posts are published through the local stub adapter into a mock dataset, so
+the numbers cover the timer queue, the worker pool and the post index.
+``--existing`` first loads that many generated posts, so every publish
+copies an index of that size.
+
+    python benchmarks/bench_scheduler.py --posts 100000 --spread 5 --workers 4
+    python benchmarks/bench_scheduler.py --posts 10000 --existing 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadgen import percentile
+from dashboard import SocialMediaData, publisher_for
+from scheduler import PUBLISHED, Scheduler
+import synthetic
+
+
+def dataset(existing):
+    """A dataset holding ``existing`` generated posts with its search index built (mock data when 0)."""
+    data = SocialMediaData()
+    if existing:
+        generated = synthetic.generate(data.platforms, 30, existing, seed=0)
+        data.replace(generated['accounts'], generated['analytics'], generated['posts'])
+    data.posts.search_index
+    return data
+
+
+def bench_enqueue(data, posts):
+    """Scheduling rate, one call per post and in one batch, far in the future."""
+    due = time.time() + 3600
+    single = Scheduler(data, publisher_for)
+    start = time.perf_counter()
+    for i in range(posts):
+        single.schedule('Twitter', 'post', due + i % 1000)
+    one_by_one = posts / (time.perf_counter() - start)
+
+    batch = Scheduler(data, publisher_for)
+    start = time.perf_counter()
+    batch.schedule_many(('Twitter', 'post', due + i % 1000) for i in range(posts))
+    batched = posts / (time.perf_counter() - start)
+    return {'schedule_per_s': one_by_one, 'schedule_many_per_s': batched}
+
+
+def bench_dispatch(data, posts, spread, workers):
+    """Dispatch lag of ``posts`` posts falling due evenly over ``spread`` seconds."""
+    scheduler = Scheduler(data, publisher_for, workers=workers).start()
+    first = time.time() + 0.5
+    platforms = data.platforms
+    jobs = scheduler.schedule_many((platforms[i % len(platforms)], f'post {i}', first + spread * i / posts)
+                                   for i in range(posts))
+    while len(scheduler):
+        time.sleep(0.05)
+    finished = time.time()
+    scheduler.stop()
+
+    # Dispatch lag is due -> handed to a worker; publish lag is due -> in the post index
+    lags = sorted((job.dispatched - job.due) * 1000 for job in jobs)
+    publish_lags = sorted((job.finished - job.due) * 1000 for job in jobs)
+    return {
+        'posts': posts,
+        'published': sum(job.status == PUBLISHED for job in jobs),
+        'publish_per_s': posts / (finished - first),
+        'lag_p50_ms': percentile(lags, 50),
+        'lag_p99_ms': percentile(lags, 99),
+        'lag_max_ms': lags[-1],
+        'jitter_ms': statistics.pstdev(lags),
+        'publish_lag_p50_ms': percentile(publish_lags, 50),
+        'publish_lag_p99_ms': percentile(publish_lags, 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--spread', type=float, default=5.0, help='seconds over which the posts fall due')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--existing', type=int, default=0, help='posts already in the index')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = {
+        'enqueue': bench_enqueue(SocialMediaData(), args.posts),
+        'dispatch': bench_dispatch(dataset(args.existing), args.posts, args.spread, args.workers),
+    }
+    for section, values in results.items():
+        for name, value in values.items():
+            print(f"{section + '.' + name:<32}{value:>14,.2f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Serialization Benchmark
+Latency and throughput of encoding the /api/analytics payload.
+
+Compares the previous path (``.tolist()`` then the stdlib encoder, as
+``jsonify`` did) with ``serialization.dumps`` on NumPy arrays, for 7, 90
+and 365 days across several platform counts.
+
+    python benchmarks/bench_serialization.py --platforms 5 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from rollups import SERIES
+
+
+def analytics_payload(days, platforms, seed=0):
+    """A payload shaped like /api/analytics with ``days`` buckets per series."""
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('2024-01-01') + np.arange(days)
+    return {
+        'granularity': 'day',
+        'dates': [d.item().strftime('%m/%d') for d in dates],
+        'platforms': [dict({
+            'name': f'Platform {i}',
+            'color': '#1877F2',
+            'followers': 10000 + i,
+        }, **{name: rng.uniform(0, 30000, days) for name in SERIES}) for i in range(platforms)],
+    }
+
+
+def legacy_dumps(payload):
+    """What the endpoint did before: convert to lists, then stdlib json."""
+    converted = dict(payload, platforms=[
+        {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in platform.items()}
+        for platform in payload['platforms']
+    ])
+    return json.dumps(converted).encode()
+
+
+def stdlib_dumps(payload):
+    return serialization._stdlib_dumps(payload)
+
+
+def bench(encode, payload, repeat):
+    size = len(encode(payload))
+    timer = timeit.Timer(lambda: encode(payload))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number)) / number
+    return {'latency_us': best * 1e6, 'bytes': size, 'mb_per_sec': size / best / 1e6}
+
+
+def run(days_list, platform_counts, repeat=5):
+    encoders = {'tolist+json': legacy_dumps, 'stdlib fallback': stdlib_dumps}
+    if serialization.orjson is not None:
+        encoders['orjson'] = serialization.dumps
+    results = []
+    for platforms in platform_counts:
+        for days in days_list:
+            payload = analytics_payload(days, platforms)
+            for name, encode in encoders.items():
+                results.append(dict(bench(encode, payload, repeat), encoder=name, days=days, platforms=platforms))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 90, 365])
+    parser.add_argument('--platforms', type=int, nargs='+', default=[5, 50])
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    results = run(args.days, args.platforms)
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"{'platforms':>9}{'days':>6}  {'encoder':<16}{'latency (us)':>14}{'bytes':>11}{'MB/s':>9}")
+    for r in results:
+        print(f"{r['platforms']:>9}{r['days']:>6}  {r['encoder']:<16}{r['latency_us']:>14.1f}{r['bytes']:>11}{r['mb_per_sec']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
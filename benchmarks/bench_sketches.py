@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Sketch Benchmark
+Window queries over per (account, day) sketches against exact answers from raw events.
+
+For ``--accounts`` accounts that each reach ``--reach`` users and get
+``--posts`` posts a day, times the distinct audience and engagement
+percentiles of whole windows computed exactly (a pass over every event)
+and by merging the daily sketches, and reports the sketch error.
+
+    python benchmarks/bench_sketches.py --days 30 365 --accounts 20 --reach 5000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sketches import QUANTILES, SketchStore
+
+START = np.datetime64('2024-01-01', 'D')
+
+
+def build(days, accounts, reach, posts, seed=0):
+    """Raw audience ids and engagement values per (account, day), and their sketches."""
+    rng = np.random.default_rng(seed)
+    store = SketchStore()
+    audience, engagement = [], []
+    for account in range(accounts):
+        platform = f'Account {account}'
+        pool = rng.integers(0, 10 * reach * accounts)
+        for day in range(days):
+            ids = pool + rng.integers(0, 20 * reach, reach)
+            audience.append(ids)
+            store.add_audience(platform, START + day, ids)
+        values = rng.lognormal(0.0, 1.0, days * posts)
+        engagement.append(values)
+        store.add_engagement(platform, START + np.arange(days).repeat(posts), values)
+    return store, audience, engagement
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 365])
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--reach', type=int, default=5000)
+    parser.add_argument('--posts', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'days':>6}{'events':>12}{'exact ms':>11}{'sketch ms':>11}{'audience err':>14}{'p99 err':>9}")
+    for days in args.days:
+        store, audience, engagement = build(days, args.accounts, args.reach, args.posts)
+        platforms = list(store.tables)
+
+        def exact():
+            values = np.concatenate(engagement)
+            return len(np.unique(np.concatenate(audience))), np.percentile(values, [q * 100 for q in QUANTILES])
+
+        def sketch():
+            return store.query(platforms, [START], START + days - 1)['total']
+
+        exact_time = min(timeit.repeat(exact, number=1, repeat=3))
+        sketch_time = min(timeit.repeat(sketch, number=1, repeat=3))
+        (distinct, percentiles), total = exact(), sketch()
+        events = sum(map(len, audience)) + sum(map(len, engagement))
+        print(f"{days:>6}{events:>12,}{exact_time * 1000:>11.1f}{sketch_time * 1000:>11.1f}"
+              f"{total['audience'] / distinct - 1:>14.2%}{total['engagement_p99'] / percentiles[-1] - 1:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Snapshot Benchmark
+Read throughput and latency of snapshot readers while writers update the data.
+
+Reader threads take the current snapshot, check that it is consistent
+and build the stats, posts and search payloads from it; writer threads
+meanwhile update accounts (alone and in batches), add posts and append
+analytics days. Each run is repeated without writers for comparison.
+
+    python benchmarks/bench_snapshots.py --posts 100000 --readers 4 --duration 5
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadgen import percentile
+import dashboard
+import synthetic
+
+TAG = '#stress'
+POST_BATCH = 10
+
+
+def prepare(data):
+    """Give the counters the writers keep equal a common starting value; returns the post count."""
+    data.update_account('Twitter', followers=0, reach=0)
+    with data.batch():
+        data.update_account('Facebook', posts_today=0)
+        data.update_account('Instagram', posts_today=0)
+    return len(data.posts)
+
+
+def check(snapshot, base_posts):
+    """Problems with one snapshot: writes seen in part, or parts that disagree."""
+    problems = []
+    twitter = snapshot.accounts['Twitter']
+    if twitter['followers'] != twitter['reach']:
+        problems.append(f"Twitter followers {twitter['followers']} != reach {twitter['reach']}")
+    if snapshot.accounts['Facebook']['posts_today'] != snapshot.accounts['Instagram']['posts_today']:
+        problems.append("batched account updates seen in part")
+    if max(snapshot.account_versions.values()) > snapshot.version:
+        problems.append("account version ahead of the data version")
+    stats = dashboard.stats_payload(snapshot, snapshot.version)
+    if stats['full'] or stats['accounts']:
+        problems.append(f"changes after the snapshot's own version: {stats}")
+
+    newest = dashboard.posts_payload(snapshot, 1)
+    found = dashboard.search_payload(snapshot, TAG, 1)
+    if found['total'] != len(snapshot.posts) - base_posts:
+        problems.append(f"search found {found['total']} of {len(snapshot.posts) - base_posts} added posts")
+    if found['posts'] and newest[0]['id'] != found['posts'][0]['id']:
+        problems.append("newest post is not the newest added one")
+    if newest and newest[0]['id'] >= snapshot.next_post_id:
+        problems.append("post id at or after next_post_id")
+
+    rows = np.diff(snapshot.analytics.offsets)
+    if len(set(rows.tolist())) > 1:
+        problems.append(f"analytics days appended in part: {rows.tolist()}")
+    if snapshot.rollups.store is not snapshot.analytics:
+        problems.append("rollups over another analytics store")
+    return problems
+
+
+def write_accounts(data, stop, counts):
+    for i in itertools.count(1):
+        if stop.is_set():
+            return
+        data.update_account('Twitter', followers=i, reach=i)
+        with data.batch():
+            data.update_account('Facebook', posts_today=i)
+            data.update_account('Instagram', posts_today=i)
+        counts['accounts'] += 2
+
+
+def write_posts(data, stop, counts, start):
+    platforms = data.platforms
+    for i in itertools.count():
+        if stop.is_set():
+            return
+        # Later than every generated post, so the newest added post is the newest overall
+        timestamp = start + i * POST_BATCH
+        data.add_posts([{'platform': platforms[j % len(platforms)], 'content': f'stress post {i}.{j} {TAG}',
+                         'timestamp': timestamp + j, 'likes': j, 'comments': 0, 'shares': 0,
+                         'engagement_rate': 1.0} for j in range(POST_BATCH)])
+        counts['posts'] += 1
+
+
+def write_analytics(data, stop, counts):
+    date = data.analytics.last_date()
+    while not stop.is_set():
+        date += 1
+        data.append_analytics([{'date': str(date), 'platform': platform, 'followers': 1000, 'engagement': 2.0,
+                                'reach': 500, 'posts': 1} for platform in data.platforms])
+        counts['analytics'] += 1
+
+
+def read(data, stop, base_posts, latencies, problems):
+    last = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        snapshot = data.snapshot
+        found = check(snapshot, base_posts)
+        latencies.append(time.perf_counter() - started)
+        if snapshot.version < last:
+            found.append(f"version went back from {last} to {snapshot.version}")
+        last = snapshot.version
+        problems.extend(found)
+
+
+def stress(data, readers=4, writers=True, duration=1.0):
+    """Run ``readers`` checking readers, with or without the writers, for ``duration`` seconds.
+
+    Returns read and write counts, reads per second, read latency
+    percentiles and every consistency problem found.
+    """
+    base_posts = prepare(data)
+    stop = threading.Event()
+    counts = {'accounts': 0, 'posts': 0, 'analytics': 0}
+    latencies = [[] for _ in range(readers)]
+    problems = []
+    threads = [threading.Thread(target=read, args=(data, stop, base_posts, latencies[i], problems))
+               for i in range(readers)]
+    if writers:
+        start = max(post.timestamp for post in data.posts.posts.values()) + 1
+        threads += [
+            threading.Thread(target=write_accounts, args=(data, stop, counts)),
+            threading.Thread(target=write_posts, args=(data, stop, counts, start)),
+            threading.Thread(target=write_analytics, args=(data, stop, counts)),
+        ]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    reads = sorted(latency * 1000 for thread in latencies for latency in thread)
+    return {
+        'reads': len(reads),
+        'reads_per_s': len(reads) / elapsed,
+        'read_p50_ms': percentile(reads, 50) if reads else 0.0,
+        'read_p99_ms': percentile(reads, 99) if reads else 0.0,
+        'read_max_ms': reads[-1] if reads else 0.0,
+        'writes': counts,
+        'problems': problems,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'writers':>8}{'reads/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'account':>9}{'post':>7}{'day':>6}{'problems':>10}")
+    for writers in (False, True):
+        data = dashboard.SocialMediaData()
+        dataset = synthetic.generate(data.platforms, args.days, args.posts, seed=0)
+        data.replace(dataset['accounts'], dataset['analytics'], dataset['posts'])
+        data.posts.search_index
+        result = stress(data, args.readers, writers, args.duration)
+        writes = result['writes']
+        print(f"{'yes' if writers else 'no':>8}{result['reads_per_s']:>10,.0f}{result['read_p50_ms']:>9.2f}"
+              f"{result['read_p99_ms']:>9.2f}{result['read_max_ms']:>9.2f}{writes['accounts']:>9,}"
+              f"{writes['posts'] * POST_BATCH:>7,}{writes['analytics']:>6,}{len(result['problems']):>10,}")
+        for problem in result['problems'][:5]:
+            print(f"  {problem}")
+
+
+if __name__ == "__main__":
+    main()
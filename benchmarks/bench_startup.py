@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures how long the dashboard takes to import and to answer its first request.
+
+Each run is a fresh interpreter, so the numbers are cold starts (with a
+warm OS file cache). ``-X importtime`` lists the slowest imports.
+
+    python benchmarks/bench_startup.py --runs 5 --path /api/dashboard
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = """
+import json, sys, time
+start = time.perf_counter()
+import dashboard
+imported = time.perf_counter()
+response = dashboard.app.test_client().get(sys.argv[1])
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (done - imported) * 1000}))
+"""
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_times(module='dashboard', top=15):
+    """Slowest imports of ``module`` as ``(name, cumulative_ms, self_ms)``, by cumulative time."""
+    stderr = run_python('-X', 'importtime', '-c', f'import {module}').stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(cumulative) / 1000, int(own) / 1000))
+    return sorted(times, key=lambda entry: -entry[1])[:top]
+
+
+def startup(path, runs):
+    """Median process start to first response, and its import and first-request parts."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = json.loads(run_python('-c', FIRST_REQUEST, path).stdout)
+        result['process_ms'] = (time.perf_counter() - start) * 1000
+        samples.append(result)
+    return {name: statistics.median(sample[name] for sample in samples) for name in samples[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/api/dashboard', help='first request to send')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = {'startup': startup(args.path, args.runs), 'imports': import_times(top=args.top)}
+    for name, value in results['startup'].items():
+        print(f"{name:<32}{value:>14,.2f}")
+    print(f"\n{'import (cumulative / self ms)':<32}")
+    for name, cumulative, own in results['imports']:
+        print(f"  {name:<30}{cumulative:>14,.2f}{own:>10,.2f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare Load Results
+Compares two loadgen.py result files and flags regressions.
+
+    python benchmarks/compare.py before.json after.json --threshold 10
+
+Exits with status 1 if any endpoint's throughput dropped, or its p95/p99
+latency grew, by more than ``--threshold`` percent.
+"""
+
+import argparse
+import json
+import sys
+
+# metric -> True if higher is better
+METRICS = {'throughput_rps': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False}
+GATED = ('throughput_rps', 'p95_ms', 'p99_ms')
+
+
+def compare(before, after, threshold):
+    """Return ``(rows, regressions)`` for endpoints present in both runs."""
+    rows, regressions = [], []
+    endpoints = dict(before['endpoints'], TOTAL=before['total'])
+    latest = dict(after['endpoints'], TOTAL=after['total'])
+    for path, old in endpoints.items():
+        new = latest.get(path)
+        if not new or not old.get('requests') or not new.get('requests'):
+            continue
+        for metric, higher_is_better in METRICS.items():
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            worse = -change if higher_is_better else change
+            row = (path, metric, old[metric], new[metric], change)
+            rows.append(row)
+            if metric in GATED and worse > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    rows, regressions = compare(before, after, args.threshold)
+    for path, metric, old, new, change in rows:
+        flag = '  REGRESSION' if (path, metric, old, new, change) in regressions else ''
+        print(f"{path:<48}{metric:<16}{old:>10.2f}{new:>10.2f}{change:>+9.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
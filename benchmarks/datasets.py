@@ -0,0 +1,36 @@
+"""
+Benchmark Datasets
+Builds SocialMediaData instances of a given size with the synthetic generator.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+import synthetic
+
+# (days, accounts) from the current mock size up to five years of 500 accounts
+SIZES = [(30, 5), (365, 50), (1825, 500)]
+
+
+def build_columns(days, accounts, seed=0):
+    """Return ``(names, codes, dates, columns)`` sorted by (account, date)."""
+    store = synthetic.generate(accounts, days, posts=0, seed=seed)['analytics']
+    return store.platforms, store.codes, store.dates, store.columns
+
+
+def build_data(days, accounts, posts_per_account=20, seed=0):
+    """Return a SocialMediaData holding ``days`` of history for ``accounts`` accounts."""
+    dataset = synthetic.generate(accounts, days, posts_per_account * accounts, seed)
+    data = dashboard.SocialMediaData(platforms=list(dataset['accounts']))
+    data.replace(dataset['accounts'], dataset['analytics'], dataset['posts'])
+    return data
+
+
+def use_data(data):
+    """Point the default dashboard app at ``data``."""
+    state = dashboard.app.extensions['dashboard']
+    state.data = data
+    state.cache.clear()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Load Generator
+Drives the dashboard API and reports throughput and latency percentiles.
+
+Runs in-process through the Flask test client by default, or against a
+running server with ``--url``. Results are written as JSON so runs from
+different commits can be compared with ``benchmarks/compare.py``.
+
+    python benchmarks/loadgen.py --duration 10 --concurrency 8 --output before.json
+    python benchmarks/loadgen.py --url http://localhost:8000 --output after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Weighted request mix: pollers revalidating with ETags dominate real traffic.
+DEFAULT_PROFILE = [
+    ('/api/dashboard', 3, True),
+    ('/api/stats', 3, True),
+    ('/api/analytics', 3, True),
+    ('/api/posts', 3, True),
+    ('/api/stats', 1, False),
+    ('/api/analytics?granularity=week&range=12w', 1, False),
+    ('/api/analytics?granularity=month&range=1y', 1, False),
+    ('/api/posts/top?by=likes', 1, False),
+]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class TestClientTransport:
+    """Requests through the Flask test client, one client per thread."""
+
+    def __init__(self):
+        import dashboard
+        self.app = dashboard.app
+        self.local = threading.local()
+
+    def get(self, path, headers):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.get(path, headers=headers)
+        return response.status_code, response.headers.get('ETag'), len(response.data)
+
+
+class HTTPTransport:
+    """Requests over HTTP to a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path, headers):
+        request = urllib.request.Request(self.base_url + path, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                body = response.read()
+                return response.status, response.headers.get('ETag'), len(body)
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('ETag'), 0
+
+
+def worker(transport, profile, deadline, seed, samples):
+    rng = random.Random(seed)
+    paths = [entry[0:3:2] for entry in profile]
+    weights = [entry[1] for entry in profile]
+    etags = {}
+    while time.perf_counter() < deadline:
+        path, conditional = rng.choices(paths, weights)[0]
+        headers = {}
+        if conditional and path in etags:
+            headers['If-None-Match'] = etags[path]
+        start = time.perf_counter()
+        try:
+            status, etag, size = transport.get(path, headers)
+        except OSError:
+            status, etag, size = 0, None, 0
+        elapsed = time.perf_counter() - start
+        if etag:
+            etags[path] = etag
+        samples.append((path, status, elapsed, size))
+
+
+def summarize(samples, duration):
+    def stats(group):
+        latencies = sorted(sample[2] for sample in group)
+        return {
+            'requests': len(group),
+            'throughput_rps': len(group) / duration,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'errors': sum(1 for sample in group if sample[1] not in (200, 304)),
+            'not_modified': sum(1 for sample in group if sample[1] == 304),
+            'bytes': sum(sample[3] for sample in group),
+        }
+
+    by_path = {}
+    for sample in samples:
+        by_path.setdefault(sample[0], []).append(sample)
+    return {
+        'total': stats(samples) if samples else {'requests': 0},
+        'endpoints': {path: stats(group) for path, group in sorted(by_path.items())},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(transport, duration=10.0, concurrency=8, profile=DEFAULT_PROFILE, warmup=1.0, seed=0):
+    """Run the load profile and return the results dict."""
+    if warmup:
+        worker(transport, profile, time.perf_counter() + warmup, seed, [])
+    samples = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker, args=(transport, profile, deadline, seed + i, samples))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results = summarize(samples, duration)
+    results['config'] = {'duration': duration, 'concurrency': concurrency, 'profile': profile}
+    results['environment'] = {'commit': git_commit(), 'python': platform.python_version(),
+                              'machine': platform.machine(), 'timestamp': time.time()}
+    return results
+
+
+def print_report(results):
+    total = results['total']
+    print(f"{'endpoint':<48}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'304s':>7}{'errors':>8}")
+    for path, r in list(results['endpoints'].items()) + [('TOTAL', total)]:
+        if not r.get('requests'):
+            continue
+        print(f"{path:<48}{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['not_modified']:>7}{r['errors']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--days', type=int, help='in-process only: days of history to generate')
+    parser.add_argument('--accounts', type=int, help='in-process only: number of accounts to generate')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        transport = HTTPTransport(args.url)
+    else:
+        if args.days or args.accounts:
+            from benchmarks.datasets import build_data, use_data
+            use_data(build_data(args.days or 30, args.accounts or 5))
+        transport = TestClientTransport()
+
+    results = run(transport, args.duration, args.concurrency)
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Broadcaster
+Fan-out of server-sent events to many subscribers with bounded queues.
+"""
+
+import queue
+import threading
+
+from serialization import dumps
+
+
+def format_event(event, data, event_id=None):
+    """Encode one server-sent event as bytes."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {dumps(data).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+RESYNC = format_event('resync', {})
+KEEPALIVE = b": keepalive\n\n"
+
+
+class Subscription:
+    """One client's bounded queue of encoded events.
+
+    When the queue overflows the pending deltas are useless to the client,
+    so they are discarded and replaced with a single ``resync`` event that
+    tells it to refetch full state.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def deliver(self, chunk):
+        """Queue an encoded event without ever blocking the publisher."""
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:
+            self._resync()
+
+    def _resync(self):
+        with self.queue.mutex:
+            self.dropped += len(self.queue.queue)
+            self.queue.queue.clear()
+            self.queue.queue.append(RESYNC)
+            self.queue.not_empty.notify()
+
+    def get(self, timeout=None):
+        """Return the next encoded event, or None if ``timeout`` expires."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def events(self, keepalive=15.0):
+        """Yield encoded events forever, with a comment line when idle."""
+        while True:
+            chunk = self.get(timeout=keepalive)
+            yield KEEPALIVE if chunk is None else chunk
+
+
+class Broadcaster:
+    """Publishes each event once and fans the encoded bytes out to subscribers."""
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """Register and return a new Subscription."""
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscription; unknown subscriptions are ignored."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        """Encode ``data`` once and queue it for every subscriber."""
+        with self._lock:
+            self._next_id += 1
+            chunk = format_event(event, data, self._next_id)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(chunk)
+        return len(subscribers)
+
+
+class StreamLimit:
+    """Counts the open streams of a process against an optional ``limit``."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._open
+
+    def acquire(self):
+        """Take a slot for a new stream; returns False when all are in use."""
+        with self._lock:
+            if self.limit is not None and self._open >= self.limit:
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        """Give back the slot of a closed stream."""
+        with self._lock:
+            self._open -= 1
@@ -4,605 +4,1080 @@ Social Media Dashboard
 Comprehensive social media management and analytics dashboard.
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Blueprint, Flask, abort, current_app, g, request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
 import json
-import random
-from datetime import datetime, timedelta
-import pandas as pd
+import math
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
 import numpy as np
 
-app = Flask(__name__)
+from analytics_store import AnalyticsStore
+from assets import AssetBundle
+from broadcaster import Broadcaster, StreamLimit, format_event
+from downsample import downsample
+import export
+from ingestion import MockAdapter
+from metrics import CACHE_RESULTS, REQUEST_METRICS, REQUEST_SECONDS, RESPONSE_BYTES, Gauge, render, stage
+from response_cache import ResponseCache
+from rollups import RollupEngine, bucket_grid, parse_range
+from scheduler import ScheduleStore, Scheduler
+from serialization import json_response
+from posts_index import MAX_POST_ID, METRICS, Post, PostIndex
+from search_index import MAX_TERMS, tokenize
+from sketches import SketchStore
+from snapshots import Draft, Snapshot
+from storage import open_storage
+import synthetic
+from tenants import TenantRegistry
+from trends import GROWTH_PERIODS, compute_trends
+
+bp = Blueprint('dashboard', __name__)
+
+
+def _snapshot_field(name):
+    return property(lambda self: getattr(self.snapshot, name), doc=f"``{name}`` of the current snapshot.")
+
 
 # Mock social media data
 class SocialMediaData:
-    def __init__(self):
-        self.platforms = ['Facebook', 'Instagram', 'Twitter', 'LinkedIn', 'TikTok']
-        self.generate_mock_data()
-    
-    def generate_mock_data(self):
-        """Generate mock social media data."""
-        self.accounts = {
-            'Facebook': {
-                'followers': 15420,
-                'engagement_rate': 3.2,
-                'posts_today': 2,
-                'reach': 8500,
-                'color': '#1877F2'
-            },
-            'Instagram': {
-                'followers': 23150,
-                'engagement_rate': 4.8,
-                'posts_today': 3,
-                'reach': 12300,
-                'color': '#E4405F'
-            },
-            'Twitter': {
-                'followers': 8930,
-                'engagement_rate': 2.1,
-                'posts_today': 5,
-                'reach': 5200,
-                'color': '#1DA1F2'
-            },
-            'LinkedIn': {
-                'followers': 5670,
-                'engagement_rate': 5.2,
-                'posts_today': 1,
-                'reach': 3400,
-                'color': '#0A66C2'
-            },
-            'TikTok': {
-                'followers': 45200,
-                'engagement_rate': 7.8,
-                'posts_today': 2,
-                'reach': 28900,
-                'color': '#000000'
-            }
-        }
-        
-        # Generate analytics data for the last 30 days
-        self.analytics_data = []
-        for i in range(30):
-            date = datetime.now() - timedelta(days=i)
-            for platform in self.platforms:
-                self.analytics_data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'platform': platform,
-                    'followers': self.accounts[platform]['followers'] + random.randint(-50, 100),
-                    'engagement': random.uniform(1, 10),
-                    'reach': random.randint(1000, 30000),
-                    'posts': random.randint(0, 5)
-                })
-        
-        # Generate recent posts
-        self.recent_posts = []
-        for i in range(20):
-            platform = random.choice(self.platforms)
-            self.recent_posts.append({
-                'id': i + 1,
-                'platform': platform,
-                'content': f"Sample post content for {platform} #{i+1}",
-                'timestamp': (datetime.now() - timedelta(hours=random.randint(1, 48))).isoformat(),
-                'likes': random.randint(10, 500),
-                'comments': random.randint(2, 50),
-                'shares': random.randint(1, 25),
-                'engagement_rate': random.uniform(2, 8)
-            })
-        
-        self.recent_posts.sort(key=lambda x: x['timestamp'], reverse=True)
-
-social_data = SocialMediaData()
-
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Social Media Dashboard</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            color: #333;
-        }
-        
-        .dashboard {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        
-        .header {
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-        
-        .header h1 {
-            color: #2c3e50;
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-        }
-        
-        .header p {
-            color: #7f8c8d;
-            font-size: 1.1rem;
-        }
-        
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-        
-        .stat-card {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .stat-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 20px 40px rgba(0,0,0,0.15);
-        }
-        
-        .stat-card::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 4px;
-            background: var(--platform-color);
-        }
-        
-        .platform-header {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            margin-bottom: 20px;
-        }
-        
-        .platform-name {
-            font-size: 1.2rem;
-            font-weight: 600;
-            color: #2c3e50;
-        }
-        
-        .platform-icon {
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            background: var(--platform-color);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-weight: bold;
-        }
-        
-        .metric {
-            margin-bottom: 15px;
-        }
-        
-        .metric-label {
-            font-size: 0.9rem;
-            color: #7f8c8d;
-            margin-bottom: 5px;
-        }
-        
-        .metric-value {
-            font-size: 1.8rem;
-            font-weight: 700;
-            color: #2c3e50;
-        }
-        
-        .metric-change {
-            font-size: 0.8rem;
-            margin-left: 10px;
-        }
-        
-        .positive { color: #27ae60; }
-        .negative { color: #e74c3c; }
-        
-        .charts-section {
-            display: grid;
-            grid-template-columns: 2fr 1fr;
-            gap: 30px;
-            margin-bottom: 30px;
-        }
-        
-        .chart-container {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-        
-        .chart-title {
-            font-size: 1.3rem;
-            font-weight: 600;
-            color: #2c3e50;
-            margin-bottom: 20px;
-        }
-        
-        .posts-section {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-        
-        .post-item {
-            border-bottom: 1px solid #ecf0f1;
-            padding: 20px 0;
-            transition: background 0.3s ease;
-        }
-        
-        .post-item:hover {
-            background: #f8f9fa;
-            border-radius: 10px;
-            margin: 0 -10px;
-            padding: 20px 10px;
-        }
-        
-        .post-header {
-            display: flex;
-            align-items: center;
-            justify-content: between;
-            margin-bottom: 10px;
-        }
-        
-        .post-platform {
-            background: var(--platform-color);
-            color: white;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 0.8rem;
-            font-weight: 500;
-        }
-        
-        .post-time {
-            color: #7f8c8d;
-            font-size: 0.9rem;
-            margin-left: auto;
-        }
-        
-        .post-content {
-            color: #2c3e50;
-            margin-bottom: 15px;
-            line-height: 1.5;
-        }
-        
-        .post-metrics {
-            display: flex;
-            gap: 20px;
-            font-size: 0.9rem;
-            color: #7f8c8d;
-        }
-        
-        .controls {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-        
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 12px 24px;
-            border-radius: 25px;
-            cursor: pointer;
-            font-weight: 500;
-            transition: transform 0.3s ease;
-            margin-right: 10px;
-        }
-        
-        .btn:hover {
-            transform: translateY(-2px);
-        }
-        
-        @media (max-width: 768px) {
-            .charts-section {
-                grid-template-columns: 1fr;
-            }
-            
-            .stats-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="dashboard">
-        <div class="header">
-            <h1>📱 Social Media Dashboard</h1>
-            <p>Monitor and manage your social media presence across all platforms</p>
-        </div>
-        
-        <div class="controls">
-            <button class="btn" onclick="refreshData()">🔄 Refresh Data</button>
-            <button class="btn" onclick="exportReport()">📊 Export Report</button>
-            <button class="btn" onclick="schedulePost()">📝 Schedule Post</button>
-        </div>
-        
-        <div class="stats-grid" id="statsGrid">
-            <!-- Platform stats will be loaded here -->
-        </div>
-        
-        <div class="charts-section">
-            <div class="chart-container">
-                <h3 class="chart-title">📈 Engagement Trends (Last 7 Days)</h3>
-                <canvas id="engagementChart"></canvas>
-            </div>
-            
-            <div class="chart-container">
-                <h3 class="chart-title">🎯 Platform Distribution</h3>
-                <canvas id="platformChart"></canvas>
-            </div>
-        </div>
-        
-        <div class="posts-section">
-            <h3 class="chart-title">📋 Recent Posts</h3>
-            <div id="recentPosts">
-                <!-- Recent posts will be loaded here -->
-            </div>
-        </div>
-    </div>
-
-    <script>
-        let engagementChart, platformChart;
-        
-        async function loadDashboard() {
-            await loadStats();
-            await loadCharts();
-            await loadRecentPosts();
-        }
-        
-        async function loadStats() {
-            try {
-                const response = await fetch('/api/stats');
-                const data = await response.json();
-                
-                const statsGrid = document.getElementById('statsGrid');
-                statsGrid.innerHTML = '';
-                
-                Object.entries(data).forEach(([platform, stats]) => {
-                    const card = document.createElement('div');
-                    card.className = 'stat-card';
-                    card.style.setProperty('--platform-color', stats.color);
-                    
-                    card.innerHTML = `
-                        <div class="platform-header">
-                            <div class="platform-name">${platform}</div>
-                            <div class="platform-icon">${platform[0]}</div>
-                        </div>
-                        
-                        <div class="metric">
-                            <div class="metric-label">Followers</div>
-                            <div class="metric-value">
-                                ${stats.followers.toLocaleString()}
-                                <span class="metric-change positive">+${Math.floor(Math.random() * 100)}</span>
-                            </div>
-                        </div>
-                        
-                        <div class="metric">
-                            <div class="metric-label">Engagement Rate</div>
-                            <div class="metric-value">${stats.engagement_rate}%</div>
-                        </div>
-                        
-                        <div class="metric">
-                            <div class="metric-label">Posts Today</div>
-                            <div class="metric-value">${stats.posts_today}</div>
-                        </div>
-                        
-                        <div class="metric">
-                            <div class="metric-label">Reach</div>
-                            <div class="metric-value">${stats.reach.toLocaleString()}</div>
-                        </div>
-                    `;
-                    
-                    statsGrid.appendChild(card);
-                });
-            } catch (error) {
-                console.error('Error loading stats:', error);
-            }
-        }
-        
-        async function loadCharts() {
-            try {
-                const response = await fetch('/api/analytics');
-                const data = await response.json();
-                
-                // Engagement Chart
-                const ctx1 = document.getElementById('engagementChart').getContext('2d');
-                if (engagementChart) engagementChart.destroy();
-                
-                engagementChart = new Chart(ctx1, {
-                    type: 'line',
-                    data: {
-                        labels: data.dates,
-                        datasets: data.platforms.map((platform, index) => ({
-                            label: platform.name,
-                            data: platform.engagement,
-                            borderColor: platform.color,
-                            backgroundColor: platform.color + '20',
-                            tension: 0.4
-                        }))
-                    },
-                    options: {
-                        responsive: true,
-                        plugins: {
-                            legend: {
-                                position: 'top',
-                            }
-                        },
-                        scales: {
-                            y: {
-                                beginAtZero: true
-                            }
-                        }
-                    }
-                });
-                
-                // Platform Distribution Chart
-                const ctx2 = document.getElementById('platformChart').getContext('2d');
-                if (platformChart) platformChart.destroy();
-                
-                platformChart = new Chart(ctx2, {
-                    type: 'doughnut',
-                    data: {
-                        labels: data.platforms.map(p => p.name),
-                        datasets: [{
-                            data: data.platforms.map(p => p.followers),
-                            backgroundColor: data.platforms.map(p => p.color),
-                            borderWidth: 0
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        plugins: {
-                            legend: {
-                                position: 'bottom'
-                            }
-                        }
-                    }
-                });
-                
-            } catch (error) {
-                console.error('Error loading charts:', error);
-            }
-        }
-        
-        async function loadRecentPosts() {
-            try {
-                const response = await fetch('/api/posts');
-                const posts = await response.json();
-                
-                const postsContainer = document.getElementById('recentPosts');
-                postsContainer.innerHTML = '';
-                
-                posts.forEach(post => {
-                    const postElement = document.createElement('div');
-                    postElement.className = 'post-item';
-                    
-                    const platformColors = {
-                        'Facebook': '#1877F2',
-                        'Instagram': '#E4405F',
-                        'Twitter': '#1DA1F2',
-                        'LinkedIn': '#0A66C2',
-                        'TikTok': '#000000'
-                    };
-                    
-                    postElement.innerHTML = `
-                        <div class="post-header">
-                            <span class="post-platform" style="background: ${platformColors[post.platform]}">${post.platform}</span>
-                            <span class="post-time">${new Date(post.timestamp).toLocaleString()}</span>
-                        </div>
-                        <div class="post-content">${post.content}</div>
-                        <div class="post-metrics">
-                            <span>❤️ ${post.likes} likes</span>
-                            <span>💬 ${post.comments} comments</span>
-                            <span>🔄 ${post.shares} shares</span>
-                            <span>📊 ${post.engagement_rate.toFixed(1)}% engagement</span>
-                        </div>
-                    `;
-                    
-                    postsContainer.appendChild(postElement);
-                });
-                
-            } catch (error) {
-                console.error('Error loading posts:', error);
-            }
-        }
-        
-        function refreshData() {
-            loadDashboard();
-        }
-        
-        function exportReport() {
-            alert('Report export functionality would be implemented here');
-        }
-        
-        function schedulePost() {
-            alert('Post scheduling functionality would be implemented here');
+    """A tenant's accounts, analytics and posts, served from immutable snapshots.
+
+    Readers take ``snapshot`` once and read it without locking; the
+    attributes below are shortcuts to the current one. Every write builds
+    the next snapshot under one write lock and swaps it in, and ``batch``
+    groups several writes into one snapshot.
+    """
+    
+    version = _snapshot_field('version')
+    platforms = _snapshot_field('platforms')
+    accounts = _snapshot_field('accounts')
+    account_versions = _snapshot_field('account_versions')
+    analytics = _snapshot_field('analytics')
+    rollups = _snapshot_field('rollups')
+    posts = _snapshot_field('posts')
+    sketches = _snapshot_field('sketches')
+    next_post_id = _snapshot_field('next_post_id')
+    
+    def __init__(self, storage=None, platforms=None):
+        platforms = list(platforms or ['Facebook', 'Instagram', 'Twitter', 'LinkedIn', 'TikTok'])
+        self.listeners = []
+        self.storage = storage
+        self._write_lock = threading.RLock()
+        self._draft = None
+        self._epoch = self._epoch_pid = None
+        self.snapshot = Snapshot(version=0, platforms=platforms, account_versions={},
+                                 account_log=deque(maxlen=ACCOUNT_LOG_SIZE), account_log_floor=0,
+                                 **self._components({}, AnalyticsStore(platforms)))
+        if storage is None or not self.load(storage):
+            self.generate_mock_data()
+    
+    @staticmethod
+    def _components(accounts, analytics, posts=(), audience=None):
+        posts = PostIndex(posts)
+        sketches = SketchStore()
+        if audience is not None:
+            sketches.add_audience_registers(analytics.platforms, analytics.codes, analytics.dates, audience)
+        _sketch_posts(sketches, posts.posts.values())
+        return {
+            'accounts': accounts,
+            'analytics': analytics,
+            'rollups': RollupEngine(analytics),
+            'posts': posts,
+            'sketches': sketches,
+            'next_post_id': max(posts.posts, default=0) + 1,
         }
+    
+    @property
+    def epoch(self):
+        """Random token naming this dataset in this process.
+
+        Versions count the writes to one dataset in one process, so clients
+        get them as ``epoch:version`` and a version of another epoch (another
+        server process, or a tenant loaded again) is treated as unknown.
+        """
+        if self._epoch_pid != os.getpid():
+            with self._write_lock:
+                # Workers forked from a preloaded master each count their own versions
+                if self._epoch_pid != os.getpid():
+                    self._epoch = secrets.token_hex(4)
+                    self._epoch_pid = os.getpid()
+        return self._epoch
+    
+    @contextmanager
+    def batch(self):
+        """Group writes into one snapshot, swapped in when the block exits.
+
+        Writes in the block see each other while readers keep the previous
+        snapshot, listeners hear of them once it is published, and an
+        exception discards them all (storage writes already made are kept).
+        Writes from other threads wait for the block; nested blocks join it.
+        Yields the Draft.
+        """
+        with self._write_lock:
+            if self._draft is not None:
+                yield self._draft
+                return
+            draft = self._draft = Draft(self.snapshot)
+            try:
+                yield draft
+                self.snapshot = draft.publish()
+            finally:
+                self._draft = None
+            for event, data in draft.events:
+                for listener in self.listeners:
+                    listener(event, data)
+    
+    def load(self, storage):
+        """Load state persisted in ``storage``; returns False if it is empty."""
+        loaded = storage.load()
+        if loaded is None:
+            return False
+        self.replace(loaded['accounts'], loaded['analytics'], loaded['posts'])
+        return True
+    
+    def replace(self, accounts, analytics, posts=(), audience=None):
+        """Swap in a complete dataset.
+
+        ``accounts`` maps platform to counters in display order, ``analytics``
+        is an AnalyticsStore, ``posts`` an iterable of Post records and
+        ``audience`` optional HyperLogLog registers per analytics row. The
+        dataset is not written to storage.
+        """
+        platforms = list(accounts)
+        for platform in platforms:
+            analytics.code_for(platform)
+        components = self._components(accounts, analytics, posts, audience)
+        with self.batch() as draft:
+            draft.reset(platforms=platforms, **components)
+            self.touch('resync', {})
+            version = draft.snapshot.version
+            # Changes after this version are all in the log
+            draft.reset(account_versions={platform: version for platform in accounts},
+                        account_log=deque(maxlen=ACCOUNT_LOG_SIZE), account_log_floor=version)
+    
+    def generate_mock_data(self, days=30, posts=20, seed=None):
+        """Replace the data with a synthetic dataset for the current platforms.
+
+        The default is 30 days of analytics and 20 posts spread across the
+        platforms, with simulated audiences; it is written to storage when
+        there is one (audience sketches are kept in memory only).
+        """
+        dataset = synthetic.generate(self.platforms, days, posts, seed, audience=True)
+        if self.storage is not None:
+            synthetic.save(dataset, self.storage)
+        self.replace(dataset['accounts'], dataset['analytics'], dataset['posts'], dataset['audience'])
+
+    def touch(self, event=None, data=None):
+        """Bump the data version and tell listeners what changed.
+
+        Listeners are called as ``listener(event, data)`` with the new
+        version added to ``data``, once the version is published.
+        """
+        with self.batch() as draft:
+            snapshot = draft.snapshot
+            snapshot.version += 1
+            if event is not None:
+                draft.events.append((event, dict(data, version=snapshot.version)))
+    
+    def update_account(self, platform, **fields):
+        """Update counters of one account, registering the platform if new.
+
+        Fields that already have the given value are ignored, and an update
+        that changes nothing leaves the data version alone. Otherwise the
+        account's version becomes the new data version and the change is
+        logged for ``accounts_since``.
+        """
+        with self.batch() as draft:
+            snapshot = draft.snapshot
+            account = snapshot.accounts.get(platform)
+            if account is None:
+                account = {}
+                if platform not in snapshot.platforms:
+                    draft.writable('platforms').append(platform)
+                    draft.writable('analytics').code_for(platform)
+            else:
+                fields = {name: value for name, value in fields.items()
+                          if name not in account or account[name] != value}
+                if not fields:
+                    return
+            account = draft.writable('accounts')[platform] = dict(account, **fields)
+            if self.storage is not None:
+                self.storage.save_account(platform, account)
+            self.touch('accounts', {'accounts': {platform: fields}})
+            draft.writable('account_versions')[platform] = snapshot.version
+            log = draft.writable('account_log')
+            if len(log) == log.maxlen:
+                snapshot.account_log_floor = log[0][0]
+            log.append((snapshot.version, platform, dict(fields)))
+    
+    def accounts_since(self, since):
+        """``accounts_since`` of the current snapshot."""
+        return self.snapshot.accounts_since(since)
+    
+    def append_analytics(self, rows):
+        """Append analytics rows and fold them into the rollups."""
+        with self.batch() as draft:
+            analytics = draft.writable('analytics')
+            codes, dates, columns = analytics.append(rows)
+            draft.writable('rollups').add(codes, dates, columns)
+            if self.storage is not None:
+                self.storage.append_analytics(analytics.platforms, codes, dates, columns)
+            points = [{'date': str(date), 'platform': analytics.platforms[code]}
+                      for code, date in zip(codes.tolist(), dates)]
+            for name, values in columns.items():
+                for point, value in zip(points, values.tolist()):
+                    point[name] = value
+            self.touch('analytics', {'points': points})
+    
+    def add_posts(self, posts, persist=True):
+        """Add posts (dicts in the JSON shape or Post records) to the index.
+
+        Posts without an ``id`` are given the next free one. With
+        ``persist=False`` they are not written to the storage backend, for
+        posts another process has stored already.
+        """
+        posts = [post if isinstance(post, Post) else Post.from_dict(post) for post in posts]
+        if not posts:
+            return
+        with self.batch() as draft:
+            snapshot = draft.snapshot
+            for post in posts:
+                if post.id is None:
+                    post.id = snapshot.next_post_id
+                if post.id > MAX_POST_ID:
+                    raise ValueError(f"post id must be at most {MAX_POST_ID}")
+                snapshot.next_post_id = max(snapshot.next_post_id, post.id + 1)
+            draft.writable('posts').add(posts)
+            _sketch_posts(draft.writable('sketches'), posts)
+            if persist and self.storage is not None:
+                self.storage.append_posts(posts)
+            self.touch('posts', {'posts': [post.to_dict() for post in posts]})
+    
+    def add_audience(self, platform, date, user_ids):
+        """Count the users ``platform`` reached on ``date`` towards its audience sketch."""
+        with self.batch() as draft:
+            draft.writable('sketches').add_audience(platform, date, user_ids)
+            self.touch()
+
+    @property
+    def recent_posts(self):
+        """All posts as dicts, newest first (materialized on each access)."""
+        posts = self.posts
+        return [post.to_dict() for post in posts.recent(len(posts))]
+    
+    @property
+    def analytics_data(self):
+        """Analytics history as a list of dicts (materialized on each access)."""
+        return list(self.analytics.records())
+
+
+def _sketch_posts(sketches, posts):
+    by_platform = {}
+    for post in posts:
+        by_platform.setdefault(post.platform, []).append((post.timestamp, post.engagement_rate))
+    for platform, rows in by_platform.items():
+        timestamps, rates = zip(*rows)
+        sketches.add_engagement(platform, np.array(timestamps) // _DAY_US, rates)
+
+_DAY_US = 86400 * 1000000
+MAX_PAGE_SIZE = 100
+ACCOUNT_LOG_SIZE = 1000
+MAX_CHART_POINTS = 5000
+MAX_SCHEDULE_BATCH = 10000
+STREAM_RETRY_AFTER = 60
+DEFAULT_TENANT = 'default'
+
+# Shared by every app and tenant; threads start on first use, so a
+# preloaded app forks without any.
+fanout = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dashboard')
+
+
+def publisher_for(platform):
+    """Adapter that publishes scheduled posts; the local stub until real adapters exist."""
+    return MockAdapter(platform, days=0, posts=0)
+
+
+class DashboardState:
+    """The dataset a tenant serves, plus the response cache, SSE broadcaster and scheduler built on it.
+
+    Pass either ``data`` or ``load``, a callable that builds the dataset on
+    first access, so apps can be created without paying for it.
+    """
+    
+    def __init__(self, data=None, load=None, tenant=DEFAULT_TENANT):
+        self.tenant = tenant
+        self.cache = ResponseCache()
+        self.broadcaster = Broadcaster()
+        self._load = load
+        self._data = None
+        self._scheduler = None
+        self._lock = threading.RLock()
+        if data is not None:
+            self.data = data
+    
+    @property
+    def loaded(self):
+        """Whether the dataset has been built."""
+        return self._data is not None
+    
+    @property
+    def data(self):
+        data = self._data
+        if data is None:
+            with self._lock:
+                if self._data is None:
+                    self.data = self._load()
+                data = self._data
+        return data
+    
+    @data.setter
+    def data(self, data):
+        with self._lock:
+            if self._publish not in data.listeners:
+                data.listeners.append(self._publish)
+            self._data = data
+    
+    def _publish(self, event, payload):
+        # Streamed versions are tokens like the ones /api/stats?since= takes
+        self.broadcaster.publish(event, dict(payload, version=version_token(self._data, payload['version'])))
+    
+    @property
+    def scheduler(self):
+        """The post scheduler, started on first use so no threads exist before fork.
+
+        With DASHBOARD_SCHEDULE_DB set, its jobs are kept in that SQLite
+        database too, so every server process sharing it can look them up
+        and cancel them, and the posts each process publishes are added to
+        the data of all of them. It is then started as the process boots
+        (``start_schedulers``) or loads the tenant, so it keeps adding them.
+        """
+        with self._lock:
+            if self._scheduler is None:
+                path = os.environ.get('DASHBOARD_SCHEDULE_DB')
+                store = ScheduleStore(path, self.tenant) if path else None
+                self._scheduler = Scheduler(self.data, publisher_for, store=store).start()
+            return self._scheduler
+    
+    def scheduled(self):
+        """Number of pending scheduled posts, without starting the scheduler."""
+        return 0 if self._scheduler is None else len(self._scheduler)
+    
+    def busy(self):
+        """Whether clients are streaming from this state or posts are scheduled."""
+        return len(self.broadcaster) > 0 or self.scheduled() > 0
+    
+    def close(self):
+        """Stop the scheduler and release the storage backend once the state is evicted."""
+        if self._scheduler is not None:
+            self._scheduler.stop()
+            if self._scheduler.store is not None:
+                self._scheduler.store.close()
+        if self._data is not None and self._data.storage is not None:
+            self._data.storage.close()
+
+
+def start_schedulers(app):
+    """Start the schedulers of the default tenant and of every tenant with scheduled posts.
+
+    Called as a server process boots, so the posts of processes that have
+    exited are taken over without waiting for a request; a no-op unless
+    DASHBOARD_SCHEDULE_DB is set.
+    """
+    path = os.environ.get('DASHBOARD_SCHEDULE_DB')
+    if not path:
+        return
+    registry = app.extensions['tenants']
+    for tenant in {DEFAULT_TENANT, *ScheduleStore.tenants(path)}:
+        try:
+            registry.get(tenant).scheduler
+        except KeyError:
+            # Scheduled by a tenant no longer registered
+            continue
+
+
+def load_tenant(tenant, accounts):
+    """Build a tenant's DashboardState from its registered accounts.
+
+    DASHBOARD_TENANT_STORAGE is a storage url with a ``{tenant}``
+    placeholder (e.g. sqlite:///var/lib/dashboard/{tenant}.db); without it,
+    or while the tenant's store is empty, mock data is generated.
+    """
+    url = os.environ.get('DASHBOARD_TENANT_STORAGE')
+    storage = open_storage(url.format(tenant=tenant)) if url else None
+    state = DashboardState(SocialMediaData(storage, [account['label'] for account in accounts]), tenant=tenant)
+    if os.environ.get('DASHBOARD_SCHEDULE_DB'):
+        # Started now to add the posts other server processes publish for the tenant
+        state.scheduler
+    return state
+
+
+def default_data():
+    """The default tenant's dataset, from DASHBOARD_STORAGE or mock data."""
+    return SocialMediaData(open_storage(os.environ.get('DASHBOARD_STORAGE')))
+
+
+def create_registry():
+    """TenantRegistry configured from the environment.
+
+    DASHBOARD_TENANTS names a JSON file of accounts to register and
+    DASHBOARD_MAX_TENANTS bounds how many tenants stay loaded (default 32).
+    """
+    registry = TenantRegistry(load_tenant, int(os.environ.get('DASHBOARD_MAX_TENANTS', 32)),
+                              busy=DashboardState.busy, unload=DashboardState.close)
+    if os.environ.get('DASHBOARD_TENANTS'):
+        registry.register_file(os.environ['DASHBOARD_TENANTS'])
+    return registry
+
+
+def current_state():
+    """DashboardState of the tenant the request is for."""
+    tenant = g.get('tenant')
+    if tenant is None:
+        return current_app.extensions['dashboard']
+    try:
+        return current_app.extensions['tenants'].get(tenant)
+    except KeyError:
+        abort(json_response({'error': f'unknown tenant: {tenant}'}, 404))
+
+
+def current_snapshot():
+    """The data snapshot the request reads, taken once so every part of the response agrees."""
+    snapshot = g.get('snapshot')
+    if snapshot is None:
+        snapshot = g.snapshot = current_state().data.snapshot
+    return snapshot
+
+
+def start_request():
+    g.started = time.perf_counter()
+    if current_app.config['PROFILE_DIR'] and request.args.get('profile') == '1':
+        import cProfile
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def finish_request(response):
+    """Record request metrics and write the profile of a ``?profile=1`` request."""
+    route = request.endpoint or 'unmatched'
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        name = f"{route}-{time.time_ns()}.pstats"
+        profiler.dump_stats(os.path.join(current_app.config['PROFILE_DIR'], name))
+        response.headers['X-Profile'] = name
+    if 'started' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.started, route, str(response.status_code))
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.content_length or 0, route)
+    return response
+
+
+def state_gauges(registry):
+    """Gauges of data-store sizes for every loaded tenant."""
+    def per_tenant(measure):
+        return lambda: [((tenant,), measure(state)) for tenant, state in registry.items() if state.loaded]
+    
+    return [
+        Gauge('dashboard_analytics_rows', 'Rows in the analytics history.', ('tenant',),
+              per_tenant(lambda state: len(state.data.analytics))),
+        Gauge('dashboard_posts', 'Posts in the post index.', ('tenant',),
+              per_tenant(lambda state: len(state.data.posts))),
+        Gauge('dashboard_data_version', 'Version of the dataset.', ('tenant',),
+              per_tenant(lambda state: state.data.version)),
+        Gauge('dashboard_response_cache_entries', 'Entries in the response cache.', ('tenant',),
+              per_tenant(lambda state: len(state.cache))),
+        Gauge('dashboard_stream_subscribers', 'Open event streams.', ('tenant',),
+              per_tenant(lambda state: len(state.broadcaster))),
+        Gauge('dashboard_scheduled_posts', 'Posts waiting to be published.', ('tenant',),
+              per_tenant(DashboardState.scheduled)),
+        Gauge('dashboard_tenants', 'Tenants by state.', ('state',),
+              lambda: [(('loaded',), len(registry.loaded())), (('registered',), len(registry))]),
+    ]
+
+
+def metrics_view():
+    """Prometheus metrics of this process (each gunicorn worker reports its own)."""
+    body = render(REQUEST_METRICS + tuple(state_gauges(current_app.extensions['tenants'])))
+    return current_app.response_class(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def pull_tenant(endpoint, values):
+    if values and 'tenant' in values:
+        g.tenant = values.pop('tenant')
+
+
+def push_tenant(endpoint, values):
+    if 'tenant' in g and endpoint.startswith('tenant.'):
+        values.setdefault('tenant', g.tenant)
+
+
+def create_app(data=None, registry=None):
+    """Application factory.
+
+    ``data`` is the default tenant's dataset, served under ``/``; it
+    defaults to a SocialMediaData backed by the storage named in
+    DASHBOARD_STORAGE (sqlite:///path/to.db or npy:///path/to/dir), or
+    in-memory mock data when it is unset, built on first use. Every tenant in ``registry``
+    (default: ``create_registry()``) is served under ``/t/<tenant>/``.
+
+    Setting DASHBOARD_PROFILE_DIR lets a request ask for ``?profile=1``;
+    its cProfile stats are written there and named in ``X-Profile``.
+    DASHBOARD_MAX_STREAMS bounds the event streams the process serves at
+    once (every tenant together); further ones get a 503.
+    """
+    app = Flask(__name__, static_folder=None)
+    app.config['PROFILE_DIR'] = os.environ.get('DASHBOARD_PROFILE_DIR')
+    max_streams = os.environ.get('DASHBOARD_MAX_STREAMS')
+    app.extensions['streams'] = StreamLimit(None if max_streams is None else int(max_streams))
+    if registry is None:
+        registry = create_registry()
+    state = DashboardState(data, load=default_data)
+    registry.put(DEFAULT_TENANT, state, pinned=True)
+    app.extensions['dashboard'] = state
+    app.extensions['tenants'] = registry
+    app.url_value_preprocessor(pull_tenant)
+    app.url_defaults(push_tenant)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    app.add_url_rule('/assets/<path:name>', 'asset', asset_view)
+    app.register_blueprint(bp)
+    app.register_blueprint(bp, url_prefix='/t/<tenant>', name='tenant')
+    return app
+
+
+def cached_json(view):
+    """Serve a JSON view from the response cache with ETag revalidation.
+
+    The serialized body is reused until the data version changes (or the
+    day rolls over, since date ranges are relative to today), and a request
+    whose ``If-None-Match`` matches the current ETag gets a 304.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        state = current_state()
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), datetime.now().date())
+        # Tagged with the epoch, so a forked worker never serves bodies built before the fork
+        version = version_token(state.data, current_snapshot().version)
+        entry = state.cache.get(key, version)
+        result = 'hit'
+        if entry is None:
+            result = 'miss'
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = state.cache.put(key, version, response.get_data(), response.mimetype)
         
-        // Load dashboard on page load
-        loadDashboard();
-        
-        // Auto-refresh every 5 minutes
-        setInterval(loadDashboard, 300000);
-    </script>
-</body>
-</html>
-"""
+        not_modified = request.if_none_match.contains(entry.etag)
+        CACHE_RESULTS.inc(request.endpoint, 'not_modified' if not_modified and result == 'hit' else result)
+        if not_modified:
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
 
-@app.route('/')
+
+@bp.route('/')
 def dashboard():
-    """Main dashboard page."""
-    return render_template_string(HTML_TEMPLATE)
+    """Main dashboard page; the same static page serves every tenant."""
+    current_state()
+    return asset_response(asset_bundle().page, 'no-cache')
 
-@app.route('/api/stats')
-def get_stats():
-    """Get platform statistics."""
-    return jsonify(social_data.accounts)
+def asset_bundle():
+    """The page and its static assets, built once per app on first use."""
+    bundle = current_app.extensions.get('assets')
+    if bundle is None:
+        bundle = current_app.extensions['assets'] = AssetBundle()
+    return bundle
 
-@app.route('/api/analytics')
-def get_analytics():
-    """Get analytics data for charts."""
-    # Process data for charts
-    df = pd.DataFrame(social_data.analytics_data)
+def asset_response(asset, cache_control):
+    """Serve ``asset`` in the best encoding the client accepts, honouring If-None-Match."""
+    encoding = request.accept_encodings.best_match(list(asset.encodings))
+    response = current_app.response_class(asset.encodings.get(encoding, asset.body), mimetype=asset.mimetype)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{asset.etag}-{encoding}" if encoding else asset.etag)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+def asset_view(name):
+    """Hash-named static files, cacheable for a year."""
+    asset = asset_bundle().get(name)
+    if asset is None:
+        abort(404)
+    return asset_response(asset, 'public, max-age=31536000, immutable')
+
+def version_token(data, version):
+    """A data version as clients see it: ``<epoch>:<version>``, meaningful only to the dataset's process."""
+    return f'{data.epoch}:{version}'
+
+
+def parse_version_token(data, token):
+    """The data version in a client's token, or -1 for a token of another epoch; raises ValueError if malformed."""
+    epoch, _, version = token.rpartition(':')
+    version = int(version)
+    return version if epoch == data.epoch else -1
+
+
+def stats_payload(data, since=None):
+    """Account counters by platform, or with ``since`` only those changed after that version."""
+    if since is None:
+        return data.accounts
+    version, full, accounts, versions = data.accounts_since(since)
+    return {'version': version, 'full': full, 'accounts': accounts, 'versions': versions}
+
+def analytics_payload(data, granularity='day', range_arg='7', max_points=None):
+    """Chart series for every platform; raises ValueError for a bad range.
+
+    With ``max_points``, longer series are downsampled (LTTB) onto a shared
+    axis of ``max_points`` dates.
+    """
+    end = np.datetime64(datetime.now().date(), 'D')
+    start = parse_range(range_arg, granularity, end)
     
-    # Get last 7 days
-    recent_dates = pd.date_range(end=datetime.now().date(), periods=7).strftime('%m/%d').tolist()
+    label_format = '%Y-%m' if granularity == 'month' else '%m/%d'
+    grid = bucket_grid(start, end, granularity)
+    
+    with stage('query'):
+        queries = [(platform, data.rollups.query(platform, granularity, start, end)) for platform in data.platforms]
+    for _, series in queries:
+        del series['dates']
+    if max_points is not None and len(grid) > max_points and queries:
+        with stage('downsample'):
+            names = list(queries[0][1])
+            positions, values = downsample([series[name] for _, series in queries for name in names], max_points)
+        grid = grid[positions]
+        for i, (_, series) in enumerate(queries):
+            series.update(zip(names, values[i * len(names):(i + 1) * len(names)]))
+    dates = [d.item().strftime(label_format) for d in grid]
     
     platforms_data = []
-    for platform in social_data.platforms:
-        platform_data = df[df['platform'] == platform].tail(7)
+    for platform, series in queries:
         platforms_data.append({
             'name': platform,
-            'color': social_data.accounts[platform]['color'],
-            'engagement': platform_data['engagement'].tolist(),
-            'followers': social_data.accounts[platform]['followers']
+            'color': data.accounts[platform]['color'],
+            'engagement': series.pop('engagement'),
+            'followers': data.accounts[platform]['followers'],
+            'follower_counts': series.pop('followers'),
+            **series
         })
     
-    return jsonify({
-        'dates': recent_dates,
+    return {
+        'granularity': granularity,
+        'dates': dates,
         'platforms': platforms_data
-    })
+    }
+
+def posts_payload(data, limit=10, after=None, platform=None):
+    """A page of recent posts; raises ValueError for an unknown ``after`` id."""
+    if after is not None and after not in data.posts:
+        raise ValueError(f'unknown post id: {after}')
+    with stage('query'):
+        posts = data.posts.recent(limit, after, platform)
+    return [post.to_dict() for post in posts]
+
+def _local_time(value):
+    # Post timestamps are naive local time
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+def search_payload(data, text, limit=10, after=None, platform=None, since=None, until=None):
+    """Posts matching every term of ``text``, newest first; raises ValueError for a bad query."""
+    terms = tokenize(text, expand=False)
+    if not terms:
+        raise ValueError("q must contain at least one word, #hashtag or @mention")
+    if len(terms) > MAX_TERMS:
+        raise ValueError(f"q must have at most {MAX_TERMS} terms")
+    if after is not None and after not in data.posts:
+        raise ValueError(f'unknown post id: {after}')
+    try:
+        since, until = [None if value is None else _local_time(datetime.fromisoformat(value))
+                        for value in (since, until)]
+    except ValueError:
+        raise ValueError("since and until must be ISO dates or timestamps")
+    with stage('query'):
+        total, posts = data.posts.search(text, limit, after, platform, since, until)
+    return {
+        'query': sorted(terms),
+        'total': total,
+        'posts': [post.to_dict() for post in posts]
+    }
+
+def _number(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def audience_payload(data, platforms=None, granularity='day', range_arg='7'):
+    """Distinct audience and post engagement percentiles of a group of platforms.
+
+    Merged per bucket, for the whole window and per platform from the daily
+    sketches; raises ValueError for a bad range or an unknown platform.
+    """
+    end = np.datetime64(datetime.now().date(), 'D')
+    start = parse_range(range_arg, granularity, end)
+    platforms = data.platforms if platforms is None else platforms
+    unknown = [platform for platform in platforms if platform not in data.platforms]
+    if unknown:
+        raise ValueError(f"unknown platform: {unknown[0]}")
+    grid = bucket_grid(start, end, granularity)
+    with stage('sketches'):
+        merged = data.sketches.query(platforms, grid, end)
+    total = merged.pop('total')
+    by_platform = merged.pop('by_platform')
+    merged['audience'] = np.round(merged['audience'])
+    total['audience'] = np.round(total['audience'])
+    return {
+        'granularity': granularity,
+        'dates': grid.astype(str).tolist(),
+        'platforms': [{'name': platform, 'audience': _number(np.round(by_platform.get(platform, np.nan)))}
+                      for platform in platforms],
+        **{name: [_number(value) for value in values] for name, values in merged.items()},
+        'total': {name: _number(value) for name, value in total.items()}
+    }
+
+def trends_payload(data, days=30, window=7, threshold=3.0):
+    """Rolling means, follower growth and engagement anomalies per platform."""
+    end = np.datetime64(datetime.now().date(), 'D')
+    with stage('trends'):
+        trends = compute_trends(data.analytics, end, days, window, threshold=threshold)
+    dates = trends['dates'].astype(str)
+    growth = [f'followers_{name}{suffix}' for name in GROWTH_PERIODS for suffix in ('', '_pct')]
+    platforms_data = []
+    for platform in data.platforms:
+        code = data.analytics.code_for(platform)
+        platforms_data.append({
+            'name': platform,
+            'followers': _number(trends['followers'][code]),
+            **{name: _number(trends[name][code]) for name in growth},
+            'engagement_ma': trends['engagement_ma'][code],
+            'reach_ma': trends['reach_ma'][code],
+            'engagement_z': trends['engagement_z'][code],
+            'anomalies': dates[trends['anomaly'][code]].tolist(),
+        })
+    return {
+        'dates': dates.tolist(),
+        'window': window,
+        'platforms': platforms_data
+    }
+
+def int_arg(name, default, low, high):
+    """An integer query arg; raises ValueError outside ``low..high``."""
+    value = request.args.get(name, default, type=int)
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+def max_points_arg():
+    """The optional ``max_points`` query arg; raises ValueError outside 3..MAX_CHART_POINTS."""
+    if 'max_points' not in request.args:
+        return None
+    return int_arg('max_points', 0, 3, MAX_CHART_POINTS)
+
+def page_size_arg():
+    """The ``limit`` query arg clamped to 1..MAX_PAGE_SIZE."""
+    return max(1, min(request.args.get('limit', 10, type=int), MAX_PAGE_SIZE))
+
+@bp.route('/api/stats')
+@cached_json
+def get_stats():
+    """Get platform statistics.
+
+    With ``since``, a data version token the client already has (as
+    returned by /api/dashboard or a previous call), returns ``{version,
+    full, accounts, versions}`` where ``accounts`` only has the fields
+    changed since then, or every account when ``full`` (e.g. ``since=0``,
+    or a token from another server process), and ``versions`` the version
+    of each account returned.
+    """
+    if 'since' not in request.args:
+        return json_response(stats_payload(current_snapshot()))
+    data = current_state().data
+    try:
+        since = parse_version_token(data, request.args['since'])
+    except ValueError:
+        return json_response({'error': 'since must be a data version'}, 400)
+    payload = stats_payload(current_snapshot(), since)
+    payload['version'] = version_token(data, payload['version'])
+    return json_response(payload)
+
+@bp.route('/api/analytics')
+@cached_json
+def get_analytics():
+    """Get analytics data for charts.
+
+    Query args: ``granularity`` (day, week or month, default day),
+    ``range`` (e.g. 7, 30d, 12w, 6m, 1y; default 7 buckets) and
+    ``max_points`` (3..MAX_CHART_POINTS) to downsample longer series.
+    """
+    try:
+        payload = analytics_payload(current_snapshot(), request.args.get('granularity', 'day'),
+                                    request.args.get('range', '7'), max_points_arg())
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    return json_response(payload)
 
-@app.route('/api/posts')
+@bp.route('/api/posts')
+@cached_json
 def get_posts():
-    """Get recent posts."""
-    return jsonify(social_data.recent_posts[:10])
+    """Get recent posts, newest first.
+
+    Query args: ``limit`` (default 10), ``platform`` and ``after``, the id of
+    the last post of the previous page.
+    """
+    try:
+        payload = posts_payload(current_snapshot(), page_size_arg(), request.args.get('after', type=int),
+                                request.args.get('platform'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    return json_response(payload)
+
+@bp.route('/api/trends')
+@cached_json
+def get_trends():
+    """Get rolling means, follower growth and engagement anomalies.
+
+    Query args: ``days`` of series to return (default 30), the rolling
+    ``window`` in days (default 7) and the anomaly z-score ``threshold``
+    (default 3).
+    """
+    try:
+        threshold = request.args.get('threshold', 3.0, type=float)
+        if not threshold > 0:
+            raise ValueError("threshold must be positive")
+        payload = trends_payload(current_snapshot(), int_arg('days', 30, 1, 365), int_arg('window', 7, 1, 90),
+                                 threshold)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    return json_response(payload)
+
+@bp.route('/api/audience')
+@cached_json
+def get_audience():
+    """Get the distinct audience and post engagement percentiles of a group of platforms.
+
+    Query args: ``platforms`` (comma-separated, default all) and the
+    ``granularity`` and ``range`` of /api/analytics. Audiences are
+    HyperLogLog estimates and percentiles come from t-digests, merged from
+    per (platform, day) sketches.
+    """
+    platforms = request.args.get('platforms')
+    try:
+        payload = audience_payload(current_snapshot(), platforms.split(',') if platforms else None,
+                                   request.args.get('granularity', 'day'), request.args.get('range', '7'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    return json_response(payload)
+
+@bp.route('/api/dashboard')
+@cached_json
+def get_dashboard():
+    """Get stats, analytics, recent posts and trends in one response for first paint.
+
+    Takes the query args of /api/analytics and /api/posts. The parts are
+    computed concurrently on the shared thread pool.
+    """
+    data = current_snapshot()
+    version = data.version
+    
+    def submit(function, *args):
+        # Run in a copy of this context so stages are attributed to this route
+        return fanout.submit(contextvars.copy_context().run, function, *args)
+    
+    try:
+        parts = {
+            'stats': submit(stats_payload, data),
+            'analytics': submit(analytics_payload, data, request.args.get('granularity', 'day'),
+                                request.args.get('range', '7'), max_points_arg()),
+            'posts': submit(posts_payload, data, page_size_arg(), request.args.get('after', type=int),
+                            request.args.get('platform')),
+            'trends': submit(trends_payload, data, 7),
+        }
+        payload = {name: future.result() for name, future in parts.items()}
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    payload['version'] = version_token(current_state().data, version)
+    return json_response(payload)
+
+@bp.route('/api/posts/top')
+@cached_json
+def get_top_posts():
+    """Get the posts with the highest ``by`` metric (default likes)."""
+    metric = request.args.get('by', 'likes')
+    if metric not in METRICS:
+        return json_response({'error': f"by must be one of {', '.join(METRICS)}"}, 400)
+    limit = page_size_arg()
+    posts = current_snapshot().posts.top(metric, limit, request.args.get('platform'))
+    return json_response([post.to_dict() for post in posts])
+
+@bp.route('/api/posts/search')
+@cached_json
+def search_posts():
+    """Search post content for words, #hashtags and @mentions, newest first.
+
+    Every term of ``q`` must match. Also takes ``platform``, ``since`` and
+    ``until`` (ISO dates or timestamps, until exclusive) and the ``limit``
+    and ``after`` paging args of /api/posts. ``total`` counts all matches.
+    """
+    try:
+        payload = search_payload(current_snapshot(), request.args.get('q', ''), page_size_arg(),
+                                 request.args.get('after', type=int), request.args.get('platform'),
+                                 request.args.get('since'), request.args.get('until'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    return json_response(payload)
+
+@bp.route('/api/export')
+def export_data():
+    """Stream the analytics history or posts as a download.
+
+    Query args: ``data`` (analytics or posts), ``format`` (csv, ndjson or
+    parquet) and optional ``compress`` (gzip or zstd).
+    """
+    dataset = request.args.get('data', 'analytics')
+    fmt = request.args.get('format', 'csv')
+    compression = request.args.get('compress') or None
+    try:
+        chunks = export.export(current_snapshot(), dataset, fmt, compression)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    name, mimetype = export.filename(dataset, fmt, compression)
+    return current_app.response_class(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{name}"',
+        'Cache-Control': 'no-store'
+    })
+
+def parse_scheduled_post(item, platforms):
+    """Validate one scheduled post and return ``(platform, content, due)``.
+
+    ``at`` is an ISO timestamp or epoch seconds; otherwise the post is due
+    ``delay`` seconds from now (default 0).
+    """
+    if not isinstance(item, dict):
+        raise ValueError("each post must be a JSON object")
+    platform = item.get('platform')
+    if platform not in platforms:
+        raise ValueError(f"unknown platform: {platform}")
+    content = item.get('content')
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("content is required")
+    try:
+        if 'at' in item:
+            at = item['at']
+            if isinstance(at, bool):
+                raise TypeError(at)
+            due = float(at) if isinstance(at, (int, float)) else datetime.fromisoformat(at).timestamp()
+        else:
+            delay = item.get('delay', 0)
+            if isinstance(delay, bool):
+                raise TypeError(delay)
+            due = time.time() + float(delay)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("at must be an ISO timestamp or epoch seconds and delay a number")
+    try:
+        # Due times are shown as local timestamps, so they must be representable as one
+        if not math.isfinite(due):
+            raise ValueError(due)
+        datetime.fromtimestamp(due)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError("at and delay must give a finite time within the supported date range")
+    return platform, content, due
+
+@bp.route('/api/schedule', methods=['POST'])
+def schedule_posts():
+    """Schedule posts given as one JSON object or a list of them.
+
+    Each has ``platform``, ``content`` and either ``at`` or ``delay``.
+    """
+    state = current_state()
+    body = request.get_json(silent=True)
+    items = body if isinstance(body, list) else [body]
+    if len(items) > MAX_SCHEDULE_BATCH:
+        return json_response({'error': f'at most {MAX_SCHEDULE_BATCH} posts per request'}, 400)
+    try:
+        posts = [parse_scheduled_post(item, state.data.platforms) for item in items]
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    jobs = state.scheduler.schedule_many(posts)
+    return json_response({'posts': [job.to_dict() for job in jobs]}, 201)
+
+@bp.route('/api/schedule')
+def get_schedule():
+    """Get pending scheduled posts, soonest first (``limit``, default 10)."""
+    scheduler = current_state().scheduler
+    jobs = scheduler.pending(page_size_arg())
+    return json_response({'pending': scheduler.count(), 'posts': [job.to_dict() for job in jobs]})
+
+@bp.route('/api/schedule/<int:job_id>', methods=['GET', 'DELETE'])
+def scheduled_post(job_id):
+    """Get a scheduled post, or cancel it with DELETE."""
+    scheduler = current_state().scheduler
+    job = scheduler.get(job_id)
+    if job is None:
+        return json_response({'error': f'unknown scheduled post: {job_id}'}, 404)
+    if request.method == 'DELETE' and not scheduler.cancel(job_id):
+        return json_response({'error': f'scheduled post {job_id} is already {job.status}'}, 409)
+    # Read again: a cancel may have changed the job
+    return json_response(scheduler.get(job_id).to_dict())
+
+@bp.route('/api/stream')
+def stream():
+    """Server-sent events with account, post and analytics deltas."""
+    state = current_state()
+    streams = current_app.extensions['streams']
+    if not streams.acquire():
+        # Every open stream holds a server thread; the page polls instead
+        response = json_response({'error': 'too many open streams'}, 503)
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+        return response
+    subscription = state.broadcaster.subscribe()
+    
+    def events():
+        try:
+            yield b"retry: 5000\n\n"
+            yield format_event('hello', {'version': version_token(state.data, state.data.version)})
+            yield from subscription.events()
+        finally:
+            state.broadcaster.unsubscribe(subscription)
+    
+    response = current_app.response_class(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs even when the client goes away before the first event
+    response.call_on_close(lambda: state.broadcaster.unsubscribe(subscription))
+    response.call_on_close(streams.release)
+    return response
+
+# Default app and its state, for `flask run`, tests and scripts
+app = create_app()
+response_cache = app.extensions['dashboard'].cache
+broadcaster = app.extensions['dashboard'].broadcaster
+
+def __getattr__(name):
+    # social_data is built on first access rather than at import
+    if name == 'social_data':
+        return app.extensions['dashboard'].data
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def main():
-    """Main execution function."""
+    """Run the development server; use serve.py in production."""
     print("Social Media Dashboard")
     print("=" * 25)
     
-    print("Starting web server...")
+    print("Starting development server...")
     print("Open http://localhost:5000 in your browser")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000)
 
 if __name__ == "__main__":
     main()
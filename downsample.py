@@ -0,0 +1,77 @@
+"""
+Downsample
+Largest-Triangle-Three-Buckets downsampling of chart series, all rows at once.
+"""
+
+import numpy as np
+
+
+def bucket_edges(n, max_points):
+    """Boundaries of the ``max_points - 2`` buckets between the first and last of ``n`` points."""
+    edges = (np.arange(max_points - 1) * (n - 2) / (max_points - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    return edges
+
+
+def lttb(values, max_points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps in each row.
+
+    ``values`` is a ``(series, n)`` grid sampled at evenly spaced x. The
+    first and last points are always kept; the points in between are split
+    into ``max_points - 2`` buckets and each bucket keeps the point forming
+    the largest triangle with the point kept before it and the mean of the
+    next bucket. Buckets are visited in order, but each step covers every
+    series and every point of the bucket in one vectorized pass. NaN points
+    are only kept when a whole bucket is empty. Returns a
+    ``(series, max_points)`` int array (or all indices when ``n`` is small
+    enough).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rows, n = values.shape
+    if max_points >= n or max_points < 3:
+        return np.tile(np.arange(n), (rows, 1))
+
+    edges = bucket_edges(n, max_points)
+    kept = np.empty((rows, max_points), dtype=np.int64)
+    kept[:, 0] = 0
+    kept[:, -1] = n - 1
+    row_index = np.arange(rows)
+    with np.errstate(invalid='ignore'):
+        for bucket in range(max_points - 2):
+            lo, hi = edges[bucket], edges[bucket + 1]
+            # The next bucket's centroid; the last bucket looks at the final point
+            next_lo, next_hi = (hi, edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+            next_x = (next_lo + next_hi - 1) / 2
+            a = kept[:, bucket]
+            ax, ay = a[:, None], values[row_index, a][:, None]
+            next_y = _nanmean(values[:, next_lo:next_hi])[:, None]
+            next_y = np.where(np.isnan(next_y), ay, next_y)
+            x = np.arange(lo, hi)
+            areas = np.abs((ax - next_x) * (values[:, lo:hi] - ay) - (ax - x) * (next_y - ay))
+            areas[np.isnan(areas)] = -1.0
+            kept[:, bucket + 1] = lo + np.argmax(areas, axis=1)
+    return kept
+
+
+def _nanmean(block):
+    valid = ~np.isnan(block)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, block, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def downsample(values, max_points):
+    """Reduce every row of a ``(series, n)`` grid to ``max_points`` points on a shared axis.
+
+    The buckets are the same for every row, so each row keeps its LTTB
+    point of each bucket and all rows are labelled with the bucket's first
+    position. Returns ``(positions, values)``: the ``max_points`` indices
+    into the original axis and the ``(series, max_points)`` kept values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[1]
+    if max_points >= n or max_points < 3:
+        return np.arange(n), values
+    positions = np.concatenate([[0], bucket_edges(n, max_points)[:-1], [n - 1]])
+    return positions, np.take_along_axis(values, lttb(values, max_points), axis=1)
@@ -0,0 +1,204 @@
+"""
+Export
+Streaming CSV, NDJSON and Parquet exports of the analytics history and posts.
+"""
+
+import csv
+import functools
+import importlib
+import io
+import zlib
+
+import numpy as np
+
+from posts_index import Post, from_epoch_us
+from serialization import dumps
+
+DATASETS = ('analytics', 'posts')
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+COMPRESSIONS = {
+    'gzip': ('.gz', 'application/gzip'),
+    'zstd': ('.zst', 'application/zstd'),
+}
+ANALYTICS_FIELDS = ('date', 'platform', 'followers', 'engagement', 'reach', 'posts')
+CHUNK_ROWS = 50000
+
+
+@functools.cache
+def optional_module(name):
+    """Import an optional dependency on first use, or None if it is not installed.
+
+    pyarrow alone takes longer to import than the rest of the app, so it
+    is only paid for by the first Parquet export.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def check(dataset, fmt, compression=None):
+    """Raise ValueError unless the export can be produced here."""
+    if dataset not in DATASETS:
+        raise ValueError(f"data must be one of {', '.join(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == 'parquet' and optional_module('pyarrow.parquet') is None:
+        raise ValueError("parquet export requires pyarrow")
+    if compression is not None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compress must be one of {', '.join(COMPRESSIONS)}")
+        if compression == 'zstd' and optional_module('zstandard') is None:
+            raise ValueError("zstd compression requires zstandard")
+        if fmt == 'parquet':
+            raise ValueError("parquet is compressed internally; omit compress")
+
+
+def analytics_chunks(store, chunk_rows=CHUNK_ROWS):
+    """Yield the analytics history as dicts of column arrays, ``chunk_rows`` at a time.
+
+    The store's arrays are captured up front; appends replace rather than
+    modify them, so the export is a consistent snapshot.
+    """
+    platforms = np.array(store.platforms, dtype=object)
+    codes, dates, columns = store.codes, store.dates, dict(store.columns)
+    for start in range(0, len(codes), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        yield {
+            'date': dates[rows],
+            'platform': platforms[codes[rows]],
+            **{name: columns[name][rows] for name in ANALYTICS_FIELDS[2:]},
+        }
+
+
+def posts_chunks(index, chunk_rows=CHUNK_ROWS):
+    """Yield posts newest first as dicts of column lists, paging with the index cursor."""
+    after = None
+    while True:
+        page = index.recent(chunk_rows, after)
+        if not page:
+            return
+        after = page[-1].id
+        yield {field: [getattr(post, field) for post in page] for field in Post.FIELDS}
+
+
+def _columns(dataset):
+    return ANALYTICS_FIELDS if dataset == 'analytics' else Post.FIELDS
+
+
+def _text_columns(chunk):
+    # Dates as ISO strings and timestamps as ISO datetimes, as in the API
+    chunk = dict(chunk)
+    if 'date' in chunk:
+        chunk['date'] = chunk['date'].astype(str)
+    if 'timestamp' in chunk:
+        chunk['timestamp'] = [from_epoch_us(value) for value in chunk['timestamp']]
+    return {name: values.tolist() if isinstance(values, np.ndarray) else values
+            for name, values in chunk.items()}
+
+
+def encode_csv(chunks, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(fields)
+    for chunk in chunks:
+        columns = _text_columns(chunk)
+        writer.writerows(zip(*(columns[name] for name in fields)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(chunks, fields):
+    for chunk in chunks:
+        columns = _text_columns(chunk)
+        yield b''.join(dumps(dict(zip(fields, row))) + b'\n'
+                       for row in zip(*(columns[name] for name in fields)))
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out whatever was written since the last drain."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def encode_parquet(chunks, fields):
+    pyarrow = optional_module('pyarrow')
+    parquet = optional_module('pyarrow.parquet')
+    sink = _Sink()
+    writer = None
+    for chunk in chunks:
+        columns = dict(chunk)
+        if 'timestamp' in columns:
+            columns['timestamp'] = np.array(columns['timestamp'], dtype='datetime64[us]')
+        table = pyarrow.table({name: columns[name] for name in fields})
+        if writer is None:
+            writer = parquet.ParquetWriter(sink, table.schema, compression='zstd')
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson, 'parquet': encode_parquet}
+
+
+def compress(stream, compression):
+    """Compress a byte stream chunk by chunk."""
+    if compression == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    else:
+        compressor = optional_module('zstandard').ZstdCompressor().compressobj()
+    for data in stream:
+        data = compressor.compress(data)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(data, dataset, fmt, compression=None, chunk_rows=CHUNK_ROWS):
+    """Yield the encoded (and optionally compressed) export of ``dataset``.
+
+    Only one chunk of ``chunk_rows`` rows is materialized at a time, so
+    memory use does not grow with the size of the export.
+    """
+    check(dataset, fmt, compression)
+    if dataset == 'analytics':
+        chunks = analytics_chunks(data.analytics, chunk_rows)
+    else:
+        chunks = posts_chunks(data.posts, chunk_rows)
+    stream = (part for part in ENCODERS[fmt](chunks, _columns(dataset)) if part)
+    return compress(stream, compression) if compression else stream
+
+
+def filename(dataset, fmt, compression=None):
+    """The download name and mimetype of an export."""
+    if compression:
+        suffix, mimetype = COMPRESSIONS[compression]
+        return f"{dataset}.{fmt}{suffix}", mimetype
+    return f"{dataset}.{fmt}", FORMATS[fmt]
@@ -0,0 +1,162 @@
+"""
+Metrics
+Low-overhead counters and histograms rendered in the Prometheus text format.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import has_request_context, request
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric family with fixed label names."""
+
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self):
+        """Yield ``(name, labels, value)`` lines of the exposition."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        lines.extend(f'{name}{labels} {_number(value)}' for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonic count per label set."""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram per label set.
+
+    An observation is one bisect and two additions under a lock, cheap
+    enough to record on every request and stage.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the wall time spent in the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', _labels(self.labelnames, labels, [('le', _number(bound))]), cumulative
+            yield f'{self.name}_sum', _labels(self.labelnames, labels), total
+            yield f'{self.name}_count', _labels(self.labelnames, labels), cumulative
+
+
+class Gauge(Metric):
+    """Point-in-time values, read from ``collect()`` at scrape time."""
+
+    type = 'gauge'
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+def render(metrics):
+    """Render metric families in the Prometheus text exposition format."""
+    return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REQUEST_SECONDS = Histogram('dashboard_request_duration_seconds',
+                            'Time to build a response, by route and status.', ('route', 'status'))
+STAGE_SECONDS = Histogram('dashboard_stage_duration_seconds',
+                          'Time spent in one stage of a request, by route and stage.', ('route', 'stage'))
+RESPONSE_BYTES = Histogram('dashboard_response_bytes',
+                           'Size of non-streamed response bodies, by route.', ('route',), SIZE_BUCKETS)
+CACHE_RESULTS = Counter('dashboard_response_cache_requests_total',
+                        'Response cache lookups by result (hit, miss or not_modified).', ('route', 'result'))
+REQUEST_METRICS = (REQUEST_SECONDS, STAGE_SECONDS, RESPONSE_BYTES, CACHE_RESULTS)
+
+
+def current_route():
+    """The endpoint of the current request, or '' outside one."""
+    return (request.endpoint or '') if has_request_context() else ''
+
+
+def stage(name):
+    """Time a stage of the current request: ``with stage('encode'): ...``."""
+    return STAGE_SECONDS.time(current_route(), name)
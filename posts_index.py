@@ -0,0 +1,435 @@
+"""
+Posts Index
+Compact post records and the indexes used for pagination and top-K queries.
+"""
+
+import sys
+import threading
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from search_index import SearchIndex, tokenize
+
+METRICS = ('likes', 'comments', 'shares', 'engagement_rate')
+
+# Ids are packed into the low 32 bits of the index keys.
+MAX_POST_ID = 2 ** 32 - 1
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(value):
+    """Convert a naive ISO timestamp or datetime to integer epoch microseconds."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(value):
+    """Convert integer epoch microseconds back to a naive ISO timestamp."""
+    return (_EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+class Post:
+    """One post, stored without a per-instance dict.
+
+    Timestamps are integer epoch microseconds and platform names are
+    interned, so every post of a platform shares one string. The JSON shape
+    with an ISO timestamp is produced only by ``to_dict``.
+    """
+
+    FIELDS = ('id', 'platform', 'content', 'timestamp', 'likes', 'comments', 'shares', 'engagement_rate')
+    __slots__ = FIELDS
+
+    def __init__(self, id, platform, content, timestamp, likes, comments, shares, engagement_rate):
+        self.id = id
+        self.platform = sys.intern(platform)
+        self.content = content
+        self.timestamp = to_epoch_us(timestamp)
+        self.likes = likes
+        self.comments = comments
+        self.shares = shares
+        self.engagement_rate = engagement_rate
+
+    @classmethod
+    def from_dict(cls, post):
+        """Build a Post from the JSON shape; ``id`` may be missing.
+
+        Raises ValueError for an id outside ``0..MAX_POST_ID``.
+        """
+        post_id = post.get('id')
+        if post_id is not None and not (isinstance(post_id, int) and 0 <= post_id <= MAX_POST_ID):
+            raise ValueError(f"post id must be an integer between 0 and {MAX_POST_ID}")
+        return cls(**dict({'id': None}, **{field: post[field] for field in cls.FIELDS if field in post}))
+
+    def to_dict(self):
+        """Return the post in its JSON shape."""
+        post = {field: getattr(self, field) for field in self.FIELDS}
+        post['timestamp'] = from_epoch_us(self.timestamp)
+        return post
+
+    def __eq__(self, other):
+        if not isinstance(other, Post):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+
+    def __repr__(self):
+        return f"Post(id={self.id!r}, platform={self.platform!r}, timestamp={from_epoch_us(self.timestamp)!r})"
+
+
+# Batches larger than this are appended and re-sorted (Timsort merges the
+# already sorted runs) instead of being inserted one by one.
+_BULK_INSERT = 64
+
+# Keys and posts are held in chunks of about this many, so a copy shares
+# every chunk and a write copies only the chunks it changes.
+_CHUNK = 1024
+_SHARD_BITS = 10
+
+
+def _insert(keys, new_keys):
+    if len(new_keys) > _BULK_INSERT:
+        keys.extend(new_keys)
+        keys.sort()
+    else:
+        for key in new_keys:
+            insort(keys, key)
+
+
+class _SortedKeys:
+    """Sorted keys in chunks, shared with copies until a write copies the chunk it changes.
+
+    ``_maxes`` holds the last key of every chunk, so a key's chunk is
+    found by bisecting it; a chunk that grows past twice ``_CHUNK`` is
+    split and an empty one dropped. ``_owned`` holds the ids of the chunks
+    this copy made itself and may change in place.
+    """
+
+    __slots__ = ('_chunks', '_maxes', '_owned', '_len')
+
+    def __init__(self):
+        self._chunks = []
+        self._maxes = []
+        self._owned = set()
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def copy(self):
+        keys = _SortedKeys.__new__(_SortedKeys)
+        keys._chunks = list(self._chunks)
+        keys._maxes = list(self._maxes)
+        keys._owned = set()
+        keys._len = self._len
+        return keys
+
+    def _chunk(self, key):
+        # Keys after every chunk's last one belong to the last chunk
+        return bisect_left(self._maxes, key, 0, len(self._maxes) - 1)
+
+    def _writable(self, i):
+        chunk = self._chunks[i]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[i] = list(chunk)
+            self._owned.add(id(chunk))
+        return chunk
+
+    def insert(self, keys):
+        """Insert keys that are not present yet."""
+        if not keys:
+            return
+        if not self._chunks:
+            self._chunks, self._maxes = [[]], [None]
+            self._owned.add(id(self._chunks[0]))
+        groups = {}
+        for key in keys:
+            groups.setdefault(self._chunk(key), []).append(key)
+        # Right to left, so splitting a chunk does not move the ones still to do
+        for i in sorted(groups, reverse=True):
+            chunk = self._writable(i)
+            _insert(chunk, groups[i])
+            self._maxes[i] = chunk[-1]
+            if len(chunk) > 2 * _CHUNK:
+                pieces = [chunk[j:j + _CHUNK] for j in range(0, len(chunk), _CHUNK)]
+                self._chunks[i:i + 1] = pieces
+                self._maxes[i:i + 1] = [piece[-1] for piece in pieces]
+                self._owned.discard(id(chunk))
+                self._owned.update(id(piece) for piece in pieces)
+        self._len += len(keys)
+
+    def remove(self, key):
+        """Remove ``key`` if present."""
+        if not self._chunks:
+            return
+        i = self._chunk(key)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j < len(chunk) and chunk[j] == key:
+            chunk = self._writable(i)
+            del chunk[j]
+            self._len -= 1
+            if chunk:
+                self._maxes[i] = chunk[-1]
+            else:
+                del self._chunks[i], self._maxes[i]
+                self._owned.discard(id(chunk))
+
+    def last(self, limit, below=None):
+        """Up to ``limit`` of the largest keys, or of those smaller than ``below``, largest first."""
+        if not self._chunks:
+            return []
+        if below is None:
+            i = len(self._chunks) - 1
+            end = len(self._chunks[i])
+        else:
+            i = self._chunk(below)
+            end = bisect_left(self._chunks[i], below)
+        result = []
+        while len(result) < limit:
+            chunk = self._chunks[i]
+            result.extend(reversed(chunk[max(0, end - (limit - len(result))):end]))
+            i -= 1
+            if i < 0:
+                break
+            end = len(self._chunks[i])
+        return result
+
+
+class _PostTable(Mapping):
+    """Posts by id in shards of consecutive ids, shared with copies until a write copies its shard."""
+
+    __slots__ = ('_shards', '_owned', '_len')
+
+    def __init__(self):
+        self._shards = {}
+        self._owned = set()
+        self._len = 0
+
+    def __getitem__(self, post_id):
+        return self._shards[post_id >> _SHARD_BITS][post_id]
+
+    def __contains__(self, post_id):
+        shard = self._shards.get(post_id >> _SHARD_BITS)
+        return shard is not None and post_id in shard
+
+    def __iter__(self):
+        for shard in self._shards.values():
+            yield from shard
+
+    def __len__(self):
+        return self._len
+
+    def copy(self):
+        table = _PostTable.__new__(_PostTable)
+        table._shards = dict(self._shards)
+        table._owned = set()
+        table._len = self._len
+        return table
+
+    def put(self, post):
+        """Add ``post`` or replace the one with its id."""
+        number = post.id >> _SHARD_BITS
+        shard = self._shards.get(number)
+        if number not in self._owned:
+            shard = self._shards[number] = {} if shard is None else dict(shard)
+            self._owned.add(number)
+        self._len += post.id not in shard
+        shard[post.id] = post
+
+
+class _SharedSearch:
+    """The search index shared by a PostIndex and its copies, built on first use.
+
+    Until then, ``base`` is the index whose posts become the first
+    documents, and once it has been copied ``journal`` holds the batches
+    the copies committed, in order, with ``count`` documents in all. The
+    index built later numbers every document as if it had been kept up to
+    date from the start.
+    """
+
+    __slots__ = ('index', 'base', 'journal', 'count', 'lock')
+
+    def __init__(self, base):
+        self.index = None
+        self.base = base
+        self.journal = None
+        self.count = None
+        self.lock = threading.Lock()
+
+
+class PostIndex:
+    """Post records keyed by id with maintained orderings.
+
+    Keys ordered by ``(timestamp, id)`` are kept sorted overall and per
+    platform, and keys ordered by ``(value, id)`` per metric, so new posts
+    are inserted in place and no query ever sorts the whole collection.
+    Integer fields and the id are packed into a single int key (ids must
+    fit in 32 bits) to keep the per-post index overhead small.
+
+    ``copy`` gives a writable copy while readers keep using the original;
+    posts and keys are held in chunks the copies share, so a copy costs a
+    pointer per chunk and a write copies only the chunks it changes. The
+    copies share one full-text index, built on the first search: a copy's
+    posts are indexed (or, before then, numbered) by ``commit`` and each
+    copy searches the index as of its own last commit.
+    """
+
+    def __init__(self, posts=()):
+        self.posts = _PostTable()
+        self._by_time = _SortedKeys()
+        self._by_platform = {}
+        self._by_metric = {metric: _SortedKeys() for metric in METRICS}
+        self._search = _SharedSearch(self)
+        self._search_docs = None
+        self._uncommitted = None
+        self.add(posts)
+
+    def __len__(self):
+        return len(self.posts)
+
+    def __contains__(self, post_id):
+        return post_id in self.posts
+
+    @staticmethod
+    def _time_key(post):
+        return post.timestamp << 32 | post.id
+
+    @staticmethod
+    def _metric_key(post, metric):
+        # One key type per column: mixing ints and tuples in a column fails to sort
+        if metric == 'engagement_rate':
+            return (float(post.engagement_rate), post.id)
+        return int(getattr(post, metric)) << 32 | post.id
+
+    @staticmethod
+    def _key_id(key):
+        return key[1] if isinstance(key, tuple) else key & 0xFFFFFFFF
+
+    def add(self, posts):
+        """Insert or replace Post records, which must already carry an ``id``."""
+        posts = list(posts)
+        for post in posts:
+            if post.id in self.posts:
+                self._discard(self.posts[post.id])
+            self.posts.put(post)
+
+        self._by_time.insert([self._time_key(post) for post in posts])
+        by_platform = {}
+        for post in posts:
+            by_platform.setdefault(post.platform, []).append(self._time_key(post))
+        for platform, keys in by_platform.items():
+            if platform not in self._by_platform:
+                self._by_platform[platform] = _SortedKeys()
+            self._by_platform[platform].insert(keys)
+        for metric, keys in self._by_metric.items():
+            keys.insert([self._metric_key(post, metric) for post in posts])
+        if self._uncommitted is None:
+            self._index(posts)
+        else:
+            self._uncommitted.extend(posts)
+
+    def _index(self, posts):
+        shared = self._search
+        with shared.lock:
+            if shared.index is not None:
+                shared.index.add(posts)
+                self._search_docs = shared.index.count
+            elif shared.journal is not None:
+                shared.journal.append(posts)
+                shared.count += len(posts)
+                self._search_docs = shared.count
+
+    def copy(self):
+        """A copy to add posts to without changing this index; publish it with ``commit``."""
+        shared = self._search
+        with shared.lock:
+            if shared.index is None and shared.journal is None:
+                # Copied indexes are never written again, so this one's posts are the first documents
+                shared.journal = []
+                shared.count = self._search_docs = len(self.posts)
+        index = PostIndex.__new__(PostIndex)
+        index.posts = self.posts.copy()
+        index._by_time = self._by_time.copy()
+        index._by_platform = {platform: keys.copy() for platform, keys in self._by_platform.items()}
+        index._by_metric = {metric: keys.copy() for metric, keys in self._by_metric.items()}
+        index._search = self._search
+        index._search_docs = self._search_docs
+        index._uncommitted = []
+        return index
+
+    def commit(self):
+        """Make the posts added to a copy searchable, before readers are given the copy."""
+        if self._uncommitted is not None:
+            posts, self._uncommitted = self._uncommitted, None
+            self._index(posts)
+
+    def _discard(self, post):
+        self._by_time.remove(self._time_key(post))
+        self._by_platform[post.platform].remove(self._time_key(post))
+        for metric, keys in self._by_metric.items():
+            keys.remove(self._metric_key(post, metric))
+
+    @property
+    def search_index(self):
+        """The full-text SearchIndex, built on first use and then kept up to date."""
+        shared = self._search
+        with shared.lock:
+            if shared.index is None:
+                index = SearchIndex(list(shared.base.posts.values()))
+                if shared.journal is None:
+                    shared.base._search_docs = index.count
+                for posts in shared.journal or ():
+                    index.add(posts)
+                shared.index, shared.base, shared.journal = index, None, None
+            return shared.index
+
+    def search(self, text, limit=10, after=None, platform=None, since=None, until=None):
+        """Return ``(total, posts)``: how many posts match every term of ``text``, and a page of them.
+
+        Posts are newest first, filtered to ``platform`` and to timestamps
+        in ``[since, until)`` when given, and paged with ``after`` as in
+        ``recent``. The total ignores ``after``.
+        """
+        before = None
+        if after is not None:
+            cursor = self.posts[after]
+            before = (cursor.timestamp, cursor.id)
+        index = self.search_index
+        total, ids = index.search(
+            tokenize(text, expand=False), platform, None if since is None else to_epoch_us(since),
+            None if until is None else to_epoch_us(until), limit, before, self._search_docs)
+        return total, [self.posts[post_id] for post_id in ids]
+
+    def recent(self, limit=10, after=None, platform=None):
+        """Return up to ``limit`` posts, newest first.
+
+        ``after`` is the id of the last post of the previous page; the page
+        continues strictly after it in the same ordering.
+        """
+        keys = self._by_time if platform is None else self._by_platform.get(platform)
+        if keys is None:
+            return []
+        below = None if after is None else self._time_key(self.posts[after])
+        return [self.posts[self._key_id(key)] for key in keys.last(limit, below)]
+
+    def top(self, metric, limit=10, platform=None):
+        """Return the ``limit`` posts with the highest ``metric``."""
+        if metric not in self._by_metric:
+            raise KeyError(metric)
+        result = []
+        for key in reversed(self._by_metric[metric]):
+            post = self.posts[self._key_id(key)]
+            if platform is None or post.platform == platform:
+                result.append(post)
+                if len(result) == limit:
+                    break
+        return result
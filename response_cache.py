@@ -0,0 +1,65 @@
+"""
+Response Cache
+Versioned cache of serialized API responses with strong ETags.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """Serialized body of one response together with its ETag."""
+
+    __slots__ = ('version', 'body', 'etag', 'mimetype')
+
+    def __init__(self, version, body, mimetype):
+        self.version = version
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """LRU of serialized responses, each valid for a single data version.
+
+    Entries are never invalidated eagerly: a lookup simply ignores an entry
+    built for an older version, so bumping the data version is all it takes
+    to invalidate every endpoint at once.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """Return the entry for ``key`` if it was built for ``version``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype='application/json'):
+        """Store a freshly serialized body and return its entry."""
+        entry = CachedResponse(version, body, mimetype)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,268 @@
+"""
+Rollups
+Incrementally maintained day/week/month aggregates of the analytics history.
+"""
+
+import copy
+import re
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+GRANULARITIES = ('day', 'week', 'month')
+PERCENTILES = (50, 90, 99)
+SERIES = ('reach', 'posts', 'engagement', 'engagement_p50', 'engagement_p90', 'engagement_p99', 'followers')
+MAX_RANGE_DAYS = 3660
+
+_RANGE_RE = re.compile(r'^(\d+)([dwmy]?)$')
+# Fewest days a range unit spans, to reject huge ranges before any date arithmetic
+_MIN_UNIT_DAYS = {'d': 1, 'w': 7, 'm': 28, 'y': 365}
+
+
+def bucket_starts(dates, granularity):
+    """Map ``datetime64[D]`` dates to the first day of their bucket."""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if granularity == 'day':
+        return dates
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday.
+        return dates - (dates.astype(np.int64) + 3) % 7
+    if granularity == 'month':
+        return dates.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"unknown granularity: {granularity}")
+
+
+def bucket_grid(start, end, granularity):
+    """Return every bucket start between the buckets of ``start`` and ``end``."""
+    first, last = bucket_starts([start, end], granularity)
+    if granularity == 'month':
+        return np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    step = 7 if granularity == 'week' else 1
+    return np.arange(first, last + 1, step)
+
+
+def parse_range(value, granularity, end):
+    """Resolve a ``range`` argument to the first date it covers.
+
+    Accepts ``<n>d``, ``<n>w``, ``<n>m`` or ``<n>y``; a bare number means
+    ``n`` buckets of the requested granularity.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    match = _RANGE_RE.match(str(value).strip().lower())
+    if not match or int(match.group(1)) < 1:
+        raise ValueError("range must look like 7, 30d, 12w, 6m or 1y")
+    n, unit = int(match.group(1)), match.group(2)
+    if not unit:
+        unit = granularity[0]
+    if (n - 1) * _MIN_UNIT_DAYS[unit] > MAX_RANGE_DAYS:
+        raise ValueError(f"range may span at most {MAX_RANGE_DAYS} days")
+    end = np.datetime64(end, 'D')
+    if unit == 'd':
+        start = end - (n - 1)
+    elif unit == 'w':
+        start = bucket_starts([end], 'week')[0] - 7 * (n - 1)
+    else:
+        months = n * 12 if unit == 'y' else n
+        start = (end.astype('datetime64[M]') - (months - 1)).astype('datetime64[D]')
+    if end - start > MAX_RANGE_DAYS:
+        raise ValueError(f"range may span at most {MAX_RANGE_DAYS} days")
+    return start
+
+
+class Bucket:
+    """Aggregates of one platform over one time bucket."""
+
+    __slots__ = ('reach', 'posts', 'values', 'followers', 'followers_date',
+                 'engagement', 'engagement_p50', 'engagement_p90', 'engagement_p99')
+
+    def __init__(self):
+        self.reach = 0
+        self.posts = 0
+        self.values = np.empty(0, dtype=np.float64)
+        self.followers = None
+        self.followers_date = None
+
+    @classmethod
+    def summarized(cls, values, reach, posts, followers, followers_date, engagement, percentiles):
+        """A bucket whose summaries were computed elsewhere; ``values`` must be sorted."""
+        bucket = cls.__new__(cls)
+        bucket.values = values
+        bucket.reach = reach
+        bucket.posts = posts
+        bucket.followers = followers
+        bucket.followers_date = followers_date
+        bucket.engagement = engagement
+        bucket.engagement_p50, bucket.engagement_p90, bucket.engagement_p99 = percentiles
+        return bucket
+
+    def add(self, dates, followers, engagement, reach, posts):
+        """Fold a group of rows into the bucket and refresh its summaries."""
+        self.reach += int(reach.sum())
+        self.posts += int(posts.sum())
+        self.values = np.sort(np.concatenate([self.values, engagement]))
+        latest = int(np.argmax(dates))
+        if self.followers_date is None or dates[latest] >= self.followers_date:
+            self.followers = int(followers[latest])
+            self.followers_date = dates[latest]
+        self.engagement = float(self.values.mean())
+        for q, value in zip(PERCENTILES, np.percentile(self.values, PERCENTILES)):
+            setattr(self, f'engagement_p{q}', float(value))
+
+
+class RollupTable:
+    """Buckets of one platform at one granularity, ordered by bucket start."""
+
+    def __init__(self):
+        self.starts = []
+        self.buckets = []
+
+    def get(self, start):
+        """Return the bucket starting at ``start``, or None."""
+        i = bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] == start:
+            return self.buckets[i]
+        return None
+
+    def put(self, start, bucket):
+        """Insert the bucket for ``start``, replacing any it already has."""
+        if not self.starts or start > self.starts[-1]:
+            self.starts.append(start)
+            self.buckets.append(bucket)
+            return
+        i = bisect_left(self.starts, start)
+        if self.starts[i] == start:
+            self.buckets[i] = bucket
+        else:
+            self.starts.insert(i, start)
+            self.buckets.insert(i, bucket)
+
+    def copy(self):
+        """A copy whose bucket list can change without changing this table; buckets are shared."""
+        table = RollupTable()
+        table.starts = list(self.starts)
+        table.buckets = list(self.buckets)
+        return table
+
+    def range(self, start, end):
+        """Return ``(starts, buckets)`` for buckets starting within ``[start, end]``."""
+        lo = bisect_left(self.starts, start)
+        hi = bisect_right(self.starts, end)
+        return self.starts[lo:hi], self.buckets[lo:hi]
+
+
+def group_summaries(firsts, lasts, columns):
+    """Summaries of consecutive row groups ``[firsts[i], lasts[i]]`` of date-sorted rows.
+
+    Returns the engagement values sorted within each group and lists of
+    per-group reach and posts totals, latest followers, mean engagement and
+    engagement percentiles (interpolated as ``np.percentile`` does).
+    """
+    counts = lasts - firsts + 1
+    groups = np.repeat(np.arange(len(firsts)), counts)
+    engagement = np.asarray(columns['engagement'], dtype=np.float64)
+    values = engagement[np.lexsort((engagement, groups))]
+    summaries = [
+        np.add.reduceat(np.asarray(columns['reach'], dtype=np.int64), firsts).tolist(),
+        np.add.reduceat(np.asarray(columns['posts'], dtype=np.int64), firsts).tolist(),
+        np.asarray(columns['followers'])[lasts].tolist(),
+        (np.add.reduceat(values, firsts) / counts).tolist(),
+    ]
+    for q in PERCENTILES:
+        position = firsts + (counts - 1) * (q / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, lasts)
+        summaries.append((values[lower] + (position - lower) * (values[upper] - values[lower])).tolist())
+    return values, summaries
+
+
+class RollupEngine:
+    """Week and month rollups over an AnalyticsStore, updated on every append.
+
+    The store itself already holds one row per platform per day, so ``day``
+    queries slice it directly and only the coarser tables are maintained here.
+    Buckets are never changed once built: ``add`` replaces a bucket it
+    merges into, so a ``copy`` shares every table and bucket it has not
+    yet added to.
+    """
+
+    def __init__(self, store, granularities=('week', 'month')):
+        self.store = store
+        self.tables = {granularity: {} for granularity in granularities}
+        self._owned = set()
+        self.add(store.codes, store.dates, store.columns)
+
+    def copy(self, store):
+        """A copy over ``store``, a copy of this engine's store, to add to without changing this engine."""
+        engine = RollupEngine.__new__(RollupEngine)
+        engine.store = store
+        engine.tables = {granularity: dict(tables) for granularity, tables in self.tables.items()}
+        engine._owned = set()
+        return engine
+
+    def _table(self, granularity, platform):
+        # This engine's own table, copied from the one it shares on first write
+        tables = self.tables[granularity]
+        table = tables.get(platform)
+        if (granularity, platform) not in self._owned:
+            table = tables[platform] = RollupTable() if table is None else table.copy()
+            self._owned.add((granularity, platform))
+        return table
+
+    def add(self, codes, dates, columns):
+        """Fold a batch of rows sorted by (code, date) into every rollup table.
+
+        The summaries of every (platform, bucket) group in the batch are
+        computed in one vectorized pass; only groups that land in a bucket
+        that already exists are merged into it one at a time.
+        """
+        if not len(codes):
+            return
+        for granularity in self.tables:
+            starts = bucket_starts(dates, granularity)
+            keys = (codes.astype(np.int64) << 32) | (starts.astype(np.int64) & 0xFFFFFFFF)
+            firsts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+            lasts = np.r_[firsts[1:], len(keys)] - 1
+            values, summaries = group_summaries(firsts, lasts, columns)
+            groups = zip(firsts.tolist(), (lasts + 1).tolist(), codes[firsts].tolist(),
+                         starts[firsts].astype(np.int64).tolist(), dates[lasts], *summaries)
+            for lo, hi, code, start, latest, reach, posts, followers, engagement, *percentiles in groups:
+                table = self._table(granularity, self.store.platforms[code])
+                bucket = table.get(start)
+                if bucket is None:
+                    bucket = Bucket.summarized(values[lo:hi], reach, posts, followers, latest, engagement,
+                                               percentiles)
+                else:
+                    bucket = copy.copy(bucket)
+                    bucket.add(dates[lo:hi], columns['followers'][lo:hi], columns['engagement'][lo:hi],
+                               columns['reach'][lo:hi], columns['posts'][lo:hi])
+                table.put(start, bucket)
+
+    def query(self, platform, granularity, start, end):
+        """Return aligned series for ``platform`` between ``start`` and ``end``.
+
+        The result maps ``dates`` to the bucket grid and every name in
+        ``SERIES`` to a float array with NaN where a bucket has no data.
+        """
+        grid = bucket_grid(start, end, granularity)
+        series = {name: np.full(len(grid), np.nan) for name in SERIES}
+        if granularity == 'day':
+            store = self.store
+            rows = store.window(platform, grid[0], grid[-1])
+            positions = (store.dates[rows] - grid[0]).astype(np.int64)
+            for name in ('reach', 'posts', 'followers', 'engagement'):
+                series[name][positions] = store.columns[name][rows]
+            for q in PERCENTILES:
+                series[f'engagement_p{q}'] = series['engagement']
+            return dict(series, dates=grid)
+
+        table = self.tables[granularity].get(platform)
+        if table is None:
+            return dict(series, dates=grid)
+        first = int(grid[0].astype(np.int64))
+        last = int(grid[-1].astype(np.int64))
+        starts, buckets = table.range(first, last)
+        positions = np.searchsorted(grid.astype(np.int64), starts)
+        for name in SERIES:
+            series[name][positions] = [getattr(bucket, name) for bucket in buckets]
+        return dict(series, dates=grid)
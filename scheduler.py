@@ -0,0 +1,554 @@
+"""
+Scheduler
+Timer queue and worker pool that publish scheduled posts through the platform adapters.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ingestion import PublishError
+from posts_index import Post
+
+PENDING, PUBLISHING, PUBLISHED, FAILED, CANCELLED = 'pending', 'publishing', 'published', 'failed', 'cancelled'
+
+
+class ScheduledPost:
+    """One post waiting to be published, and what happened to it."""
+
+    __slots__ = ('id', 'platform', 'content', 'due', 'status', 'attempts', 'error', 'post_id', 'dispatched',
+                 'finished')
+
+    def __init__(self, id, platform, content, due):
+        self.id = id
+        self.platform = platform
+        self.content = content
+        self.due = due
+        self.status = PENDING
+        self.attempts = 0
+        self.error = None
+        self.post_id = None
+        self.dispatched = None
+        self.finished = None
+
+    def to_dict(self):
+        """Return the job in its JSON shape, with ``due`` as a naive local ISO timestamp."""
+        return {
+            'id': self.id,
+            'platform': self.platform,
+            'content': self.content,
+            'due': datetime.fromtimestamp(self.due).isoformat(),
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'post_id': self.post_id,
+        }
+
+
+class ScheduleStore:
+    """Scheduled posts of one tenant in a SQLite table shared by every server process.
+
+    Each store publishes only the jobs it scheduled (their ``owner``), but
+    any process can look a job up, list the pending ones or cancel one: a
+    cancel marks the row, and the owner claims due rows before publishing
+    them, so a job cancelled elsewhere is never published. Owners are
+    named by process id and a random nonce, so a reused process id is a
+    new owner, and record a heartbeat; ``adopt`` takes over the pending
+    jobs of owners whose process has exited or whose heartbeat is older
+    than ``timeout`` seconds. Process ids are checked on this host, so the
+    database must not be shared between hosts.
+
+    Published posts are recorded too (``share``), so every process can add
+    the posts the others published to its own data (``published_after``).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scheduled (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tenant TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            content TEXT NOT NULL,
+            due REAL NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            post_id INTEGER,
+            finished REAL
+        );
+        CREATE INDEX IF NOT EXISTS scheduled_tenant_status_due ON scheduled (tenant, status, due);
+        CREATE TABLE IF NOT EXISTS published (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tenant TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            post_id INTEGER NOT NULL,
+            post TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS published_tenant_seq ON published (tenant, seq);
+        CREATE TABLE IF NOT EXISTS owners (
+            owner TEXT PRIMARY KEY,
+            seen REAL NOT NULL
+        );
+    """
+    COLUMNS = ('id', 'platform', 'content', 'due', 'status', 'attempts', 'error', 'post_id', 'finished')
+
+    def __init__(self, path, tenant, timeout=30.0):
+        self.path = path
+        self.tenant = tenant
+        self.timeout = timeout
+        self.owner = f"{os.getpid()}:{secrets.token_hex(4)}"
+        self._lock = threading.Lock()
+        self._conn = self._connect(path)
+        self.heartbeat()
+
+    @classmethod
+    def _connect(cls, path):
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(cls.SCHEMA)
+        return conn
+
+    @classmethod
+    def tenants(cls, path):
+        """Names of the tenants with pending or publishing jobs in the database at ``path``."""
+        conn = cls._connect(path)
+        try:
+            return sorted(tenant for tenant, in conn.execute(
+                "SELECT DISTINCT tenant FROM scheduled WHERE status IN ('pending', 'publishing')"))
+        finally:
+            conn.close()
+
+    def _job(self, row):
+        job = ScheduledPost(*row[:4])
+        job.status, job.attempts, job.error, job.post_id, job.finished = row[4:]
+        return job
+
+    def add(self, jobs):
+        """Insert new jobs owned by this store and give them their ids."""
+        if not jobs:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO scheduled (tenant, owner, platform, content, due, status) VALUES (?, ?, ?, ?, ?, ?)',
+                [(self.tenant, self.owner, job.platform, job.content, job.due, job.status) for job in jobs])
+            # The transaction holds the write lock, so the new ids are consecutive
+            last = self._conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        for job_id, job in enumerate(jobs, last - len(jobs) + 1):
+            job.id = job_id
+
+    def update(self, job):
+        """Record a job's status, attempts and outcome."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE scheduled SET due = ?, status = ?, attempts = ?, error = ?, post_id = ?, finished = ? '
+                'WHERE id = ?', (job.due, job.status, job.attempts, job.error, job.post_id, job.finished, job.id))
+
+    def claim(self, job_ids):
+        """Mark the given pending jobs as publishing; returns the ids that were still pending."""
+        claimed = set()
+        with self._lock, self._conn:
+            for job_id in job_ids:
+                if self._conn.execute("UPDATE scheduled SET status = 'publishing' WHERE id = ? AND status = 'pending'",
+                                      (job_id,)).rowcount:
+                    claimed.add(job_id)
+        return claimed
+
+    def cancel(self, job_id):
+        """Cancel a pending job of any process; returns False if it is not pending."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE scheduled SET status = 'cancelled', finished = ? WHERE id = ? AND tenant = ? "
+                "AND status = 'pending'", (time.time(), job_id, self.tenant)).rowcount == 1
+
+    def get(self, job_id):
+        """The job with ``job_id`` as last recorded, or None."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM scheduled WHERE id = ? AND tenant = ?",
+                                     (job_id, self.tenant)).fetchone()
+        return None if row is None else self._job(row)
+
+    def pending(self, limit):
+        """The next ``limit`` pending jobs of every process, in due order."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM scheduled WHERE tenant = ? AND status = 'pending' "
+                "ORDER BY due, id LIMIT ?", (self.tenant, limit)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def count(self):
+        """Number of pending jobs of every process."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scheduled WHERE tenant = ? AND status = 'pending'",
+                                      (self.tenant,)).fetchone()[0]
+
+    @contextmanager
+    def share(self, posts, next_id):
+        """Record published Post records for the other processes, once the block exits without an error.
+
+        Posts without an id are numbered from ``next_id`` or after every
+        post shared so far, whichever is higher, so the processes never
+        give two posts one id. The database stays locked for the block.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            shared, = self._conn.execute('SELECT MAX(post_id) FROM published WHERE tenant = ?',
+                                         (self.tenant,)).fetchone()
+            next_id = next_id if shared is None else max(next_id, shared + 1)
+            for post in posts:
+                if post.id is None:
+                    post.id = next_id
+                    next_id += 1
+            self._conn.executemany(
+                'INSERT INTO published (tenant, owner, post_id, post) VALUES (?, ?, ?, ?)',
+                [(self.tenant, self.owner, post.id, json.dumps(post.to_dict())) for post in posts])
+            yield
+
+    def published_after(self, seq, limit=10000):
+        """``(seq, posts)``: post dicts other stores shared after ``seq``, and the cursor to pass next."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT seq, owner, post FROM published WHERE tenant = ? AND seq > ? ORDER BY seq LIMIT ?',
+                (self.tenant, seq, limit)).fetchall()
+        if not rows:
+            return seq, []
+        return rows[-1][0], [json.loads(post) for _, owner, post in rows if owner != self.owner]
+
+    def heartbeat(self):
+        """Record that this store's owner is still running."""
+        with self._lock, self._conn:
+            self._conn.execute('INSERT INTO owners (owner, seen) VALUES (?, ?) '
+                               'ON CONFLICT (owner) DO UPDATE SET seen = excluded.seen', (self.owner, time.time()))
+
+    def adopt(self):
+        """Take over the pending jobs of owners that are gone and return them.
+
+        Jobs such an owner was publishing may or may not have been
+        published, so they are failed rather than published again.
+        """
+        with self._lock, self._conn:
+            owners = self._conn.execute(
+                "SELECT DISTINCT s.owner, o.seen FROM scheduled s LEFT JOIN owners o ON o.owner = s.owner "
+                "WHERE s.tenant = ? AND s.status IN ('pending', 'publishing')", (self.tenant,)).fetchall()
+            now = time.time()
+            jobs = []
+            for owner, seen in owners:
+                if owner == self.owner or (seen is not None and seen >= now - self.timeout
+                                           and _alive(int(owner.split(':')[0]))):
+                    continue
+                self._conn.execute(
+                    "UPDATE scheduled SET status = 'failed', error = 'server process exited while publishing', "
+                    "finished = ? WHERE tenant = ? AND owner = ? AND status = 'publishing'",
+                    (now, self.tenant, owner))
+                jobs.extend(self._job(row) for row in self._conn.execute(
+                    f"UPDATE scheduled SET owner = ? WHERE tenant = ? AND owner = ? AND status = 'pending' "
+                    f"RETURNING {', '.join(self.COLUMNS)}", (self.owner, self.tenant, owner)).fetchall())
+        return jobs
+
+    def close(self):
+        """Close the database; this owner's pending jobs are then adopted by the next store to look."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM owners WHERE owner = ?', (self.owner,))
+            self._conn.close()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Scheduler:
+    """Publishes posts when they fall due.
+
+    Pending jobs sit in a binary heap keyed by due time, so scheduling is
+    O(log n) and hundreds of thousands of pending posts cost one small
+    tuple each. One dispatcher thread sleeps until the earliest due time
+    and hands due jobs to a worker pool. Each platform's adapter limiter is
+    asked for a token without blocking; a rate-limited job is pushed back
+    to when a token will be free, so one busy platform never ties up the
+    workers. Failed attempts are retried with exponential backoff and full
+    jitter up to ``max_attempts``, and published posts are added to
+    ``data`` like any other post. Each ``add_posts`` publishes a new data
+    snapshot, so posts published while another worker is adding its own
+    are added together by whichever worker gets the write lock next, and
+    that worker finishes their jobs. Should adding them fail, the jobs fail
+    too rather than being published a second time.
+
+    With a ``store`` (a ScheduleStore), jobs are also recorded there, so
+    the other server processes can answer for them; ``get``, ``pending``,
+    ``count`` and ``cancel`` then cover the jobs of every process. So are
+    published posts, and the dispatcher wakes every ``poll`` seconds to
+    record a heartbeat, adopt the jobs of exited processes and add the
+    posts the other processes published to ``data``.
+    """
+
+    def __init__(self, data, adapter_for, workers=4, max_attempts=5, backoff=1.0, max_backoff=300.0,
+                 keep_finished=1000, store=None, poll=1.0):
+        self.data = data
+        self.store = store
+        self.poll = poll
+        self.adapter_for = adapter_for
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self.finished = OrderedDict()
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._adapters = {}
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._published = []
+        self._shared = 0
+        self._pool = None
+        self._thread = None
+        self._running = False
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def adapter(self, platform):
+        adapter = self._adapters.get(platform)
+        if adapter is None:
+            adapter = self._adapters.setdefault(platform, self.adapter_for(platform))
+        return adapter
+
+    def _new_jobs(self, posts):
+        jobs = [ScheduledPost(None, platform, content, due) for platform, content, due in posts]
+        if self.store is None:
+            for job in jobs:
+                job.id = next(self._ids)
+        else:
+            self.store.add(jobs)
+        return jobs
+
+    def schedule(self, platform, content, due=None):
+        """Queue a post for ``due`` (epoch seconds, default now) and return its job."""
+        job, = self._new_jobs([(platform, content, time.time() if due is None else due)])
+        with self._condition:
+            self.jobs[job.id] = job
+            self._push(job)
+        return job
+
+    def schedule_many(self, posts):
+        """Queue ``(platform, content, due)`` tuples under one lock; returns the jobs."""
+        jobs = self._new_jobs(posts)
+        with self._condition:
+            for job in jobs:
+                self.jobs[job.id] = job
+            if len(jobs) > len(self._heap):
+                self._heap.extend((job.due, job.id) for job in jobs)
+                heapq.heapify(self._heap)
+                self._condition.notify()
+            else:
+                for job in jobs:
+                    self._push(job)
+        return jobs
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (job.due, job.id))
+        if self._heap[0][1] == job.id:
+            # New earliest job: wake the dispatcher to shorten its sleep
+            self._condition.notify()
+
+    def get(self, job_id):
+        """Return a pending or recently finished job, or None."""
+        if self.store is not None:
+            return self.store.get(job_id)
+        return self.jobs.get(job_id) or self.finished.get(job_id)
+
+    def pending(self, limit=100):
+        """The next ``limit`` pending jobs in due order."""
+        if self.store is not None:
+            return self.store.pending(limit)
+        with self._condition:
+            entries = heapq.nsmallest(limit, self._heap)
+            return [self.jobs[job_id] for _, job_id in entries if job_id in self.jobs]
+
+    def count(self):
+        """Number of pending jobs, of every process with a store (``len`` counts this one's)."""
+        if self.store is not None:
+            return self.store.count()
+        return len(self.jobs)
+
+    def cancel(self, job_id):
+        """Cancel a pending job; returns False if it is not pending."""
+        with self._condition:
+            if self.store is not None and not self.store.cancel(job_id):
+                return False
+            job = self.jobs.get(job_id)
+            if job is not None and job.status == PENDING:
+                # The heap entry is skipped when it comes up
+                self._finish(job, CANCELLED)
+                return True
+            # With a store, the job was pending in another process and is now cancelled there
+            return self.store is not None
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        if self.store is not None:
+            self.store.update(job)
+        self.jobs.pop(job.id, None)
+        self.finished[job.id] = job
+        while len(self.finished) > self.keep_finished:
+            self.finished.popitem(last=False)
+
+    def start(self):
+        """Start the dispatcher thread and the worker pool."""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='publish')
+            self._thread = threading.Thread(target=self._dispatch, name='scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """Stop dispatching; jobs not yet handed to a worker stay pending."""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        self._pool.shutdown(wait=wait)
+
+    def _due(self):
+        # Called with the condition held; returns due jobs or the time to sleep
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, job_id = heapq.heappop(self._heap)
+            job = self.jobs.get(job_id)
+            if job is not None and job.status == PENDING:
+                job.status = PUBLISHING
+                job.dispatched = now
+                due.append(job)
+        if due and self.store is not None:
+            # Jobs cancelled by another process since they were queued
+            claimed = self.store.claim([job.id for job in due])
+            for job in due:
+                if job.id not in claimed:
+                    self._finish(job, CANCELLED)
+            due = [job for job in due if job.id in claimed]
+        timeout = self._heap[0][0] - now if self._heap else None
+        return due, timeout
+
+    def _dispatch(self):
+        next_poll = time.monotonic()
+        while True:
+            if self.store is not None and time.monotonic() >= next_poll:
+                self._poll()
+                next_poll = time.monotonic() + self.poll
+            with self._condition:
+                if not self._running:
+                    return
+                due, timeout = self._due()
+                if not due:
+                    if self.store is not None:
+                        until_poll = max(0.0, next_poll - time.monotonic())
+                        timeout = until_poll if timeout is None else min(timeout, until_poll)
+                    self._condition.wait(timeout)
+                    continue
+            for job in due:
+                self._pool.submit(self._publish, job)
+
+    def _poll(self):
+        try:
+            self.store.heartbeat()
+            jobs = self.store.adopt()
+            shared, posts = self.store.published_after(self._shared)
+        except sqlite3.OperationalError:
+            # Database busy or locked for longer than its timeout; try again at the next poll
+            return
+        with self._condition:
+            for job in jobs:
+                self.jobs[job.id] = job
+                self._push(job)
+        if posts:
+            # Stored already by the process that published them
+            self.data.add_posts([Post.from_dict(post) for post in posts], persist=False)
+        self._shared = shared
+
+    def _retry_at(self, job, delay):
+        with self._condition:
+            job.status = PENDING
+            job.due = time.time() + delay
+            if self.store is not None:
+                self.store.update(job)
+            self._push(job)
+
+    def _add(self, posts):
+        if self.store is None:
+            self.data.add_posts(posts)
+            return
+        # Numbered and shared under the data's write lock, so no local post takes a shared id meanwhile
+        with self.data.batch() as draft, self.store.share(posts, draft.snapshot.next_post_id):
+            self.data.add_posts(posts)
+
+    def _publish(self, job):
+        adapter = self.adapter(job.platform)
+        wait = adapter.limiter.try_acquire()
+        if wait:
+            self._retry_at(job, wait)
+            return
+        job.attempts += 1
+        try:
+            post = adapter.publish({'platform': job.platform, 'content': job.content})
+        except Exception as e:
+            retryable = not isinstance(e, PublishError) or e.retryable
+            if retryable and job.attempts < self.max_attempts:
+                job.error = str(e)
+                delay = min(self.max_backoff, self.backoff * 2 ** (job.attempts - 1))
+                self._retry_at(job, random.uniform(0, delay))
+            else:
+                with self._condition:
+                    self._finish(job, FAILED, str(e))
+            return
+        try:
+            post = Post.from_dict(post)
+        except Exception as e:
+            with self._condition:
+                self._finish(job, FAILED, f"published, but the platform returned an invalid post: {e}")
+            return
+        with self._condition:
+            self._published.append((job, post))
+        with self._write_lock:
+            with self._condition:
+                published, self._published = self._published, []
+            # Empty when a worker that got the lock first added this post too
+            if not published:
+                return
+            try:
+                self._add([post for _, post in published])
+            except Exception as e:
+                # The posts are out on their platforms already, so publishing again would duplicate them
+                with self._condition:
+                    for job, _ in published:
+                        self._finish(job, FAILED, f"published, but not added to the dashboard: {e}")
+                return
+        with self._condition:
+            for job, post in published:
+                job.post_id = post.id
+                self._finish(job, PUBLISHED)
@@ -0,0 +1,178 @@
+"""
+Search Index
+Inverted index over post content with hashtags, mentions and platform terms.
+"""
+
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'[#@]?\w+')
+MAX_TERMS = 8
+_NEVER = np.iinfo(np.int64).max
+
+
+def tokenize(text, expand=True):
+    """Lowercased words, hashtags and mentions of ``text``, without duplicates.
+
+    Content is indexed with ``expand``: a hashtag or mention is also added
+    as a word (``#launch`` and ``launch``), so a plain word matches either
+    while a query for ``#launch`` matches only the hashtag.
+    """
+    terms = set(TOKEN_RE.findall(text.lower()))
+    if expand:
+        terms.update([term[1:] for term in terms if term[0] in '#@'])
+    terms.discard('')
+    return terms
+
+
+def platform_term(platform):
+    """The term every post of ``platform`` is indexed under."""
+    return ('platform', platform)
+
+
+def intersect(a, b):
+    """Intersection of two sorted arrays of unique integers.
+
+    Each value of the shorter array is looked up in the longer one by
+    binary search, so the cost is O(short * log(long)) in one vectorized
+    call.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    positions = np.searchsorted(b, a)
+    positions[positions == len(b)] = 0
+    return a[b[positions] == a]
+
+
+def _grow(array, size, fill=0):
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array)), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class SearchIndex:
+    """Posting lists from terms to posts.
+
+    Every indexed post gets the next document number, and its timestamp
+    and id are stored in arrays under that number. Posting lists are
+    sorted int64 arrays of document numbers; since numbers only grow, new
+    documents are buffered per term and appended the next time the term is
+    read. A query intersects its shortest list with the others and filters
+    the matches by time with array masks.
+
+    Documents are never removed: a replaced post's old document records the
+    number of the one that superseded it. A search limited to the first
+    ``count`` documents therefore sees the index exactly as it was when it
+    held that many, which lets older snapshots of the posts share one
+    index with the newest.
+    """
+
+    def __init__(self, posts=()):
+        self._postings = {}
+        self._added = defaultdict(list)
+        self._docs = {}
+        self.count = 0
+        self._timestamps = np.zeros(0, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._superseded = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        self.add(posts)
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _terms(post):
+        terms = tokenize(post.content)
+        terms.add(platform_term(post.platform))
+        return terms
+
+    def add(self, posts):
+        """Index posts under their content terms and platform, replacing posts with the same id."""
+        posts = list(posts)
+        if not posts:
+            return
+        with self._lock:
+            first = self.count
+            self.count += len(posts)
+            self._timestamps = _grow(self._timestamps, self.count)
+            self._ids = _grow(self._ids, self.count)
+            self._superseded = _grow(self._superseded, self.count, _NEVER)
+            self._timestamps[first:self.count] = [post.timestamp for post in posts]
+            self._ids[first:self.count] = [post.id for post in posts]
+            docs = self._docs
+            added = self._added
+            for doc, post in enumerate(posts, first):
+                old = docs.get(post.id)
+                if old is not None:
+                    self._superseded[old] = doc
+                docs[post.id] = doc
+                for term in self._terms(post):
+                    added[term].append(doc)
+
+    def postings(self, term):
+        """Sorted document numbers of the posts containing ``term``, including superseded ones."""
+        with self._lock:
+            docs = self._postings.get(term)
+            added = self._added.pop(term, None)
+            if added is None:
+                return docs if docs is not None else np.zeros(0, dtype=np.int64)
+            new = np.array(added, dtype=np.int64)
+            docs = new if docs is None else np.concatenate([docs, new])
+            self._postings[term] = docs
+            return docs
+
+    def search(self, terms, platform=None, start=None, end=None, limit=None, before=None, count=None):
+        """Return ``(total, ids)`` for the posts matching every term.
+
+        ``platform`` adds a platform term, and ``start`` and ``end`` bound
+        timestamps (epoch microseconds) to ``[start, end)``. ``total`` counts
+        every match; ``ids`` are the newest ``limit`` of them (all when None)
+        ordered by ``(timestamp, id)`` descending, starting after the
+        ``before`` ``(timestamp, id)`` cursor when given. With ``count``, the
+        index is searched as it was when it held ``count`` documents.
+        """
+        terms = list(terms)
+        if platform is not None:
+            terms.append(platform_term(platform))
+        if not terms:
+            return 0, []
+        lists = sorted((self.postings(term) for term in terms), key=len)
+        docs = lists[0]
+        for other in lists[1:]:
+            if not len(docs):
+                break
+            docs = intersect(docs, other)
+        with self._lock:
+            timestamps, ids, superseded = self._timestamps, self._ids, self._superseded
+            if count is None:
+                count = self.count
+        docs = docs[:np.searchsorted(docs, count)]
+        docs = docs[superseded[docs] >= count]
+        stamps = timestamps[docs]
+        if start is not None or end is not None:
+            keep = np.ones(len(docs), dtype=bool)
+            if start is not None:
+                keep &= stamps >= start
+            if end is not None:
+                keep &= stamps < end
+            docs, stamps = docs[keep], stamps[keep]
+        total = len(docs)
+        matched = ids[docs]
+        if before is not None:
+            keep = (stamps < before[0]) | ((stamps == before[0]) & (matched < before[1]))
+            stamps, matched = stamps[keep], matched[keep]
+        if limit and len(stamps) > limit:
+            # Only sort the candidates at or above the limit-th newest timestamp
+            cutoff = np.partition(stamps, len(stamps) - limit)[len(stamps) - limit]
+            keep = stamps >= cutoff
+            stamps, matched = stamps[keep], matched[keep]
+        order = np.lexsort((matched, stamps))[::-1][:limit]
+        return total, matched[order].tolist()
@@ -0,0 +1,58 @@
+"""
+Serialization
+Fast JSON encoding of API payloads, including NumPy arrays and datetimes.
+"""
+
+import json
+from datetime import date, datetime
+
+import numpy as np
+from flask import current_app
+
+from metrics import stage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'f':
+            # orjson writes NaN as null; match it instead of emitting invalid JSON
+            return np.where(np.isnan(value), None, value).tolist()
+        if value.dtype.kind == 'M':
+            return value.astype(str).tolist()
+        return value.tolist()
+    if isinstance(value, np.datetime64):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(value):
+    return json.dumps(value, default=_default, separators=(',', ':')).encode()
+
+
+def dumps(value):
+    """Encode ``value`` as compact JSON bytes.
+
+    NumPy arrays and scalars are encoded directly (NaN becomes null), as are
+    datetimes. Uses orjson when it is installed and the stdlib otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+    return _stdlib_dumps(value)
+
+
+def json_response(value, status=200):
+    """Build a JSON response through ``dumps``, timed as the ``encode`` stage."""
+    with stage('encode'):
+        body = dumps(value)
+    return current_app.response_class(body, status=status, mimetype='application/json')
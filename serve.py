@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Serve
+Production entry point: runs the dashboard under gunicorn.
+
+The data store is built once in the master process before the workers
+fork, and the objects it allocated are frozen out of the garbage
+collector, so workers share those pages copy-on-write instead of each
+holding a private copy. Each worker is a ``gthread`` worker, so one
+process handles ``--threads`` requests at a time.
+
+An open SSE stream (``/api/stream``) holds one of those threads for as
+long as the page stays open, so each worker serves at most
+``--max-streams`` streams (default: half its threads) and answers further
+ones with a 503; those pages poll ``/api/stats`` instead. Serving many
+more live pages than that needs more workers or threads. Data versions
+are per worker, so a poll answered by another worker than the last one
+gets every account rather than the changes; only sticky routing in a
+proxy in front makes polls return deltas.
+
+Each worker runs its own post scheduler. Their jobs are kept in one
+SQLite database (``$DASHBOARD_SCHEDULE_DB``, by default a temporary file
+for the server's lifetime), so any worker can look up or cancel a job
+another worker accepted; the worker that accepted a job publishes it,
+and every worker adds the posts the others published to its data.
+Workers start their schedulers as they boot, and every scheduler takes
+over the pending jobs of workers that have exited.
+
+    python serve.py --workers 4 --threads 8
+    python serve.py --bench --duration 10 --concurrency 16
+
+Send SIGHUP to the master to reload gracefully: new workers are started
+and old ones finish their in-flight requests before exiting. Without
+preloading (``--no-preload``) a reload also rebuilds the data store.
+Falls back to the single-process werkzeug server where gunicorn is not
+available (e.g. Windows).
+"""
+
+import argparse
+import atexit
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # pragma: no cover - exercised only without gunicorn
+    BaseApplication = None
+
+
+def default_workers():
+    return int(os.environ.get('WEB_CONCURRENCY', min(os.cpu_count() or 1, 4)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='worker processes (default: $WEB_CONCURRENCY or min(CPUs, 4))')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('DASHBOARD_THREADS', 8)),
+                        help='threads per worker (default: $DASHBOARD_THREADS or 8)')
+    parser.add_argument('--max-streams', type=int, default=None,
+                        help='open event streams per worker (default: $DASHBOARD_MAX_STREAMS or threads // 2)')
+    parser.add_argument('--timeout', type=int, default=30,
+                        help='seconds before a silent worker is restarted')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='recycle a worker after this many requests (0 disables)')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='build the data store in each worker instead of once before fork')
+    parser.add_argument('--bench', action='store_true',
+                        help='start the server, run the load profile against it and stop')
+    parser.add_argument('--duration', type=float, default=10.0, help='--bench: seconds of load')
+    parser.add_argument('--concurrency', type=int, default=8, help='--bench: client threads')
+    parser.add_argument('--output', help='--bench: write JSON results to this file')
+    return parser.parse_args(argv)
+
+
+def max_streams(args):
+    """Event streams a worker may hold open while its other threads stay free for requests."""
+    if args.max_streams is not None:
+        return args.max_streams
+    return int(os.environ.get('DASHBOARD_MAX_STREAMS', args.threads // 2))
+
+
+def schedule_db():
+    """Path of a schedule database for this server run, removed when the master exits."""
+    directory = tempfile.mkdtemp(prefix='dashboard-')
+    master = os.getpid()
+    # Workers inherit the handler, so only the master removes the directory
+    atexit.register(lambda: os.getpid() == master and shutil.rmtree(directory, ignore_errors=True))
+    return os.path.join(directory, 'schedule.db')
+
+
+def gunicorn_options(args):
+    """Translate parsed arguments into gunicorn settings."""
+    return {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'timeout': args.timeout,
+        # SSE streams stay open; give them a moment to see the shutdown
+        'graceful_timeout': 10,
+        'keepalive': 5,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+        'preload_app': args.preload,
+        'accesslog': os.environ.get('DASHBOARD_ACCESS_LOG'),
+        'post_worker_init': post_worker_init,
+    }
+
+
+def post_worker_init(worker):
+    """Start the worker's schedulers as it boots rather than on the first scheduling request."""
+    from dashboard import start_schedulers
+    start_schedulers(worker.wsgi)
+
+
+if BaseApplication is not None:
+    class DashboardApplication(BaseApplication):
+        """Gunicorn application that builds the dashboard through ``create_app``."""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from dashboard import create_app
+            app = create_app()
+            if self.cfg.preload_app:
+                # Build the dataset once in the master rather than in every worker
+                app.extensions['dashboard'].data
+                # Objects that exist now are never collected, so the collector
+                # does not touch (and un-share) their pages in the workers.
+                gc.freeze()
+            return app
+
+
+def serve(args):
+    if BaseApplication is None:
+        from werkzeug.serving import run_simple
+        from dashboard import create_app
+        print("gunicorn is not installed; using the single-process werkzeug server")
+        run_simple(args.host, args.port, create_app(), threaded=True)
+    else:
+        # Read by create_app in the master (preloaded) or in each worker
+        os.environ['DASHBOARD_MAX_STREAMS'] = str(max_streams(args))
+        if not os.environ.get('DASHBOARD_SCHEDULE_DB'):
+            os.environ['DASHBOARD_SCHEDULE_DB'] = schedule_db()
+        DashboardApplication(gunicorn_options(args)).run()
+
+
+def wait_until_ready(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/api/stats', timeout=5):
+                return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def bench(args, argv):
+    """Start the server as a child process and drive it with the load generator."""
+    from benchmarks import loadgen
+
+    server_argv = [arg for arg in argv if arg != '--bench']
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), *server_argv])
+    host = '127.0.0.1' if args.host == '0.0.0.0' else args.host
+    url = f'http://{host}:{args.port}'
+    try:
+        if not wait_until_ready(url):
+            raise SystemExit(f"server did not become ready at {url}")
+        results = loadgen.run(loadgen.HTTPTransport(url), args.duration, args.concurrency)
+        results['config'].update(workers=args.workers, threads=args.threads, url=url)
+        loadgen.print_report(results)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.bench:
+        bench(args, argv)
+    else:
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Sketches
+Mergeable per (account, day) sketches: HyperLogLog audiences and t-digest engagement.
+
+A day's sketch of one account summarizes every event of that day in a
+fixed amount of memory, and sketches of any set of days and accounts
+merge into a sketch of their union: HyperLogLog registers by elementwise
+max, t-digest centroids by concatenating and recompressing. A window or
+group query therefore costs one merge per (account, day) rather than a
+pass over the events.
+"""
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+PRECISION = 10  # 2**10 one-byte registers: about 3% standard error
+COMPRESSION = 200  # a digest keeps about COMPRESSION / 2 centroids: p99 within about 1%
+QUANTILES = (0.5, 0.9, 0.99)
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+def hash64(ids):
+    """SplitMix64 hashes of integer ids as uint64."""
+    x = np.asarray(ids).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hll_ranks(hashes, precision=PRECISION):
+    """Register index and rank (leading zeros + 1 of the next 32 bits) of each hash."""
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = ((hashes << np.uint64(precision)) >> np.uint64(32)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        ranks = np.where(rest > 0, 32 - np.floor(np.log2(rest)), 33).astype(np.uint8)
+    return index, ranks
+
+
+def hll_registers(ids, precision=PRECISION):
+    """HyperLogLog registers of a batch of integer ids."""
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    index, ranks = hll_ranks(hash64(ids), precision)
+    np.maximum.at(registers, index, ranks)
+    return registers
+
+
+def hll_estimate(registers):
+    """Distinct-count estimate of each row of registers (the last axis).
+
+    The raw HyperLogLog estimate, with linear counting while it is below
+    ``2.5 * m`` and some registers are still zero.
+    """
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def digest_compress(means, weights, compression=COMPRESSION):
+    """Merge sorted-or-not centroids into a t-digest of about ``compression / 2`` centroids.
+
+    Centroids are sorted and those whose quantile midpoints fall in the
+    same unit of the k1 scale ``compression / 2pi * asin(2q - 1)`` are
+    merged, so centroids stay small near the tails, where p99 is read.
+    Returns ``(means, weights)`` sorted by mean.
+    """
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    if len(means) <= compression // 2:
+        return means, weights
+    cumulative = np.cumsum(weights)
+    q = (cumulative - weights / 2) / cumulative[-1]
+    k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+    firsts = np.r_[0, np.flatnonzero(np.diff(k)) + 1]
+    merged = np.add.reduceat(weights, firsts)
+    return np.add.reduceat(means * weights, firsts) / merged, merged
+
+
+def digest_merge(digests, compression=COMPRESSION):
+    """Merge ``(means, weights)`` digests into one."""
+    digests = [digest for digest in digests if len(digest[0])]
+    if not digests:
+        return _EMPTY, _EMPTY
+    if len(digests) == 1:
+        return digests[0]
+    return digest_compress(np.concatenate([d[0] for d in digests]), np.concatenate([d[1] for d in digests]),
+                           compression)
+
+
+def digest_quantiles(means, weights, quantiles=QUANTILES):
+    """Quantiles (0..1) of a digest, interpolated between centroid midpoints; NaN when empty."""
+    if not len(means):
+        return np.full(len(quantiles), np.nan)
+    cumulative = np.cumsum(weights)
+    centers = (cumulative - weights / 2) / cumulative[-1]
+    return np.interp(quantiles, centers, means)
+
+
+class SketchTable:
+    """Sketches of one account by day, ordered by day.
+
+    Each day's registers are an array of their own, shared with copies of
+    the table until a write copies that day's; ``_owned`` holds the ids of
+    the arrays this table made itself and may change in place. Days with
+    no audience yet share one read-only empty array. Digests are ``(means,
+    weights)`` pairs, replaced rather than changed.
+    """
+
+    def __init__(self, precision=PRECISION):
+        self.days = []
+        self.digests = []
+        self.audience = []
+        self._registers = []
+        self._owned = set()
+        self._empty = np.zeros(1 << precision, dtype=np.uint8)
+        self._empty.flags.writeable = False
+
+    def registers(self, rows):
+        """Registers of the days in the row slice ``rows``, one row per day."""
+        days = self._registers[rows]
+        return np.stack(days) if days else np.zeros((0, len(self._empty)), dtype=np.uint8)
+
+    def row(self, day):
+        """Index of ``day``'s sketches, adding empty ones if it has none."""
+        i = bisect_left(self.days, day)
+        if i < len(self.days) and self.days[i] == day:
+            return i
+        self.days.insert(i, day)
+        self._registers.insert(i, self._empty)
+        self.digests.insert(i, (_EMPTY, _EMPTY))
+        self.audience.insert(i, False)
+        return i
+
+    def writable(self, i):
+        """Registers of row ``i`` that this table may change in place."""
+        registers = self._registers[i]
+        if id(registers) not in self._owned:
+            registers = self._registers[i] = registers.copy()
+            self._owned.add(id(registers))
+        return registers
+
+    def copy(self):
+        """A copy to add to without changing this table; every day's sketches are shared until written."""
+        table = SketchTable.__new__(SketchTable)
+        table.days = list(self.days)
+        table.digests = list(self.digests)
+        table.audience = list(self.audience)
+        table._registers = list(self._registers)
+        table._owned = set()
+        table._empty = self._empty
+        return table
+
+    def range(self, start, end):
+        """Row slice of the days within ``[start, end]``."""
+        return slice(bisect_left(self.days, start), bisect_right(self.days, end))
+
+
+class SketchStore:
+    """Audience and engagement sketches per account and day, merged at query time.
+
+    Audience sketches count distinct user ids reached; engagement sketches
+    hold the engagement rate of every post. Days are ``datetime64[D]``
+    values or ints counted from the epoch. A store is written by one
+    writer at a time; readers of a store nobody writes to need no lock.
+    """
+
+    def __init__(self, precision=PRECISION, compression=COMPRESSION):
+        self.precision = precision
+        self.compression = compression
+        self.tables = {}
+        self._owned = set()
+
+    def copy(self):
+        """A copy to add to without changing this store; tables are shared until written."""
+        store = SketchStore.__new__(SketchStore)
+        store.precision = self.precision
+        store.compression = self.compression
+        store.tables = dict(self.tables)
+        store._owned = set()
+        return store
+
+    def _table(self, platform):
+        # This store's own table, copied from the one it shares on first write
+        table = self.tables.get(platform)
+        if platform not in self._owned:
+            table = self.tables[platform] = SketchTable(self.precision) if table is None else table.copy()
+            self._owned.add(platform)
+        return table
+
+    def add_audience(self, platform, day, ids):
+        """Fold user ids reached by ``platform`` on ``day`` into its sketch."""
+        index, ranks = hll_ranks(hash64(ids), self.precision)
+        table = self._table(platform)
+        i = table.row(int(np.datetime64(day, 'D').astype(np.int64)))
+        np.maximum.at(table.writable(i), index, ranks)
+        table.audience[i] = True
+
+    def add_audience_registers(self, platforms, codes, dates, registers):
+        """Merge prebuilt registers, one row per ``(platforms[code], date)``."""
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64).tolist()
+        for code, day, row in zip(np.asarray(codes).tolist(), days, registers):
+            table = self._table(platforms[code])
+            i = table.row(day)
+            registers = table.writable(i)
+            np.maximum(registers, row, out=registers)
+            table.audience[i] = True
+
+    def add_engagement(self, platform, days, values):
+        """Fold engagement values observed on ``days`` into the daily digests of ``platform``."""
+        days = np.asarray(days, dtype='datetime64[D]').astype(np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(days, kind='stable')
+        days, values = days[order], values[order]
+        firsts = np.r_[0, np.flatnonzero(np.diff(days)) + 1] if len(days) else []
+        bounds = np.r_[firsts, len(days)].astype(np.int64).tolist()
+        table = self._table(platform)
+        for lo, hi in zip(bounds, bounds[1:]):
+            i = table.row(int(days[lo]))
+            batch = (values[lo:hi], np.ones(hi - lo))
+            table.digests[i] = digest_merge([table.digests[i], batch], self.compression)
+
+    def query(self, platforms, starts, end):
+        """Merge the sketches of ``platforms`` into buckets starting at ``starts``, up to ``end``.
+
+        Returns a dict with, for every bucket and for the whole window
+        (``total``), the estimated distinct ``audience`` (NaN with no
+        audience data), the number of engagement ``samples`` and the
+        ``engagement_p50``, ``_p90`` and ``_p99`` percentiles, plus the
+        window audience of each platform in ``by_platform``.
+        """
+        starts = np.asarray(starts, dtype='datetime64[D]').astype(np.int64)
+        last = int(np.datetime64(end, 'D').astype(np.int64))
+        n = len(starts)
+        registers = np.zeros((n, 1 << self.precision), dtype=np.uint8)
+        has_audience = np.zeros(n, dtype=bool)
+        digests = [[] for _ in range(n)]
+        by_platform = {}
+        for platform in platforms:
+            table = self.tables.get(platform)
+            if table is None:
+                continue
+            rows = table.range(int(starts[0]), last)
+            days = np.asarray(table.days[rows], dtype=np.int64)
+            if not len(days):
+                continue
+            buckets = np.searchsorted(starts, days, side='right') - 1
+            firsts = np.r_[0, np.flatnonzero(np.diff(buckets)) + 1]
+            owners = buckets[firsts]
+            merged = np.maximum.reduceat(table.registers(rows), firsts)
+            registers[owners] = np.maximum(registers[owners], merged)
+            audience = np.logical_or.reduceat(np.asarray(table.audience[rows]), firsts)
+            has_audience[owners] |= audience
+            if audience.any():
+                by_platform[platform] = float(hll_estimate(merged.max(axis=0)))
+            for bucket, digest in zip(buckets.tolist(), table.digests[rows]):
+                if len(digest[0]):
+                    digests[bucket].append(digest)
+
+        bucket_digests = [digest_merge(parts, self.compression) for parts in digests]
+        total_digest = digest_merge(bucket_digests, self.compression)
+        series = {
+            'audience': np.where(has_audience, hll_estimate(registers), np.nan),
+            'samples': np.array([weights.sum() for _, weights in bucket_digests]),
+        }
+        percentiles = np.array([digest_quantiles(*digest) for digest in bucket_digests]).reshape(n, -1)
+        total = {
+            'audience': float(hll_estimate(registers.max(axis=0))) if has_audience.any() else np.nan,
+            'samples': float(total_digest[1].sum()),
+        }
+        for q, column, value in zip(QUANTILES, percentiles.T, digest_quantiles(*total_digest)):
+            series[f'engagement_p{round(q * 100)}'] = column
+            total[f'engagement_p{round(q * 100)}'] = float(value)
+        return dict(series, total=total, by_platform=by_platform)
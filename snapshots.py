@@ -0,0 +1,111 @@
+"""
+Snapshots
+Immutable versions of the dashboard data, published by swapping one reference.
+
+Readers take the current snapshot once and read everything from it without
+locks, so a response never mixes two versions. Writers build the next
+snapshot as a Draft under the data's write lock and publish it with a
+single assignment (read-copy-update): each component is copied the first
+time a draft writes to it, and components a draft does not touch are
+shared with the snapshot before it.
+"""
+
+from collections import deque
+
+
+def _copy_log(log):
+    return deque(log, log.maxlen)
+
+
+class Snapshot:
+    """One version of the data; never changed once published.
+
+    ``accounts`` maps platform to counters in display order, ``analytics``
+    is an AnalyticsStore with its RollupEngine ``rollups``, ``posts`` a
+    PostIndex and ``sketches`` a SketchStore. ``account_log`` holds the
+    latest ``(version, platform, fields)`` account changes, complete for
+    every version after ``account_log_floor``.
+    """
+
+    FIELDS = ('version', 'platforms', 'accounts', 'account_versions', 'account_log', 'account_log_floor',
+              'analytics', 'rollups', 'posts', 'sketches', 'next_post_id')
+    __slots__ = FIELDS
+
+    # How a draft copies each component it writes to; the rest are replaced outright
+    COPIES = {
+        'platforms': list,
+        'accounts': dict,
+        'account_versions': dict,
+        'account_log': _copy_log,
+        'posts': lambda posts: posts.copy(),
+        'sketches': lambda sketches: sketches.copy(),
+    }
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields[name])
+
+    def accounts_since(self, since):
+        """Return ``(version, full, accounts, versions)`` for a client that has seen data version ``since``.
+
+        ``accounts`` holds only the latest values of the fields changed
+        after ``since``, unless the change log no longer reaches back that
+        far (or ``since`` is not a version of this data): then ``full`` is
+        True and ``accounts`` is a copy of every account. ``versions`` are
+        the account versions of the accounts returned.
+        """
+        if not self.account_log_floor <= since <= self.version:
+            accounts = {platform: dict(fields) for platform, fields in self.accounts.items()}
+            full = True
+        else:
+            accounts = {}
+            for version, platform, fields in reversed(self.account_log):
+                if version <= since:
+                    break
+                changed = accounts.setdefault(platform, {})
+                for name, value in fields.items():
+                    changed.setdefault(name, value)
+            full = False
+        versions = {platform: self.account_versions[platform] for platform in accounts}
+        return self.version, full, accounts, versions
+
+
+class Draft:
+    """The next snapshot, written by one writer while readers use the current one.
+
+    ``snapshot`` starts as a shallow copy of the current snapshot.
+    ``writable`` returns the draft's own copy of a component, so a batch of
+    writes copies each component it touches once. ``events`` are held back
+    until the draft is published.
+    """
+
+    def __init__(self, base):
+        self.snapshot = Snapshot(**{name: getattr(base, name) for name in Snapshot.FIELDS})
+        self.events = []
+        self._owned = set()
+
+    def writable(self, name):
+        """The draft's own copy of component ``name``, copied on first use."""
+        snapshot = self.snapshot
+        if name not in self._owned:
+            if name in ('analytics', 'rollups'):
+                # Rollups answer day queries from their store, so the two are copied together
+                analytics = snapshot.analytics.copy()
+                snapshot.rollups = snapshot.rollups.copy(analytics)
+                snapshot.analytics = analytics
+                self._owned.update(('analytics', 'rollups'))
+            else:
+                setattr(snapshot, name, Snapshot.COPIES[name](getattr(snapshot, name)))
+                self._owned.add(name)
+        return getattr(snapshot, name)
+
+    def reset(self, **fields):
+        """Replace components outright with new ones the draft owns."""
+        for name, value in fields.items():
+            setattr(self.snapshot, name, value)
+        self._owned.update(fields)
+
+    def publish(self):
+        """Finish the snapshot for readers and return it."""
+        self.snapshot.posts.commit()
+        return self.snapshot
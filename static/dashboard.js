@@ -0,0 +1,329 @@
+// '' on the default dashboard, '/t/<tenant>' on a tenant's
+const API_BASE = location.pathname.replace(/\/+$/, '');
+// Longer series are downsampled server-side to bound payload and render time
+const MAX_CHART_POINTS = 500;
+// Without live updates the stat cards are polled for deltas in between reloads
+const STATS_POLL_INTERVAL = 30000;
+let engagementChart, platformChart;
+// Data version token ("epoch:version") the page reflects, for /api/stats?since=
+let dataVersion = null;
+
+async function loadDashboard() {
+    // One round trip for everything on the page
+    try {
+        const response = await fetch(API_BASE + '/api/dashboard?max_points=' + MAX_CHART_POINTS);
+        const data = await response.json();
+        dataVersion = data.version;
+        renderStats(data.stats, data.trends);
+        renderCharts(data.analytics);
+        renderPosts(data.posts);
+    } catch (error) {
+        console.error('Error loading dashboard:', error);
+    }
+}
+
+function escapeHtml(text) {
+    const element = document.createElement('span');
+    element.textContent = text;
+    return element.innerHTML;
+}
+
+function formatChange(change, percent) {
+    if (change === null || change === undefined) {
+        return '<span class="metric-change neutral">–</span>';
+    }
+    const sign = change > 0 ? '+' : '';
+    const css = change > 0 ? 'positive' : change < 0 ? 'negative' : 'neutral';
+    const title = percent === null ? '' : `${sign}${percent.toFixed(2)}%`;
+    return `<span class="metric-change ${css}" title="${title}">${sign}${change.toLocaleString()}</span>`;
+}
+
+function renderStats(data, trends) {
+    const statsGrid = document.getElementById('statsGrid');
+    statsGrid.innerHTML = '';
+    const trendsByName = {};
+    (trends ? trends.platforms : []).forEach(t => trendsByName[t.name] = t);
+
+    Object.entries(data).forEach(([platform, stats]) => {
+        const trend = trendsByName[platform] || {};
+        const latestAnomaly = trend.anomalies && trend.anomalies[trend.anomalies.length - 1];
+        const card = document.createElement('div');
+        card.className = 'stat-card';
+        card.dataset.platform = platform;
+        card.style.setProperty('--platform-color', stats.color);
+
+        card.innerHTML = `
+            <div class="platform-header">
+                <div class="platform-name">${escapeHtml(platform)}</div>
+                <div class="platform-icon">${escapeHtml(platform[0])}</div>
+            </div>
+
+            <div class="metric">
+                <div class="metric-label">Followers</div>
+                <div class="metric-value">
+                    <span data-field="followers">${stats.followers.toLocaleString()}</span>
+                    ${formatChange(trend.followers_dod, trend.followers_dod_pct)}
+                </div>
+                <div class="metric-label">
+                    Week: ${formatChange(trend.followers_wow, trend.followers_wow_pct)}
+                </div>
+            </div>
+
+            <div class="metric">
+                <div class="metric-label">Engagement Rate</div>
+                <div class="metric-value"><span data-field="engagement_rate">${stats.engagement_rate}</span>%</div>
+            </div>
+
+            <div class="metric">
+                <div class="metric-label">Posts Today</div>
+                <div class="metric-value" data-field="posts_today">${stats.posts_today}</div>
+            </div>
+
+            <div class="metric">
+                <div class="metric-label">Reach</div>
+                <div class="metric-value" data-field="reach">${stats.reach.toLocaleString()}</div>
+            </div>
+            ${latestAnomaly ? `<div class="anomaly-badge">⚠ Unusual engagement on ${latestAnomaly}</div>` : ''}
+        `;
+
+        statsGrid.appendChild(card);
+    });
+}
+
+function renderCharts(data) {
+    // Engagement Chart
+    const ctx1 = document.getElementById('engagementChart').getContext('2d');
+    if (engagementChart) engagementChart.destroy();
+
+    engagementChart = new Chart(ctx1, {
+        type: 'line',
+        data: {
+            labels: data.dates,
+            datasets: data.platforms.map((platform, index) => ({
+                label: platform.name,
+                data: platform.engagement,
+                borderColor: platform.color,
+                backgroundColor: platform.color + '20',
+                tension: 0.4
+            }))
+        },
+        options: {
+            responsive: true,
+            plugins: {
+                legend: {
+                    position: 'top',
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true
+                }
+            }
+        }
+    });
+
+    // Platform Distribution Chart
+    const ctx2 = document.getElementById('platformChart').getContext('2d');
+    if (platformChart) platformChart.destroy();
+
+    platformChart = new Chart(ctx2, {
+        type: 'doughnut',
+        data: {
+            labels: data.platforms.map(p => p.name),
+            datasets: [{
+                data: data.platforms.map(p => p.followers),
+                backgroundColor: data.platforms.map(p => p.color),
+                borderWidth: 0
+            }]
+        },
+        options: {
+            responsive: true,
+            plugins: {
+                legend: {
+                    position: 'bottom'
+                }
+            }
+        }
+    });
+}
+
+function renderPosts(posts) {
+    const postsContainer = document.getElementById('recentPosts');
+    postsContainer.innerHTML = '';
+
+    posts.forEach(post => {
+        postsContainer.appendChild(renderPost(post));
+    });
+}
+
+function renderPost(post) {
+    const postElement = document.createElement('div');
+    postElement.className = 'post-item';
+
+    const platformColors = {
+        'Facebook': '#1877F2',
+        'Instagram': '#E4405F',
+        'Twitter': '#1DA1F2',
+        'LinkedIn': '#0A66C2',
+        'TikTok': '#000000'
+    };
+
+    // Content and platform come from users: set them as text, never as markup
+    const header = document.createElement('div');
+    header.className = 'post-header';
+    const platform = document.createElement('span');
+    platform.className = 'post-platform';
+    platform.style.background = platformColors[post.platform.split('/')[0]] || '#7f8c8d';
+    platform.textContent = post.platform;
+    const time = document.createElement('span');
+    time.className = 'post-time';
+    time.textContent = new Date(post.timestamp).toLocaleString();
+    header.append(platform, time);
+
+    const content = document.createElement('div');
+    content.className = 'post-content';
+    content.textContent = post.content;
+
+    const metrics = document.createElement('div');
+    metrics.className = 'post-metrics';
+    [
+        `❤️ ${post.likes} likes`,
+        `💬 ${post.comments} comments`,
+        `🔄 ${post.shares} shares`,
+        `📊 ${post.engagement_rate.toFixed(1)}% engagement`
+    ].forEach(text => {
+        const metric = document.createElement('span');
+        metric.textContent = text;
+        metrics.appendChild(metric);
+    });
+
+    postElement.append(header, content, metrics);
+
+    return postElement;
+}
+
+function refreshData() {
+    loadDashboard();
+}
+
+function exportReport() {
+    window.location.href = API_BASE + '/api/export?data=analytics&format=csv';
+}
+
+async function schedulePost() {
+    const firstCard = document.querySelector('.stat-card');
+    const platform = prompt('Platform', firstCard ? firstCard.dataset.platform : '');
+    if (!platform) return;
+    const content = prompt('Post content');
+    if (!content) return;
+    const minutes = parseFloat(prompt('Publish in how many minutes?', '0')) || 0;
+
+    const response = await fetch(API_BASE + '/api/schedule', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({platform, content, delay: minutes * 60})
+    });
+    const result = await response.json();
+    if (response.ok) {
+        alert(`Scheduled for ${new Date(result.posts[0].due).toLocaleString()}`);
+    } else {
+        alert(result.error);
+    }
+}
+
+function statCard(platform) {
+    return document.querySelector(`.stat-card[data-platform="${CSS.escape(platform)}"]`);
+}
+
+function applyAccountDeltas(accounts) {
+    Object.entries(accounts).forEach(([platform, fields]) => {
+        const card = statCard(platform);
+        if (!card) return;
+        Object.entries(fields).forEach(([field, value]) => {
+            const element = card.querySelector(`[data-field="${field}"]`);
+            if (element) element.textContent = value.toLocaleString();
+        });
+    });
+}
+
+async function pollStats() {
+    if (dataVersion === null) return;
+    try {
+        const response = await fetch(`${API_BASE}/api/stats?since=${encodeURIComponent(dataVersion)}`);
+        const delta = await response.json();
+        if (delta.full && !Object.keys(delta.accounts).every(statCard)) {
+            // A platform the page has no card for yet
+            loadDashboard();
+            return;
+        }
+        // A full snapshot (too far behind, or another server process answered) carries every account
+        applyAccountDeltas(delta.accounts);
+        dataVersion = delta.version;
+    } catch (error) {
+        console.error('Error polling stats:', error);
+    }
+}
+
+function applyNewPosts(posts) {
+    const postsContainer = document.getElementById('recentPosts');
+    posts.forEach(post => postsContainer.prepend(renderPost(post)));
+    while (postsContainer.children.length > 10) {
+        postsContainer.lastElementChild.remove();
+    }
+}
+
+function applyAnalyticsPoints(points) {
+    if (!engagementChart) return;
+    points.forEach(point => {
+        const [year, month, day] = point.date.split('-');
+        const label = `${month}/${day}`;
+        let index = engagementChart.data.labels.indexOf(label);
+        if (index === -1) {
+            if (label < engagementChart.data.labels[engagementChart.data.labels.length - 1]) return;
+            engagementChart.data.labels.push(label);
+            engagementChart.data.labels.shift();
+            engagementChart.data.datasets.forEach(dataset => {
+                dataset.data.push(null);
+                dataset.data.shift();
+            });
+            index = engagementChart.data.labels.length - 1;
+        }
+        const dataset = engagementChart.data.datasets.find(d => d.label === point.platform);
+        if (dataset) dataset.data[index] = point.engagement;
+    });
+    engagementChart.update();
+}
+
+function connectStream() {
+    const source = new EventSource(API_BASE + '/api/stream');
+    let connected = false;
+
+    source.addEventListener('hello', () => {
+        // After a reconnect we may have missed deltas
+        if (connected) loadDashboard();
+        connected = true;
+    });
+    source.addEventListener('resync', () => loadDashboard());
+    source.addEventListener('accounts', event => applyAccountDeltas(JSON.parse(event.data).accounts));
+    source.addEventListener('posts', event => applyNewPosts(JSON.parse(event.data).posts));
+    source.addEventListener('analytics', event => applyAnalyticsPoints(JSON.parse(event.data).points));
+    source.addEventListener('error', () => {
+        // Closed for good, e.g. the server is at its stream limit (503): poll instead
+        if (source.readyState === EventSource.CLOSED) startPolling();
+    });
+}
+
+function startPolling() {
+    setInterval(pollStats, STATS_POLL_INTERVAL);
+    setInterval(loadDashboard, 300000);
+}
+
+// Load dashboard on page load
+loadDashboard();
+
+// Live updates, with stat polling and the 5-minute reload as a fallback
+if (window.EventSource) {
+    connectStream();
+} else {
+    startPolling();
+}
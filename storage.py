@@ -0,0 +1,259 @@
+"""
+Storage
+Persistent backends for accounts, analytics history and posts.
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from analytics_store import AnalyticsStore
+from posts_index import Post
+
+POST_FIELDS = Post.FIELDS
+
+
+class StorageBackend:
+    """Interface shared by the storage backends.
+
+    ``load`` returns None for an empty store, otherwise a dict with
+    ``accounts`` (platform -> counters, in display order), ``analytics``
+    (an AnalyticsStore) and ``posts`` (a list of Post records).
+    """
+
+    def load(self):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def save_account(self, platform, account):
+        raise NotImplementedError
+
+    def save_accounts(self, accounts):
+        """Save many accounts (platform -> counters) at once."""
+        for platform, account in accounts.items():
+            self.save_account(platform, account)
+
+    def append_analytics(self, platforms, codes, dates, columns):
+        """Persist a batch whose ``codes`` index into ``platforms``."""
+        raise NotImplementedError
+
+    def append_posts(self, posts):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite database in WAL mode with bulk ``executemany`` writes."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS accounts (
+            position INTEGER PRIMARY KEY AUTOINCREMENT,
+            platform TEXT UNIQUE NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS analytics (
+            platform TEXT NOT NULL,
+            date TEXT NOT NULL,
+            followers INTEGER NOT NULL,
+            engagement REAL NOT NULL,
+            reach INTEGER NOT NULL,
+            posts INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS analytics_platform_date ON analytics (platform, date);
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY,
+            platform TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            likes INTEGER NOT NULL,
+            comments INTEGER NOT NULL,
+            shares INTEGER NOT NULL,
+            engagement_rate REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS posts_timestamp ON posts (timestamp);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def load(self):
+        with self._lock:
+            accounts = {platform: json.loads(data) for platform, data in
+                        self._conn.execute('SELECT platform, data FROM accounts ORDER BY position')}
+            if not accounts:
+                return None
+            rows = self._conn.execute(
+                'SELECT platform, date, followers, engagement, reach, posts FROM analytics ORDER BY platform, date'
+            ).fetchall()
+            posts = [Post(*row) for row in self._conn.execute(
+                f"SELECT {', '.join(POST_FIELDS)} FROM posts ORDER BY timestamp DESC, id DESC")]
+
+        store = AnalyticsStore(accounts)
+        if rows:
+            platform, date, followers, engagement, reach, posts_count = zip(*rows)
+            codes = np.array([store.code_for(p) for p in platform], dtype=np.int32)
+            store.append_columns(codes, np.array(date, dtype='datetime64[D]'), {
+                'followers': followers, 'engagement': engagement, 'reach': reach, 'posts': posts_count,
+            })
+        return {'accounts': accounts, 'analytics': store, 'posts': posts}
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.executescript('DELETE FROM accounts; DELETE FROM analytics; DELETE FROM posts;')
+
+    def save_account(self, platform, account):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO accounts (platform, data) VALUES (?, ?) '
+                'ON CONFLICT (platform) DO UPDATE SET data = excluded.data',
+                (platform, json.dumps(account)))
+
+    def save_accounts(self, accounts):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO accounts (platform, data) VALUES (?, ?) '
+                'ON CONFLICT (platform) DO UPDATE SET data = excluded.data',
+                [(platform, json.dumps(account)) for platform, account in accounts.items()])
+
+    def append_analytics(self, platforms, codes, dates, columns):
+        rows = zip(
+            [platforms[code] for code in codes.tolist()],
+            dates.astype(str).tolist(),
+            columns['followers'].tolist(),
+            columns['engagement'].tolist(),
+            columns['reach'].tolist(),
+            columns['posts'].tolist(),
+        )
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT INTO analytics VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def append_posts(self, posts):
+        rows = [tuple(getattr(post, field) for field in POST_FIELDS) for post in posts]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO posts ({', '.join(POST_FIELDS)}) VALUES ({', '.join('?' * len(POST_FIELDS))})",
+                rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class NumpyBackend(StorageBackend):
+    """Directory of ``.npy`` columns opened as read-only memory maps.
+
+    Every worker process that loads the same directory maps the same pages,
+    so the analytics history is held in RAM once no matter how many workers
+    serve it. Column files are written per generation and a small manifest
+    is swapped in atomically, so readers never see a half-written set.
+    Appends rewrite the columns, so batch them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_json(self, name, default):
+        try:
+            with open(self._file(name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name, value):
+        tmp = self._file(name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp, self._file(name))
+
+    def _load_store(self):
+        manifest = self._read_json('manifest.json', None)
+        if manifest is None:
+            return AnalyticsStore()
+        generation = manifest['generation']
+        arrays = {name: np.load(self._file(f'{name}.{generation}.npy'), mmap_mode='r')
+                  for name in ('codes', 'dates', *AnalyticsStore.COLUMNS)}
+        codes = arrays.pop('codes')
+        dates = arrays.pop('dates')
+        return AnalyticsStore.from_columns(manifest['platforms'], codes, dates, arrays)
+
+    def load(self):
+        accounts = self._read_json('accounts.json', {})
+        if not accounts:
+            return None
+        posts = []
+        if os.path.exists(self._file('posts.jsonl')):
+            with open(self._file('posts.jsonl')) as f:
+                posts = [Post(**json.loads(line)) for line in f]
+        return {'accounts': accounts, 'analytics': self._load_store(), 'posts': posts}
+
+    def clear(self):
+        with self._lock:
+            for pattern in ('*.npy', '*.json', '*.jsonl'):
+                for name in glob.glob(self._file(pattern)):
+                    os.remove(name)
+
+    def save_account(self, platform, account):
+        with self._lock:
+            accounts = self._read_json('accounts.json', {})
+            accounts[platform] = account
+            self._write_json('accounts.json', accounts)
+
+    def save_accounts(self, accounts):
+        with self._lock:
+            self._write_json('accounts.json', {**self._read_json('accounts.json', {}), **accounts})
+
+    def append_analytics(self, platforms, codes, dates, columns):
+        with self._lock:
+            store = self._load_store()
+            mapping = np.array([store.code_for(platform) for platform in platforms], dtype=np.int32)
+            store.append_columns(mapping[codes], dates, columns)
+
+            manifest = self._read_json('manifest.json', {'generation': 0})
+            previous, generation = manifest['generation'], manifest['generation'] + 1
+            for name, values in [('codes', store.codes), ('dates', store.dates), *store.columns.items()]:
+                np.save(self._file(f'{name}.{generation}.npy'), values)
+            self._write_json('manifest.json', {'generation': generation, 'platforms': store.platforms})
+
+            # Keep the previous generation for readers that just read the old manifest.
+            for name in glob.glob(self._file('*.npy')):
+                if int(name.rsplit('.', 2)[1]) < previous:
+                    os.remove(name)
+
+    def append_posts(self, posts):
+        with self._lock, open(self._file('posts.jsonl'), 'a') as f:
+            f.writelines(json.dumps({field: getattr(post, field) for field in POST_FIELDS}) + '\n' for post in posts)
+
+
+def open_storage(url):
+    """Open a backend from ``sqlite:///path.db`` or ``npy:///directory``.
+
+    Returns None for an empty url, meaning in-memory only.
+    """
+    if not url:
+        return None
+    scheme, sep, path = url.partition('://')
+    if not sep or not path:
+        raise ValueError(f"invalid storage url: {url}")
+    if scheme == 'sqlite':
+        return SQLiteBackend(path)
+    if scheme == 'npy':
+        return NumpyBackend(path)
+    raise ValueError(f"unknown storage scheme: {scheme}")
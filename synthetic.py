@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data
+Seeded, vectorized generator of analytics histories and posts at any scale.
+
+Every column is drawn from a NumPy ``Generator`` in one call, so years of
+daily analytics for thousands of accounts and millions of posts take
+seconds. Followers follow a trending random walk ending at the account's
+current count, engagement has a weekly rhythm and noisy outliers, and
+likes, comments and shares are heavy-tailed.
+
+    python synthetic.py --accounts 2000 --days 1825 --posts 1000000 --storage npy:///tmp/dashboard
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+from analytics_store import AnalyticsStore
+from ingestion import MockAdapter
+from posts_index import Post, to_epoch_us
+from sketches import PRECISION, hash64, hll_ranks
+
+DEFAULT_COLOR = '#7f8c8d'
+# Hashtags posts are tagged with; earlier topics are more popular (Zipf)
+TOPICS = ('launch', 'update', 'behindthescenes', 'tips', 'giveaway', 'community', 'ama', 'tutorial',
+          'event', 'milestone', 'feedback', 'release', 'hiring', 'casestudy', 'webinar', 'throwback')
+_DAY_US = 86400 * 1000000
+
+
+def account_names(accounts):
+    """``accounts`` names: the mock platforms first, then numbered accounts on each."""
+    platforms = list(MockAdapter.ACCOUNTS)
+    if accounts <= len(platforms):
+        return platforms[:accounts]
+    return [f'{platforms[i % len(platforms)]} {i:04d}' for i in range(accounts)]
+
+
+def account_profiles(rng, names):
+    """Per-account parameters; the mock platforms keep their familiar counters."""
+    n = len(names)
+    profiles = {
+        'followers': np.clip(rng.lognormal(np.log(10000), 1.2, n), 100, 5e6),
+        'engagement_rate': np.clip(rng.gamma(2.0, 2.0, n), 0.2, 20.0),
+        'reach_ratio': rng.beta(2.0, 5.0, n),
+        'posts_per_day': rng.gamma(2.0, 1.0, n),
+        'growth': rng.normal(0.0015, 0.002, n),
+    }
+    for i, name in enumerate(names):
+        known = MockAdapter.ACCOUNTS.get(name)
+        if known is not None:
+            profiles['followers'][i] = known['followers']
+            profiles['engagement_rate'][i] = known['engagement_rate']
+            profiles['reach_ratio'][i] = known['reach'] / known['followers']
+            profiles['posts_per_day'][i] = max(known['posts_today'], 0.5)
+    return profiles
+
+
+def analytics_columns(rng, profiles, days, end):
+    """Daily rows of every account as ``(codes, dates, columns)`` sorted by (code, date)."""
+    accounts = len(profiles['followers'])
+    codes = np.repeat(np.arange(accounts, dtype=np.int32), days)
+    dates = np.tile(end - np.arange(days - 1, -1, -1), accounts)
+
+    # Log-followers drift by each account's growth rate; the walk ends at today's count
+    steps = profiles['growth'][:, None] + rng.normal(0.0, 0.004, (accounts, days))
+    walk = np.cumsum(steps, axis=1)
+    followers = profiles['followers'][:, None] * np.exp(walk - walk[:, -1:])
+
+    weekday = (dates.reshape(accounts, days).astype(np.int64) + 3) % 7
+    rhythm = 1.0 + 0.15 * np.sin(2 * np.pi * weekday / 7)
+    engagement = profiles['engagement_rate'][:, None] * rhythm * rng.lognormal(0.0, 0.25, (accounts, days))
+    reach = followers * profiles['reach_ratio'][:, None] * rng.lognormal(0.0, 0.3, (accounts, days))
+    posts = rng.poisson(np.repeat(profiles['posts_per_day'][:, None], days, axis=1))
+
+    columns = {
+        'followers': followers.round().astype(np.int64).ravel(),
+        'engagement': engagement.ravel(),
+        'reach': reach.round().astype(np.int64).ravel(),
+        'posts': posts.astype(np.int32).ravel(),
+    }
+    return codes, dates, columns
+
+
+def post_columns(rng, profiles, count, days, now):
+    """``count`` posts over the last ``days`` days as columns, oldest first."""
+    weights = profiles['posts_per_day'] / profiles['posts_per_day'].sum()
+    codes = rng.choice(len(weights), count, p=weights).astype(np.int32)
+    timestamps = np.sort(to_epoch_us(now) - rng.integers(0, days * _DAY_US, count))
+    followers = profiles['followers'][codes]
+    # Pareto tails: most posts get a little attention, a few go viral
+    typical = followers * profiles['engagement_rate'][codes] / 100 * 0.2
+    likes = (typical * (rng.pareto(1.8, count) + 0.3)).astype(np.int64)
+    comments = rng.binomial(likes, 0.08)
+    shares = (likes * rng.beta(1.0, 12.0, count)).astype(np.int64)
+    popularity = 1.0 / np.arange(1, len(TOPICS) + 1)
+    topics = rng.choice(len(TOPICS), count, p=popularity / popularity.sum())
+    return {
+        'codes': codes,
+        'topics': topics,
+        'timestamp': timestamps,
+        'likes': likes,
+        'comments': comments,
+        'shares': shares,
+        'engagement_rate': (likes + comments + shares) / followers * 100,
+    }
+
+
+def audience_registers(rng, profiles, codes, reach, precision=PRECISION):
+    """HyperLogLog registers of simulated audiences, one row per analytics row.
+
+    Each account reaches users drawn from a pool of twice its followers,
+    and neighbouring accounts' pools overlap by a quarter, so audiences
+    repeat across days and are partly shared across accounts. Every reached
+    user is drawn, so the cost grows with the total reach.
+    """
+    pools = np.maximum(profiles['followers'] * 2, 1).astype(np.int64)
+    offsets = np.r_[0, np.cumsum(pools * 3 // 4)[:-1]]
+    # Hash every user once; a day's audience is then a draw of positions
+    index, ranks = hll_ranks(hash64(np.arange((offsets + pools).max())), precision)
+    users = np.repeat(offsets[codes], reach) + rng.integers(0, np.repeat(pools[codes], reach))
+    keys = np.repeat(np.arange(len(codes), dtype=np.int64) << precision, reach) + index[users]
+    registers = np.zeros((len(codes), 1 << precision), dtype=np.uint8)
+    np.maximum.at(registers.reshape(-1), keys, ranks[users])
+    return registers
+
+
+def build_posts(names, columns, first_id=1):
+    """Post records from ``post_columns``, numbered from ``first_id``."""
+    platforms = [names[code] for code in columns['codes'].tolist()]
+    topics = [TOPICS[code] for code in columns['topics'].tolist()]
+    return [Post(first_id + i, platform, f"Sample post content for {platform} #{first_id + i} #{topic}", *row)
+            for i, (platform, topic, *row) in enumerate(zip(
+                platforms, topics, *(columns[name].tolist() for name in ('timestamp', 'likes', 'comments',
+                                                                         'shares', 'engagement_rate'))))]
+
+
+def generate(accounts=5, days=30, posts=20, seed=None, end=None, audience=False):
+    """Generate a dataset in the shape ``StorageBackend.load()`` returns.
+
+    ``accounts`` is a count or a list of names. Returns ``accounts`` (the
+    latest counters by name), ``analytics`` (an AnalyticsStore of ``days``
+    days per account up to ``end``, default today) and ``posts``. With
+    ``audience``, ``audience`` holds the HyperLogLog registers of each
+    analytics row's simulated audience. The same ``seed`` and ``end``
+    always give the same data.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(accounts) if not isinstance(accounts, int) else account_names(accounts)
+    now = datetime.now() if end is None else datetime.combine(end, datetime.max.time())
+    end = np.datetime64(now.date(), 'D')
+
+    profiles = account_profiles(rng, names)
+    codes, dates, columns = analytics_columns(rng, profiles, days, end)
+    store = AnalyticsStore.from_columns(names, codes, dates, columns)
+    last = store.offsets[1:] - 1
+    counters = {
+        name: {
+            'followers': int(columns['followers'][row]),
+            'engagement_rate': round(float(columns['engagement'][row]), 1),
+            'posts_today': int(columns['posts'][row]),
+            'reach': int(columns['reach'][row]),
+            'color': MockAdapter.ACCOUNTS.get(name, {'color': DEFAULT_COLOR})['color'],
+        }
+        for name, row in zip(names, last.tolist())
+    }
+    dataset = {
+        'accounts': counters,
+        'analytics': store,
+        'posts': build_posts(names, post_columns(rng, profiles, posts, days, now)),
+    }
+    if audience:
+        dataset['audience'] = audience_registers(rng, profiles, codes, columns['reach'])
+    return dataset
+
+
+def save(dataset, storage):
+    """Replace the contents of a storage backend with ``dataset``."""
+    storage.clear()
+    storage.save_accounts(dataset['accounts'])
+    store = dataset['analytics']
+    storage.append_analytics(store.platforms, store.codes, store.dates, store.columns)
+    storage.append_posts(dataset['posts'])
+
+
+def main(argv=None):
+    from storage import open_storage
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--accounts', type=int, default=500)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--storage', help='write to this storage url (sqlite:///path.db or npy:///directory)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    dataset = generate(args.accounts, args.days, args.posts, args.seed)
+    print(f"generated {len(dataset['analytics']):,} analytics rows and {len(dataset['posts']):,} posts "
+          f"in {time.perf_counter() - start:.2f}s")
+    if args.storage:
+        start = time.perf_counter()
+        storage = open_storage(args.storage)
+        save(dataset, storage)
+        storage.close()
+        print(f"wrote {args.storage} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Tenants
+Registry of every tenant's accounts with an LRU of loaded tenant data.
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+
+TENANT_NAME = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class TenantRegistry:
+    """Accounts keyed by ``(tenant, platform, account_id)`` plus loaded tenants.
+
+    Registering an account only records a small dict; a tenant's data is
+    built by ``loader(tenant, accounts)`` on first use and kept in an LRU of
+    at most ``max_loaded`` tenants, so memory is bounded by the number of
+    hot tenants rather than registered ones. ``busy(value)`` may veto the
+    eviction of a tenant that is still in use (e.g. has open streams), and
+    ``unload(value)`` is called on the evicted value.
+    """
+
+    def __init__(self, loader, max_loaded=32, busy=None, unload=None):
+        self.loader = loader
+        self.max_loaded = max_loaded
+        self.busy = busy
+        self.unload = unload
+        self.accounts = {}
+        self.loads = 0
+        self.evictions = 0
+        self._by_tenant = {}
+        self._loaded = OrderedDict()
+        self._pinned = set()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, tenant):
+        return tenant in self._by_tenant or tenant in self._loaded
+
+    def __len__(self):
+        return len(self._by_tenant.keys() | self._loaded.keys())
+
+    def register(self, tenant, platform, account_id, **info):
+        """Register (or update) one account; the tenant is created on first use."""
+        if not TENANT_NAME.match(tenant):
+            raise ValueError(f"invalid tenant name: {tenant!r}")
+        key = (tenant, platform, str(account_id))
+        with self._lock:
+            if key not in self.accounts:
+                self._by_tenant.setdefault(tenant, []).append(key)
+            self.accounts[key] = dict(info, tenant=tenant, platform=platform, account_id=str(account_id))
+
+    def register_file(self, path):
+        """Register the accounts listed in a JSON file of account objects."""
+        with open(path) as f:
+            for account in json.load(f):
+                account = dict(account)
+                self.register(account.pop('tenant'), account.pop('platform'), account.pop('account_id'), **account)
+
+    def tenants(self):
+        """Names of all registered or loaded tenants."""
+        return sorted(self._by_tenant.keys() | self._loaded.keys())
+
+    def accounts_of(self, tenant):
+        """The tenant's accounts in registration order.
+
+        Each account gets a ``label``, the name its series and posts are
+        stored under: the platform, or ``platform/account_id`` when the
+        tenant has several accounts on that platform.
+        """
+        accounts = [self.accounts[key] for key in self._by_tenant.get(tenant, ())]
+        counts = {}
+        for account in accounts:
+            counts[account['platform']] = counts.get(account['platform'], 0) + 1
+        return [dict(account, label=account['platform'] if counts[account['platform']] == 1
+                     else f"{account['platform']}/{account['account_id']}") for account in accounts]
+
+    def put(self, tenant, value, pinned=False):
+        """Install already loaded data for ``tenant``; pinned tenants are never evicted."""
+        with self._lock:
+            self._loaded[tenant] = value
+            self._loaded.move_to_end(tenant)
+            if pinned:
+                self._pinned.add(tenant)
+            evicted = self._evict()
+        self._unload(evicted)
+
+    def get(self, tenant):
+        """Return the tenant's loaded data, loading it if needed.
+
+        Raises KeyError for a tenant with no registered accounts.
+        """
+        with self._lock:
+            if tenant in self._loaded:
+                self._loaded.move_to_end(tenant)
+                return self._loaded[tenant]
+            if tenant not in self._by_tenant:
+                raise KeyError(tenant)
+            lock = self._loading.setdefault(tenant, threading.Lock())
+
+        # Load outside the registry lock so other tenants are served meanwhile
+        with lock:
+            with self._lock:
+                if tenant in self._loaded:
+                    self._loaded.move_to_end(tenant)
+                    return self._loaded[tenant]
+            value = self.loader(tenant, self.accounts_of(tenant))
+            with self._lock:
+                self.loads += 1
+                self._loaded[tenant] = value
+                self._loading.pop(tenant, None)
+                evicted = self._evict()
+        self._unload(evicted)
+        return value
+
+    def loaded(self):
+        """Names of the tenants currently in memory, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+    def items(self):
+        """``(tenant, value)`` pairs of the loaded tenants, without touching the LRU order."""
+        with self._lock:
+            return list(self._loaded.items())
+
+    def evict(self, tenant):
+        """Drop a tenant's data from memory; it is reloaded on next use."""
+        with self._lock:
+            value = self._loaded.pop(tenant, None)
+            self._pinned.discard(tenant)
+        self._unload([] if value is None else [value])
+
+    def _evict(self):
+        evicted = []
+        over = len(self._loaded) - self.max_loaded
+        # Never the most recently used tenant, which is being returned
+        for tenant in list(self._loaded)[:-1]:
+            if over <= 0:
+                break
+            value = self._loaded[tenant]
+            if tenant in self._pinned or (self.busy is not None and self.busy(value)):
+                continue
+            del self._loaded[tenant]
+            evicted.append(value)
+            self.evictions += 1
+            over -= 1
+        return evicted
+
+    def _unload(self, values):
+        if self.unload is not None:
+            for value in values:
+                self.unload(value)
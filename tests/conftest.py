@@ -0,0 +1,25 @@
+"""
+Shared test fixtures
+"""
+
+import pytest
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assets
+
+
+@pytest.fixture(autouse=True, scope='session')
+def static_dir(tmp_path_factory):
+    """The page's sources with a stand-in for the vendored Chart.js, which is not in the tree."""
+    source = tmp_path_factory.mktemp('static')
+    shutil.copytree(assets.STATIC_DIR, source, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns('dist', 'vendor'))
+    (source / 'vendor').mkdir()
+    (source / assets.CHART_JS).write_text('/* Chart.js */\n')
+    original, assets.STATIC_DIR = assets.STATIC_DIR, str(source)
+    yield source
+    assets.STATIC_DIR = original
@@ -0,0 +1,85 @@
+"""
+Unit tests for the columnar analytics store
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_store import AnalyticsStore
+
+
+def make_rows(platform, start, days, followers=100):
+    base = np.datetime64(start, 'D')
+    return [{
+        'date': str(base + i),
+        'platform': platform,
+        'followers': followers + i,
+        'engagement': float(i),
+        'reach': 1000 + i,
+        'posts': i % 3,
+    } for i in range(days)]
+
+
+class TestAnalyticsStore:
+    """Tests for AnalyticsStore."""
+
+    def test_rows_sorted_by_platform_and_date(self):
+        """Test that rows appended out of order end up sorted."""
+        store = AnalyticsStore(['A', 'B'])
+        rows = make_rows('B', '2024-01-01', 5) + make_rows('A', '2024-01-01', 5)
+        store.append(reversed(rows))
+        assert len(store) == 10
+        assert store.codes.tolist() == [0] * 5 + [1] * 5
+        assert np.all(np.diff(store.dates[store.platform_slice('A')]) > np.timedelta64(0, 'D'))
+
+    def test_platform_slice_and_tail(self):
+        """Test that per-platform lookups are slices."""
+        store = AnalyticsStore(['A', 'B'])
+        store.append(make_rows('A', '2024-01-01', 10) + make_rows('B', '2024-01-01', 4))
+        assert store.platform_slice('A') == slice(0, 10)
+        assert store.platform_slice('B') == slice(10, 14)
+        assert store.platform_slice('missing') == slice(0, 0)
+        tail = store.tail('A', 3)
+        assert store.columns['followers'][tail].tolist() == [107, 108, 109]
+
+    def test_window(self):
+        """Test date-window lookups."""
+        store = AnalyticsStore(['A'])
+        store.append(make_rows('A', '2024-01-01', 30))
+        rows = store.window('A', '2024-01-10', '2024-01-12')
+        assert [str(d) for d in store.dates[rows]] == ['2024-01-10', '2024-01-11', '2024-01-12']
+
+    def test_rows_between(self):
+        """Test that rows_between returns every platform's window in one pass."""
+        store = AnalyticsStore(['A', 'B', 'C'])
+        store.append(make_rows('A', '2024-01-01', 30) + make_rows('B', '2024-01-11', 5))
+        rows = store.rows_between(np.datetime64('2024-01-12'), np.datetime64('2024-01-13'))
+        assert [store.platforms[c] for c in store.codes[rows]] == ['A', 'A', 'B', 'B']
+        assert [str(d) for d in store.dates[rows]] == ['2024-01-12', '2024-01-13'] * 2
+
+    def test_incremental_append_merges(self):
+        """Test that later appends are merged into the sorted order."""
+        store = AnalyticsStore(['A', 'B'])
+        store.append(make_rows('A', '2024-01-01', 3) + make_rows('B', '2024-01-01', 3))
+        store.append(make_rows('A', '2024-01-04', 2, followers=200))
+        assert store.platform_slice('A') == slice(0, 5)
+        assert store.columns['followers'][store.tail('A', 2)].tolist() == [200, 201]
+        store.append(make_rows('C', '2024-01-01', 1))
+        assert store.platforms == ['A', 'B', 'C']
+        assert store.platform_slice('C') == slice(8, 9)
+
+    def test_records_roundtrip(self):
+        """Test that records() reproduces the legacy row shape."""
+        store = AnalyticsStore()
+        rows = make_rows('A', '2024-01-01', 2)
+        store.append(rows)
+        assert list(store.records()) == rows
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
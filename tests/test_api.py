@@ -0,0 +1,292 @@
+"""
+Tests for the dashboard HTTP API
+"""
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+
+
+@pytest.fixture
+def client():
+    return dashboard.app.test_client()
+
+
+class TestStatsEndpoint:
+    """Tests for /api/stats and its ``since`` deltas."""
+
+    @pytest.fixture
+    def data(self, monkeypatch):
+        monkeypatch.setattr(dashboard, 'ACCOUNT_LOG_SIZE', 3)
+        return dashboard.SocialMediaData()
+
+    @pytest.fixture
+    def stats(self, data):
+        client = dashboard.create_app(data).test_client()
+        return lambda since: client.get(f'/api/stats?since={since}')
+
+    def test_snapshot_then_deltas(self, data, stats):
+        """Test that a client gets a full snapshot, then only the fields changed since its version."""
+        snapshot = stats(0).get_json()
+        assert snapshot['full'] and snapshot['accounts'] == data.accounts
+        assert snapshot['version'] == f'{data.epoch}:{data.version}'
+        assert snapshot['versions'] == {platform: data.version for platform in data.platforms}
+        version = snapshot['version']
+
+        data.update_account('Twitter', followers=1, reach=data.accounts['Twitter']['reach'])
+        data.update_account('Twitter', followers=2)
+        data.add_posts([{'platform': 'Twitter', 'content': 'x', 'timestamp': '2024-01-01T00:00:00',
+                         'likes': 0, 'comments': 0, 'shares': 0, 'engagement_rate': 0.0}])
+        delta = stats(version).get_json()
+        assert delta == {'version': f'{data.epoch}:{data.version}', 'full': False,
+                         'accounts': {'Twitter': {'followers': 2}},
+                         'versions': {'Twitter': data.account_versions['Twitter']}}
+        assert stats(delta['version']).get_json()['accounts'] == {}
+
+    def test_unchanged_fields_do_not_bump_the_version(self, data):
+        """Test that an update repeating current values is ignored."""
+        version = data.version
+        data.update_account('Twitter', **data.accounts['Twitter'])
+        assert data.version == version
+
+    def test_too_far_behind_gets_a_snapshot(self, data, stats):
+        """Test that versions older than the change log, or unknown ones, get everything."""
+        version = data.version
+        for followers in range(5):
+            data.update_account('LinkedIn', followers=followers)
+        assert stats(f'{data.epoch}:{version}').get_json()['full']
+        assert stats(f'{data.epoch}:{data.version + 1}').get_json()['full']
+        recent = stats(f'{data.epoch}:{data.version - 2}').get_json()
+        assert not recent['full'] and recent['accounts'] == {'LinkedIn': {'followers': 4}}
+        data.generate_mock_data()
+        assert stats(f'{data.epoch}:{data.version - 1}').get_json()['full']
+
+    def test_versions_of_other_processes_get_a_snapshot(self, data, stats, monkeypatch):
+        """Test that a version counted by another process, or without its epoch, is not taken for this one's."""
+        data.update_account('LinkedIn', followers=1)
+        version = data.version - 1
+        assert stats(version).get_json()['full']
+        assert stats(f'0a1b2c3d:{version}').get_json()['full']
+        token = f'{data.epoch}:{version}'
+        assert not stats(token).get_json()['full']
+        # A worker forked from the process that counted the version gets a new epoch
+        monkeypatch.setattr(dashboard.os, 'getpid', lambda: -1)
+        assert stats(token).get_json()['full'] and data.epoch not in token
+
+    def test_bad_since(self, stats):
+        """Test that a malformed version is rejected."""
+        assert stats('abc').status_code == 400
+        assert stats('x:y').status_code == 400
+
+
+class TestAnalyticsEndpoint:
+    """Tests for /api/analytics."""
+
+    def test_default_is_last_seven_days(self, client):
+        """Test that the default response covers seven daily buckets."""
+        data = client.get('/api/analytics').get_json()
+        assert data['granularity'] == 'day'
+        assert len(data['dates']) == 7
+        for platform in data['platforms']:
+            assert len(platform['engagement']) == 7
+            assert isinstance(platform['followers'], int)
+
+    @pytest.mark.parametrize('granularity,range_,buckets', [('week', '4', 4), ('month', '2m', 2)])
+    def test_granularity(self, client, granularity, range_, buckets):
+        """Test week and month rollups."""
+        data = client.get(f'/api/analytics?granularity={granularity}&range={range_}').get_json()
+        assert data['granularity'] == granularity
+        assert len(data['dates']) == buckets
+        assert len(data['platforms'][0]['reach']) == buckets
+
+    def test_invalid_arguments(self, client):
+        """Test that bad arguments are rejected with 400."""
+        assert client.get('/api/analytics?granularity=hour').status_code == 400
+        assert client.get('/api/analytics?range=-3').status_code == 400
+        assert client.get('/api/analytics?range=99999999999999999999').status_code == 400
+        assert client.get('/api/analytics?max_points=2').status_code == 400
+        assert client.get('/api/analytics?max_points=many').status_code == 400
+
+    def test_max_points(self, client):
+        """Test that max_points downsamples every series onto a shared axis of that many dates."""
+        full = client.get('/api/analytics?range=30').get_json()
+        data = client.get('/api/analytics?range=30&max_points=10').get_json()
+        assert len(data['dates']) == 10
+        assert data['dates'][0] == full['dates'][0]
+        assert data['dates'][-1] == full['dates'][-1]
+        for platform, original in zip(data['platforms'], full['platforms']):
+            assert len(platform['engagement']) == len(platform['reach']) == 10
+            assert set(platform['engagement']) <= set(original['engagement'])
+            # LTTB keeps both endpoints of every series, not necessarily its extremes
+            for name in ('engagement', 'reach'):
+                assert platform[name][0] == original[name][0] and platform[name][-1] == original[name][-1]
+        assert client.get('/api/analytics?range=7&max_points=10').get_json()['dates'] == \
+            client.get('/api/analytics?range=7').get_json()['dates']
+
+
+class TestPostsEndpoint:
+    """Tests for /api/posts, /api/posts/top and /api/posts/search."""
+
+    def test_default_page(self, client):
+        """Test that the default page has the ten newest posts."""
+        posts = client.get('/api/posts').get_json()
+        assert len(posts) == 10
+        keys = [(p['timestamp'], p['id']) for p in posts]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_pagination_and_filter(self, client):
+        """Test the after cursor and platform filter."""
+        first = client.get('/api/posts?limit=3&platform=Instagram').get_json()
+        assert {p['platform'] for p in first} == {'Instagram'}
+        second = client.get(f"/api/posts?limit=3&platform=Instagram&after={first[-1]['id']}").get_json()
+        assert not {p['id'] for p in first} & {p['id'] for p in second}
+        assert client.get('/api/posts?after=999999').status_code == 400
+
+    def test_top_posts(self, client):
+        """Test top posts by a metric."""
+        posts = client.get('/api/posts/top?by=shares&limit=5').get_json()
+        shares = [p['shares'] for p in posts]
+        assert shares == sorted(shares, reverse=True)
+        assert client.get('/api/posts/top?by=views').status_code == 400
+
+    def test_search(self, client):
+        """Test searching post content with a platform filter, time range and paging."""
+        post = client.get('/api/posts?limit=1').get_json()[0]
+        found = client.get(f"/api/posts/search?q=%23{post['id']}").get_json()
+        assert found['query'] == [f"#{post['id']}"]
+        assert found['total'] == 1 and found['posts'] == [post]
+
+        expected = [p for p in client.get('/api/posts?platform=Instagram&limit=100').get_json()
+                    if 'sample post' in p['content'].lower()]
+        first = client.get('/api/posts/search?q=sample+post&platform=Instagram&limit=3').get_json()
+        assert first['total'] == len(expected)
+        second = client.get(f"/api/posts/search?q=sample+post&platform=Instagram&limit=3"
+                            f"&after={first['posts'][-1]['id']}").get_json()
+        assert first['posts'] + second['posts'] == expected[:6]
+
+        since = post['timestamp'][:10]
+        recent = client.get(f'/api/posts/search?q=sample&since={since}&limit=100').get_json()
+        assert recent['posts'] and all(p['timestamp'] >= since for p in recent['posts'])
+
+    @pytest.mark.parametrize('query', ['', 'q=', 'q=!!', 'q=' + '+'.join('abcdefghi'), 'q=x&after=999999',
+                                       'q=x&since=yesterday'])
+    def test_search_errors(self, client, query):
+        """Test that empty, oversized or malformed searches are rejected."""
+        assert client.get(f'/api/posts/search?{query}').status_code == 400
+
+
+class TestTrendsEndpoint:
+    """Tests for /api/trends."""
+
+    def test_trends(self, client):
+        """Test that every platform gets growth, rolling means and anomalies."""
+        data = client.get('/api/trends?days=14&window=3').get_json()
+        assert len(data['dates']) == 14
+        assert data['window'] == 3
+        assert [p['name'] for p in data['platforms']] == dashboard.social_data.platforms
+        for platform in data['platforms']:
+            assert len(platform['engagement_ma']) == len(platform['engagement_z']) == 14
+            assert isinstance(platform['followers_dod'], (int, float))
+            assert set(platform['anomalies']) <= set(data['dates'])
+
+    def test_invalid_arguments(self, client):
+        """Test that out-of-range arguments are rejected with 400."""
+        for query in ('days=0', 'window=1000', 'threshold=0'):
+            response = client.get(f'/api/trends?{query}')
+            assert response.status_code == 400
+            assert 'error' in response.get_json()
+
+
+class TestAudienceEndpoint:
+    """Tests for /api/audience."""
+
+    def test_group_audience_and_percentiles(self, client):
+        """Test that a group's audience is about between its largest member's and the sum of its members'."""
+        data = client.get('/api/audience?platforms=Instagram,TikTok&granularity=week&range=4').get_json()
+        assert len(data['dates']) == 4
+        assert len(data['audience']) == len(data['engagement_p90']) == len(data['samples']) == 4
+        members = [platform['audience'] for platform in data['platforms']]
+        assert [platform['name'] for platform in data['platforms']] == ['Instagram', 'TikTok']
+        assert max(members) <= data['total']['audience'] <= sum(members) * 1.05
+        if data['total']['samples']:
+            assert data['total']['engagement_p50'] <= data['total']['engagement_p99']
+        assert client.get('/api/audience').get_json()['platforms'][0]['name'] == 'Facebook'
+
+    @pytest.mark.parametrize('query', ['platforms=Myspace', 'range=0', 'range=99999999999999999999',
+                                       'granularity=hour'])
+    def test_errors(self, client, query):
+        """Test that unknown platforms and bad ranges are rejected."""
+        assert client.get(f'/api/audience?{query}').status_code == 400
+
+
+class TestDashboardEndpoint:
+    """Tests for /api/dashboard."""
+
+    def test_combines_the_three_endpoints(self, client):
+        """Test that the combined payload matches the separate endpoints."""
+        data = client.get('/api/dashboard').get_json()
+        assert data['stats'] == client.get('/api/stats').get_json()
+        assert data['analytics'] == client.get('/api/analytics').get_json()
+        assert data['posts'] == client.get('/api/posts').get_json()
+        assert data['trends'] == client.get('/api/trends?days=7').get_json()
+        social_data = dashboard.social_data
+        assert data['version'] == f'{social_data.epoch}:{social_data.version}'
+
+    def test_passes_query_args(self, client):
+        """Test that analytics and posts args reach their parts."""
+        data = client.get('/api/dashboard?granularity=week&range=4w&limit=3&platform=Twitter').get_json()
+        assert data['analytics']['granularity'] == 'week'
+        assert len(data['analytics']['dates']) == 4
+        assert len(data['posts']) <= 3
+        assert all(post['platform'] == 'Twitter' for post in data['posts'])
+
+    def test_invalid_arguments(self, client):
+        """Test that an invalid part fails the whole request with 400."""
+        assert client.get('/api/dashboard?range=forever').status_code == 400
+        assert client.get('/api/dashboard?range=99999999999999999999').status_code == 400
+        assert client.get('/api/dashboard?after=999999').status_code == 400
+
+
+class TestResponseCache:
+    """Tests for ETag revalidation and version-based invalidation."""
+
+    @pytest.mark.parametrize('path', ['/api/stats', '/api/analytics', '/api/posts', '/api/dashboard'])
+    def test_etag_and_304(self, client, path):
+        """Test that a matching If-None-Match gets an empty 304."""
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        assert etag.startswith('"')
+        second = client.get(path, headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == etag
+
+    def test_query_args_are_part_of_the_key(self, client):
+        """Test that different query args are cached separately."""
+        week = client.get('/api/analytics?granularity=week')
+        month = client.get('/api/analytics?granularity=month')
+        assert week.headers['ETag'] != month.headers['ETag']
+
+    def test_data_change_invalidates(self, client):
+        """Test that a data change produces a new body and ETag."""
+        etag = client.get('/api/stats').headers['ETag']
+        followers = dashboard.social_data.accounts['Facebook']['followers']
+        dashboard.social_data.update_account('Facebook', followers=followers + 1)
+        response = client.get('/api/stats', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()['Facebook']['followers'] == followers + 1
+
+    def test_errors_are_not_cached(self, client):
+        """Test that error responses bypass the cache."""
+        assert client.get('/api/analytics?granularity=hour').status_code == 400
+        assert 'ETag' not in client.get('/api/analytics?granularity=hour').headers
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+"""
+Tests for the static asset bundle and its routes
+"""
+
+import pytest
+import gzip
+import hashlib
+import io
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+import assets
+from assets import CHART_JS, CHART_JS_URL, AssetBundle
+
+
+@pytest.fixture
+def source(tmp_path):
+    (tmp_path / 'index.html').write_text(
+        '<link rel="stylesheet" href="/assets/app.css">'
+        '<script src="/assets/vendor/chart.umd.js"></script>'
+        '<script src="/assets/app.js"></script>')
+    (tmp_path / 'app.css').write_text('body { margin: 0; }\n' * 50)
+    (tmp_path / 'app.js').write_text('console.log("dashboard");\n' * 50)
+    (tmp_path / 'vendor').mkdir()
+    (tmp_path / CHART_JS).write_text('/* chart */')
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    dashboard.app.config['TESTING'] = True
+    with dashboard.app.test_client() as client:
+        yield client
+
+
+class TestAssetBundle:
+    """Tests for AssetBundle."""
+
+    def test_links_are_content_hashed(self, source):
+        """Test that the page links to hash-named assets and the hash follows the content."""
+        bundle = AssetBundle(str(source))
+        page = bundle.page.body.decode()
+        names = re.findall(r'/assets/([^"]+)', page)
+        assert [name.split('.')[0] for name in names] == ['app', 'vendor/chart', 'app']
+        assert all(bundle.get(name) is not None for name in names)
+        (source / 'app.js').write_text('console.log("changed");\n' * 50)
+        changed = AssetBundle(str(source))
+        assert changed.get(names[0]) is not None
+        assert changed.get(names[2]) is None
+
+    def test_missing_vendor_file_fails(self, source):
+        """Test that the page fails to build until Chart.js is vendored, and never links its CDN."""
+        (source / CHART_JS).unlink()
+        with pytest.raises(ValueError, match='not vendored'):
+            AssetBundle(str(source))
+        (source / CHART_JS).write_text('/* chart */')
+        page = AssetBundle(str(source)).page.body.decode()
+        assert CHART_JS_URL not in page
+        assert '/assets/vendor/chart.umd.' in page
+
+    def test_vendor_checks_the_digest(self, source, monkeypatch):
+        """Test that a download with another sha256 is rejected and nothing is written."""
+        body = b'/* fetched */'
+        monkeypatch.setattr(assets.urllib.request, 'urlopen', lambda url, timeout: io.BytesIO(body))
+        with pytest.raises(ValueError, match='expected'):
+            assets.vendor('0' * 64, str(source))
+        assert (source / CHART_JS).read_text() == '/* chart */'
+        assets.vendor(hashlib.sha256(body).hexdigest(), str(source))
+        assert (source / CHART_JS).read_bytes() == body
+
+    def test_missing_asset(self, source):
+        """Test that a link to an asset that does not exist fails the build."""
+        (source / 'app.css').unlink()
+        with pytest.raises(ValueError):
+            AssetBundle(str(source))
+
+    def test_precompressed_variants(self, source):
+        """Test that assets carry a gzip variant of their body."""
+        bundle = AssetBundle(str(source))
+        asset = bundle.get(re.search(r'/assets/(app\.[0-9a-f]+\.js)', bundle.page.body.decode())[1])
+        assert gzip.decompress(asset.encodings['gzip']) == asset.body
+
+    def test_write(self, source, tmp_path):
+        """Test that the bundle is written with its variants and a manifest."""
+        output = tmp_path / 'dist'
+        manifest = AssetBundle(str(source)).write(str(output))
+        assert (output / 'index.html').is_file()
+        assert (output / 'assets' / manifest['app.js']).is_file()
+        assert (output / 'assets' / (manifest['app.js'] + '.gz')).is_file()
+        assert (output / 'manifest.json').is_file()
+
+
+class TestAssetRoutes:
+    """Tests for serving the page and its assets."""
+
+    def test_page(self, client):
+        """Test that / is the static page, revalidated on every load."""
+        response = client.get('/')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/html'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert response.get_data(as_text=True).count('/assets/dashboard.') == 2
+
+    def test_assets_are_immutable(self, client):
+        """Test that hash-named assets are cacheable for a year and 304 on a matching ETag."""
+        name = re.search(r'/assets/(dashboard\.[0-9a-f]+\.js)', client.get('/').get_data(as_text=True))[1]
+        response = client.get(f'/assets/{name}')
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert b'loadDashboard' in response.data
+        cached = client.get(f'/assets/{name}', headers={'If-None-Match': response.headers['ETag']})
+        assert cached.status_code == 304
+        assert client.get('/assets/dashboard.js').status_code == 404
+
+    def test_precompressed_response(self, client):
+        """Test that a client accepting gzip gets the precompressed variant."""
+        response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == client.get('/').data
+        assert response.headers['ETag'] != client.get('/').headers['ETag']
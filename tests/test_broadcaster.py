@@ -0,0 +1,106 @@
+"""
+Tests for the server-sent events broadcaster
+"""
+
+import pytest
+import os
+import sys
+import json
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broadcaster import Broadcaster, RESYNC, format_event
+
+
+def parse(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+    return fields['event'], json.loads(fields['data'])
+
+
+class TestBroadcaster:
+    """Tests for Broadcaster fan-out."""
+
+    def test_format_event(self):
+        """Test the wire format of one event."""
+        assert format_event('posts', {'a': 1}, 7) == b'id: 7\nevent: posts\ndata: {"a":1}\n\n'
+
+    def test_every_subscriber_receives_every_event(self):
+        """Test fan-out to a few thousand subscribers in order."""
+        broadcaster = Broadcaster(queue_size=64)
+        subscriptions = [broadcaster.subscribe() for _ in range(3000)]
+        for i in range(20):
+            assert broadcaster.publish('tick', {'n': i}) == 3000
+        for subscription in subscriptions:
+            received = [parse(subscription.get(timeout=0))[1]['n'] for _ in range(20)]
+            assert received == list(range(20))
+            assert subscription.get(timeout=0) is None
+
+    def test_overflow_turns_into_resync(self):
+        """Test that a slow subscriber gets a resync instead of blocking."""
+        broadcaster = Broadcaster(queue_size=4)
+        slow = broadcaster.subscribe()
+        for i in range(10):
+            broadcaster.publish('tick', {'n': i})
+        chunks = []
+        while (chunk := slow.get(timeout=0)) is not None:
+            chunks.append(chunk)
+        assert RESYNC in chunks
+        assert len(chunks) <= 4
+        assert slow.dropped > 0
+
+    def test_unsubscribe(self):
+        """Test that unsubscribed clients stop receiving events."""
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe()
+        broadcaster.unsubscribe(subscription)
+        assert broadcaster.publish('tick', {}) == 0
+        assert len(broadcaster) == 0
+
+    def test_concurrent_consumers(self):
+        """Test thousands of subscribers drained by concurrent reader threads."""
+        broadcaster = Broadcaster(queue_size=1024)
+        subscriptions = [broadcaster.subscribe() for _ in range(2000)]
+        events = 50
+        counts = [0] * len(subscriptions)
+
+        def drain(indices):
+            for i in indices:
+                for _ in range(events):
+                    if subscriptions[i].get(timeout=5) is not None:
+                        counts[i] += 1
+
+        readers = [threading.Thread(target=drain, args=(range(k, len(subscriptions), 16),)) for k in range(16)]
+        for reader in readers:
+            reader.start()
+        for i in range(events):
+            broadcaster.publish('tick', {'n': i})
+        for reader in readers:
+            reader.join()
+        assert counts == [events] * len(subscriptions)
+
+
+class TestStreamEndpoint:
+    """Tests for /api/stream."""
+
+    def test_stream_pushes_deltas(self):
+        """Test that data changes arrive as events on the stream."""
+        import dashboard
+        response = dashboard.app.test_client().get('/api/stream', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry:')
+        assert parse(next(chunks))[0] == 'hello'
+        # A value the account does not have yet, or the update changes nothing and sends no event
+        posts_today = dashboard.social_data.accounts['Twitter']['posts_today'] + 1
+        dashboard.social_data.update_account('Twitter', posts_today=posts_today)
+        event, data = parse(next(chunks))
+        assert event == 'accounts'
+        assert data['accounts'] == {'Twitter': {'posts_today': posts_today}}
+        assert data['version'] == f'{dashboard.social_data.epoch}:{dashboard.social_data.version}'
+        response.close()
+        assert len(dashboard.broadcaster) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+"""
+Unit tests for LTTB downsampling
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import downsample, lttb
+
+
+def reference_lttb(values, max_points):
+    """Point-by-point LTTB, as in the original description of the algorithm."""
+    n = len(values)
+    every = (n - 2) / (max_points - 2)
+    kept = [0]
+    for bucket in range(max_points - 2):
+        lo, hi = int(bucket * every) + 1, int((bucket + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((bucket + 2) * every) + 1, n)
+        if bucket == max_points - 3:
+            next_lo, next_hi = n - 1, n
+        next_x, next_y = (next_lo + next_hi - 1) / 2, values[next_lo:next_hi].mean()
+        a = kept[-1]
+        areas = [abs((a - next_x) * (values[i] - values[a]) - (a - i) * (next_y - values[a])) for i in range(lo, hi)]
+        kept.append(lo + int(np.argmax(areas)))
+    return kept + [n - 1]
+
+
+class TestLTTB:
+    """Tests for lttb."""
+
+    @pytest.mark.parametrize('n,max_points', [(1000, 50), (365, 100), (31, 3)])
+    def test_matches_reference(self, n, max_points):
+        """Test that every row matches the point-by-point algorithm."""
+        values = np.random.default_rng(0).normal(size=(3, n)).cumsum(axis=1)
+        kept = lttb(values, max_points)
+        assert kept.shape == (3, max_points)
+        for row, indices in zip(values, kept):
+            assert indices.tolist() == reference_lttb(row, max_points)
+
+    def test_short_series_are_kept(self):
+        """Test that series no longer than max_points are returned whole."""
+        assert lttb(np.ones((2, 5)), 10).tolist() == [list(range(5))] * 2
+
+    def test_keeps_spikes_and_skips_gaps(self):
+        """Test that a lone spike survives and NaN points are not chosen over real ones."""
+        values = np.zeros((1, 200))
+        values[0, 117] = 50.0
+        values[0, 40:45] = np.nan
+        kept = lttb(values, 20)[0]
+        assert 117 in kept
+        assert not np.isnan(values[0, kept]).any()
+
+
+class TestDownsample:
+    """Tests for downsample."""
+
+    def test_shared_axis(self):
+        """Test that all rows share max_points positions and keep their own spikes."""
+        values = np.random.default_rng(1).normal(size=(4, 500))
+        spikes = [30, 170, 280, 455]
+        values[range(4), spikes] = 100.0
+        positions, kept = downsample(values, 50)
+        assert positions.tolist() == sorted(set(positions.tolist()))
+        assert positions[0] == 0 and positions[-1] == 499
+        assert kept.shape == (4, 50)
+        assert (kept.max(axis=1) == 100.0).all()
+
+    def test_nothing_to_do(self):
+        """Test that a grid within max_points is returned unchanged."""
+        values = np.arange(6.0).reshape(2, 3)
+        positions, kept = downsample(values, 3)
+        assert positions.tolist() == [0, 1, 2]
+        assert kept is values or np.array_equal(kept, values)
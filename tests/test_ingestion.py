@@ -0,0 +1,76 @@
+"""
+Tests for the ingestion pipeline
+"""
+
+import pytest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from ingestion import IngestionPipeline, MockAdapter, PlatformAdapter, RateLimiter, batched
+
+
+class FailingAdapter(PlatformAdapter):
+    platform = 'Broken'
+
+    def fetch_account(self):
+        return {'followers': 1, 'engagement_rate': 0, 'posts_today': 0, 'reach': 0, 'color': '#000'}
+
+    def fetch_page(self, kind, cursor, since):
+        raise RuntimeError('upstream down')
+
+
+class TestIngestion:
+    """Tests for adapters and IngestionPipeline."""
+
+    def test_batched(self):
+        """Test splitting a generator into batches."""
+        assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_adapter_pages_through_records(self):
+        """Test that records() walks every page lazily."""
+        adapter = MockAdapter('Facebook', days=25, posts=3, page_size=10)
+        records = adapter.records('analytics')
+        assert next(records)['platform'] == 'Facebook'
+        assert len(list(records)) == 24
+        assert len(list(adapter.records('posts'))) == 3
+
+    def test_rate_limiter(self):
+        """Test that the limiter spaces out calls beyond the burst."""
+        limiter = RateLimiter(rate=100, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        assert time.monotonic() - start >= 0.04
+
+    def test_pipeline_bulk_appends_in_batches(self):
+        """Test that every record lands in the store in batch-sized appends."""
+        data = dashboard.SocialMediaData()
+        events = []
+        data.listeners.append(lambda event, payload: events.append(event))
+        rows_before = len(data.analytics)
+        posts_before = len(data.recent_posts)
+        adapters = [MockAdapter(platform, days=100, posts=30) for platform in ('Facebook', 'Mastodon')]
+        report = IngestionPipeline(data, adapters, batch_size=40).run()
+        assert report.analytics == {'Facebook': 100, 'Mastodon': 100}
+        assert report.posts == {'Facebook': 30, 'Mastodon': 30}
+        assert len(data.analytics) == rows_before + 200
+        assert len(data.recent_posts) == posts_before + 60
+        assert 'Mastodon' in data.platforms and 'Mastodon' in data.accounts
+        assert events.count('analytics') == 6
+        ids = [post['id'] for post in data.recent_posts]
+        assert len(set(ids)) == len(ids)
+
+    def test_adapter_errors_are_reported(self):
+        """Test that one failing adapter does not stop the others."""
+        data = dashboard.SocialMediaData()
+        report = IngestionPipeline(data, [FailingAdapter(), MockAdapter('Twitter', days=5, posts=0)]).run()
+        assert isinstance(report.errors['Broken'], RuntimeError)
+        assert report.analytics == {'Twitter': 5}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,39 @@
+"""
+Smoke tests for the benchmark tooling
+"""
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import compare, loadgen
+
+
+class TestLoadgen:
+    """Tests for the load generator and result comparison."""
+
+    def test_short_run_reports_percentiles(self):
+        """Test a short in-process run."""
+        results = loadgen.run(loadgen.TestClientTransport(), duration=0.3, concurrency=2, warmup=0)
+        total = results['total']
+        assert total['requests'] > 0
+        assert total['errors'] == 0
+        assert total['p50_ms'] <= total['p95_ms'] <= total['p99_ms']
+        assert total['not_modified'] > 0
+
+    def test_compare_flags_regressions(self):
+        """Test that a throughput drop beyond the threshold is flagged."""
+        endpoint = {'requests': 10, 'throughput_rps': 100.0, 'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 3.0}
+        before = {'endpoints': {'/api/stats': endpoint}, 'total': endpoint}
+        slower = dict(endpoint, throughput_rps=80.0)
+        after = {'endpoints': {'/api/stats': slower}, 'total': slower}
+        _, regressions = compare.compare(before, after, threshold=10)
+        assert {(path, metric) for path, metric, *_ in regressions} == {('/api/stats', 'throughput_rps'),
+                                                                         ('TOTAL', 'throughput_rps')}
+        assert compare.compare(before, before, threshold=10)[1] == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -47,6 +47,28 @@ class TestDashboard:
         if HAS_DASHBOARD:
             assert hasattr(dashboard, '__name__')
 
+    def test_data_is_built_on_first_use(self):
+        """Test that creating an app does not build its dataset until a request needs it."""
+        app = dashboard.create_app()
+        state = app.extensions['dashboard']
+        assert not state.loaded
+        client = app.test_client()
+        assert client.get('/metrics').status_code == 200
+        assert not state.loaded
+        assert client.get('/api/stats').status_code == 200
+        assert state.loaded
+        subscription = state.broadcaster.subscribe()
+        state.data.touch('resync', {})
+        assert subscription.get(timeout=1) is not None
+
+    def test_page_is_built_once(self):
+        """Test that the page and its assets are built on the first render and reused."""
+        app = dashboard.create_app(dashboard.SocialMediaData())
+        client = app.test_client()
+        assert client.get('/').status_code == 200
+        bundle = app.extensions['assets']
+        assert client.get('/').status_code == 200
+        assert app.extensions['assets'] is bundle
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
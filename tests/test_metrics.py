@@ -0,0 +1,113 @@
+"""
+Tests for the metrics registry, /metrics and the request profiler
+"""
+
+import pytest
+import os
+import pstats
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from metrics import CACHE_RESULTS, STAGE_SECONDS, Counter, Gauge, Histogram, render
+
+
+class TestMetrics:
+    """Tests for the metric types."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram samples count every observation at or below each bound."""
+        histogram = Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'a')
+        text = histogram.render()
+        assert 'latency_seconds_bucket{route="a",le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{route="a",le="1.0"} 3' in text
+        assert 'latency_seconds_bucket{route="a",le="+Inf"} 4' in text
+        assert 'latency_seconds_sum{route="a"} 3.65' in text
+        assert 'latency_seconds_count{route="a"} 4' in text
+        assert histogram.count('a') == 4
+
+    def test_counter_and_gauge(self):
+        """Test that counters accumulate and gauges are read at render time."""
+        counter = Counter('hits_total', 'Hits.', ('result',))
+        counter.inc('hit')
+        counter.inc('hit', amount=2)
+        sizes = {'x': 1}
+        gauge = Gauge('size', 'Size.', ('name',), lambda: [((name,), value) for name, value in sizes.items()])
+        sizes['x'] = 5
+        text = render([counter, gauge])
+        assert '# TYPE hits_total counter\nhits_total{result="hit"} 3\n' in text
+        assert 'size{name="x"} 5\n' in text
+        assert counter.value('hit') == 3
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes and newlines in label values are escaped."""
+        counter = Counter('c', 'C.', ('label',))
+        counter.inc('a"b\nc')
+        assert 'c{label="a\\"b\\nc"} 1' in counter.render()
+
+
+@pytest.fixture
+def client():
+    dashboard.app.config['TESTING'] = True
+    with dashboard.app.test_client() as client:
+        yield client
+
+
+class TestMetricsEndpoint:
+    """Tests for /metrics and the instrumented routes."""
+
+    def test_metrics_endpoint(self, client):
+        """Test that /metrics reports request, stage, cache and data-size metrics."""
+        client.get('/api/analytics?range=30')
+        client.get('/api/analytics?range=30')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert 'dashboard_request_duration_seconds_count{route="dashboard.get_analytics",status="200"}' in text
+        assert 'dashboard_stage_duration_seconds_count{route="dashboard.get_analytics",stage="query"}' in text
+        assert 'dashboard_response_bytes_count{route="dashboard.get_analytics"}' in text
+        assert 'dashboard_analytics_rows{tenant="default"} ' in text
+        assert 'dashboard_tenants{state="loaded"} ' in text
+        assert CACHE_RESULTS.value('dashboard.get_analytics', 'hit') >= 1
+
+    def test_cache_results(self, client):
+        """Test that cache lookups are counted as miss, hit and not_modified."""
+        dashboard.social_data.touch()
+        counts = {result: CACHE_RESULTS.value('dashboard.get_stats', result)
+                  for result in ('miss', 'hit', 'not_modified')}
+        client.get('/api/stats')
+        etag = client.get('/api/stats').headers['ETag']
+        client.get('/api/stats', headers={'If-None-Match': etag})
+        for result in counts:
+            assert CACHE_RESULTS.value('dashboard.get_stats', result) == counts[result] + 1
+
+    def test_dashboard_stages_are_attributed_to_the_route(self, client):
+        """Test that stages run on the fan-out pool are labelled with the request route."""
+        dashboard.social_data.touch()
+        before = STAGE_SECONDS.count('dashboard.get_dashboard', 'trends')
+        assert client.get('/api/dashboard').status_code == 200
+        assert STAGE_SECONDS.count('dashboard.get_dashboard', 'trends') == before + 1
+
+
+class TestProfiler:
+    """Tests for the per-request profiler."""
+
+    def test_disabled_by_default(self, client):
+        """Test that ?profile=1 is ignored unless a profile directory is configured."""
+        response = client.get('/api/stats?profile=1')
+        assert 'X-Profile' not in response.headers
+
+    def test_profile_dump(self, client, tmp_path, monkeypatch):
+        """Test that ?profile=1 writes a loadable pstats file for that request."""
+        monkeypatch.setitem(dashboard.app.config, 'PROFILE_DIR', str(tmp_path))
+        assert 'X-Profile' not in client.get('/api/stats').headers
+        response = client.get('/api/trends?profile=1')
+        assert response.status_code == 200
+        path = tmp_path / response.headers['X-Profile']
+        assert path.name.startswith('dashboard.get_trends-')
+        stats = pstats.Stats(str(path))
+        assert any(name == 'compute_trends' for _, _, name in stats.stats)
@@ -0,0 +1,144 @@
+"""
+Tests for the posts index
+"""
+
+import pytest
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from posts_index import Post, PostIndex, from_epoch_us, to_epoch_us
+
+
+def make_posts(n, seed=0):
+    rng = random.Random(seed)
+    return [Post.from_dict({
+        'id': i + 1,
+        'platform': rng.choice(['A', 'B', 'C']),
+        'content': f'post {i + 1}',
+        'timestamp': f'2024-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00',
+        'likes': rng.randint(0, 1000),
+        'comments': rng.randint(0, 50),
+        'shares': rng.randint(0, 100),
+        'engagement_rate': rng.uniform(0, 10),
+    }) for i in range(n)]
+
+
+def newest_first(posts):
+    return sorted(posts, key=lambda p: (p.timestamp, p.id), reverse=True)
+
+
+class TestPostIndex:
+    """Tests for PostIndex."""
+
+    def test_recent_matches_full_sort(self):
+        """Test that recent() agrees with sorting everything."""
+        posts = make_posts(500)
+        index = PostIndex(posts[:200])
+        for post in posts[200:]:
+            index.add([post])
+        assert index.recent(25) == newest_first(posts)[:25]
+
+    def test_cursor_pagination_covers_everything_once(self):
+        """Test walking every page with the after cursor."""
+        posts = make_posts(137)
+        index = PostIndex(posts)
+        seen, after = [], None
+        while page := index.recent(10, after):
+            seen.extend(page)
+            after = page[-1].id
+        assert seen == newest_first(posts)
+
+    def test_platform_filter(self):
+        """Test recent posts of one platform."""
+        posts = make_posts(300)
+        index = PostIndex(posts)
+        expected = [p for p in newest_first(posts) if p.platform == 'B']
+        first = index.recent(10, platform='B')
+        assert first == expected[:10]
+        assert index.recent(10, after=first[-1].id, platform='B') == expected[10:20]
+        assert index.recent(10, platform='missing') == []
+
+    @pytest.mark.parametrize('metric', ['likes', 'shares', 'engagement_rate'])
+    def test_top(self, metric):
+        """Test top-K by metric, with and without a platform filter."""
+        posts = make_posts(400)
+        index = PostIndex(posts)
+        by_metric = sorted(posts, key=lambda p: (getattr(p, metric), p.id), reverse=True)
+        assert index.top(metric, 5) == by_metric[:5]
+        assert index.top(metric, 5, platform='C') == [p for p in by_metric if p.platform == 'C'][:5]
+
+    def test_replacing_a_post(self):
+        """Test that re-adding an id replaces its index entries."""
+        posts = make_posts(10)
+        index = PostIndex(posts)
+        updated = Post.from_dict(dict(posts[0].to_dict(), likes=10 ** 6))
+        index.add([updated])
+        assert len(index) == 10
+        assert index.top('likes', 1) == [updated]
+
+    def test_mixed_int_and_float_metrics(self):
+        """Test that int and float values of one metric sort together."""
+        posts = make_posts(20)
+        index = PostIndex(posts)
+        extra = [Post.from_dict(dict(posts[0].to_dict(), id=21, likes=5000.0, engagement_rate=50)),
+                 Post.from_dict(dict(posts[1].to_dict(), id=22, likes=4000, engagement_rate=40.5))]
+        index.add(extra)
+        assert index.top('likes', 2) == extra
+        assert index.top('engagement_rate', 2) == extra
+        index.add([Post.from_dict(dict(extra[0].to_dict(), likes=0))])
+        assert index.top('likes', 1) == extra[1:]
+
+
+
+class TestPost:
+    """Tests for the compact Post record."""
+
+    def test_copies_change_independently(self):
+        """Test that adding and replacing posts in a copy spanning many chunks leaves the original alone."""
+        posts = make_posts(5000)
+        index = PostIndex(posts[:4000])
+        copy = index.copy()
+        replaced = Post.from_dict(dict(posts[10].to_dict(), likes=10 ** 6, timestamp='2030-01-01T00:00:00'))
+        copy.add(posts[4000:] + [replaced])
+        copy.commit()
+        assert len(index) == 4000 and len(copy) == 5000
+        assert index.recent(4000) == newest_first(posts[:4000])
+        assert index.top('likes', 1)[0].id != replaced.id
+        current = posts[:10] + [replaced] + posts[11:]
+        assert copy.recent(5000) == newest_first(current)
+        assert copy.recent(3, after=replaced.id) == newest_first(current)[1:4]
+        assert copy.top('likes', 1) == [replaced] and copy.posts[replaced.id] is replaced
+        assert index.posts[replaced.id] is posts[10] and sorted(copy.posts) == list(range(1, 5001))
+
+    def test_dict_roundtrip(self):
+        """Test that the JSON shape survives a roundtrip."""
+        post = {'id': 7, 'platform': 'A', 'content': 'x', 'timestamp': '2024-05-06T07:08:09.123456',
+                'likes': 1, 'comments': 2, 'shares': 3, 'engagement_rate': 4.5}
+        assert Post.from_dict(post).to_dict() == post
+
+    @pytest.mark.parametrize('post_id', [-1, 2 ** 32, 1.5, '7'])
+    def test_rejects_ids_outside_32_bits(self, post_id):
+        """Test that ids the index cannot pack are rejected."""
+        with pytest.raises(ValueError):
+            Post.from_dict({'id': post_id, 'platform': 'A', 'content': 'x', 'timestamp': '2024-05-06T07:08:09',
+                            'likes': 1, 'comments': 2, 'shares': 3, 'engagement_rate': 4.5})
+
+    def test_epoch_timestamps(self):
+        """Test the integer timestamp conversion."""
+        assert to_epoch_us('1970-01-02T00:00:00') == 86400 * 10 ** 6
+        assert from_epoch_us(86400 * 10 ** 6) == '1970-01-02T00:00:00'
+
+    def test_no_instance_dict_and_interned_platform(self):
+        """Test that posts are slotted and share platform strings."""
+        a, b = make_posts(2)
+        assert not hasattr(a, '__dict__')
+        c = Post.from_dict(dict(a.to_dict(), platform=''.join(['A'])))
+        d = Post.from_dict(dict(b.to_dict(), platform=''.join(['A'])))
+        assert c.platform is d.platform
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
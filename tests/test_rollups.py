@@ -0,0 +1,100 @@
+"""
+Unit tests for the rollup engine
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_store import AnalyticsStore
+from rollups import RollupEngine, bucket_starts, parse_range
+
+
+def make_rows(platform, start, days):
+    base = np.datetime64(start, 'D')
+    return [{
+        'date': str(base + i),
+        'platform': platform,
+        'followers': 1000 + i,
+        'engagement': float(i % 10),
+        'reach': 100,
+        'posts': 1,
+    } for i in range(days)]
+
+
+class TestBuckets:
+    """Tests for bucket arithmetic and range parsing."""
+
+    def test_week_starts_on_monday(self):
+        """Test that week buckets start on Monday."""
+        starts = bucket_starts(['2024-01-01', '2024-01-07', '2024-01-08'], 'week')
+        assert [str(d) for d in starts] == ['2024-01-01', '2024-01-01', '2024-01-08']
+
+    def test_month_starts(self):
+        """Test that month buckets start on the first of the month."""
+        assert str(bucket_starts(['2024-02-29'], 'month')[0]) == '2024-02-01'
+
+    def test_parse_range(self):
+        """Test range parsing with and without units."""
+        end = np.datetime64('2024-03-15')
+        assert str(parse_range('7', 'day', end)) == '2024-03-09'
+        assert str(parse_range('30d', 'week', end)) == '2024-02-15'
+        assert str(parse_range('2', 'month', end)) == '2024-02-01'
+        with pytest.raises(ValueError):
+            parse_range('abc', 'day', end)
+        with pytest.raises(ValueError):
+            parse_range('7', 'year', end)
+
+    @pytest.mark.parametrize('value', ['3662d', '524w', '122m', '11y', '99999999999999999999', '99999999999999999999y'])
+    def test_parse_range_too_long(self, value):
+        """Test that ranges longer than MAX_RANGE_DAYS, however large, are rejected with ValueError."""
+        with pytest.raises(ValueError, match='at most'):
+            parse_range(value, 'day', np.datetime64('2024-03-15'))
+
+
+class TestRollupEngine:
+    """Tests for RollupEngine."""
+
+    def test_week_aggregates(self):
+        """Test sums, means and last-value aggregates for a week bucket."""
+        store = AnalyticsStore(['A'])
+        engine = RollupEngine(store)
+        engine.add(*store.append(make_rows('A', '2024-01-01', 7)))
+        result = engine.query('A', 'week', '2024-01-01', '2024-01-07')
+        assert result['reach'].tolist() == [700]
+        assert result['posts'].tolist() == [7]
+        assert result['followers'].tolist() == [1006]
+        assert result['engagement'].tolist() == [3.0]
+        assert result['engagement_p50'].tolist() == [3.0]
+
+    def test_incremental_matches_full_build(self):
+        """Test that incremental appends equal a from-scratch rollup."""
+        rows = make_rows('A', '2024-01-01', 90) + make_rows('B', '2024-01-01', 90)
+        incremental = AnalyticsStore(['A', 'B'])
+        engine = RollupEngine(incremental)
+        for i in range(0, len(rows), 13):
+            engine.add(*incremental.append(rows[i:i + 13]))
+        full = AnalyticsStore(['A', 'B'])
+        full.append(rows)
+        rebuilt = RollupEngine(full)
+        for granularity in ('week', 'month'):
+            for platform in ('A', 'B'):
+                a = engine.query(platform, granularity, '2024-01-01', '2024-03-30')
+                b = rebuilt.query(platform, granularity, '2024-01-01', '2024-03-30')
+                for name in ('reach', 'posts', 'followers', 'engagement', 'engagement_p90'):
+                    np.testing.assert_allclose(a[name], b[name])
+
+    def test_missing_buckets_are_nan(self):
+        """Test that buckets without data are reported as NaN."""
+        store = AnalyticsStore(['A'])
+        store.append(make_rows('A', '2024-01-15', 3))
+        result = RollupEngine(store).query('A', 'day', '2024-01-14', '2024-01-18')
+        np.testing.assert_array_equal(result['reach'], [np.nan, 100, 100, 100, np.nan])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
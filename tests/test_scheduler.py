@@ -0,0 +1,321 @@
+"""
+Tests for the post scheduler
+"""
+
+import pytest
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from dashboard import SocialMediaData
+from ingestion import MockAdapter, PublishError
+from tenants import TenantRegistry
+from scheduler import CANCELLED, FAILED, PENDING, PUBLISHED, PUBLISHING, ScheduleStore, Scheduler
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FlakyAdapter(MockAdapter):
+    """Fails the first ``failures`` publishes."""
+
+    def __init__(self, platform, failures, retryable=True, rate_limit=None):
+        super().__init__(platform, days=0, posts=0, rate_limit=rate_limit)
+        self.failures = failures
+        self.retryable = retryable
+        self.calls = []
+
+    def publish(self, post):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise PublishError("try later", retryable=self.retryable)
+        return super().publish(post)
+
+
+@pytest.fixture
+def data():
+    return SocialMediaData()
+
+
+def start(data, adapter_for=MockAdapter, **kwargs):
+    return Scheduler(data, adapter_for, backoff=0.01, **kwargs).start()
+
+
+class TestScheduler:
+    """Tests for Scheduler."""
+
+    def test_due_posts_are_published(self, data):
+        """Test that due posts are published in due order and show up in recent posts."""
+        scheduler = start(data)
+        now = time.time()
+        jobs = [scheduler.schedule('Twitter', f'post {i}', now + 0.05 * (3 - i)) for i in range(3)]
+        assert wait_for(lambda: all(job.status == PUBLISHED for job in jobs))
+        scheduler.stop()
+        recent = data.recent_posts[:3]
+        assert {post['content'] for post in recent} == {'post 0', 'post 1', 'post 2'}
+        assert jobs[0].post_id in data.posts
+        assert jobs[2].dispatched <= jobs[0].dispatched
+
+    def test_future_posts_wait(self, data):
+        """Test that posts are not published before they are due."""
+        scheduler = start(data)
+        job = scheduler.schedule('Twitter', 'later', time.time() + 60)
+        time.sleep(0.1)
+        assert job.status == PENDING
+        assert scheduler.pending() == [job]
+        scheduler.stop()
+
+    def test_retry_with_backoff(self, data):
+        """Test that failed publishes are retried with growing delays."""
+        adapter = FlakyAdapter('Twitter', failures=3)
+        scheduler = start(data, lambda platform: adapter, max_attempts=5)
+        job = scheduler.schedule('Twitter', 'flaky')
+        assert wait_for(lambda: job.status == PUBLISHED)
+        scheduler.stop()
+        assert job.attempts == 4
+        assert job.error is None
+
+    def test_gives_up(self, data):
+        """Test that posts fail after max_attempts or on a non-retryable error."""
+        scheduler = start(data, lambda platform: FlakyAdapter(platform, failures=10), max_attempts=3)
+        job = scheduler.schedule('Twitter', 'doomed')
+        assert wait_for(lambda: job.status == FAILED)
+        assert job.attempts == 3
+        fatal = Scheduler(data, lambda platform: FlakyAdapter(platform, 1, retryable=False)).start()
+        job = fatal.schedule('Twitter', 'rejected')
+        assert wait_for(lambda: job.status == FAILED)
+        assert (job.attempts, job.error) == (1, 'try later')
+        scheduler.stop()
+        fatal.stop()
+
+    def test_failed_add_fails_the_jobs(self, data, monkeypatch):
+        """Test that posts the dashboard fails to add leave their jobs failed, not publishing forever."""
+        add_posts = data.add_posts
+        failures = [RuntimeError("disk full")]
+
+        def flaky_add_posts(posts):
+            if failures:
+                raise failures.pop()
+            add_posts(posts)
+
+        monkeypatch.setattr(data, 'add_posts', flaky_add_posts)
+        scheduler = start(data, workers=1)
+        lost = scheduler.schedule('Twitter', 'lost')
+        assert wait_for(lambda: lost.status == FAILED)
+        assert lost.error == "published, but not added to the dashboard: disk full" and lost.post_id is None
+        kept = scheduler.schedule('Twitter', 'kept')
+        assert wait_for(lambda: kept.status == PUBLISHED)
+        scheduler.stop()
+        assert kept.post_id in data.posts and len(scheduler) == 0
+
+    def test_rate_limit_defers_without_blocking_other_platforms(self, data):
+        """Test that a rate-limited platform is spaced out while others publish at once."""
+        adapters = {'Twitter': FlakyAdapter('Twitter', 0, rate_limit=10), 'TikTok': FlakyAdapter('TikTok', 0)}
+        scheduler = start(data, adapters.get, workers=1)
+        slow = [scheduler.schedule('Twitter', f'slow {i}') for i in range(5)]
+        fast = [scheduler.schedule('TikTok', f'fast {i}') for i in range(5)]
+        assert wait_for(lambda: all(job.status == PUBLISHED for job in fast), timeout=0.3)
+        assert wait_for(lambda: all(job.status == PUBLISHED for job in slow))
+        scheduler.stop()
+        calls = adapters['Twitter'].calls
+        assert calls[-1] - calls[0] >= 0.3
+
+    def test_cancel(self, data):
+        """Test that cancelled posts are never published."""
+        scheduler = start(data)
+        job = scheduler.schedule('Twitter', 'never', time.time() + 0.05)
+        assert scheduler.cancel(job.id)
+        assert not scheduler.cancel(job.id)
+        time.sleep(0.15)
+        scheduler.stop()
+        assert job.status == CANCELLED
+        assert scheduler.get(job.id) is job
+        assert 'never' not in {post['content'] for post in data.recent_posts}
+
+    def test_invalid_published_post_fails(self, data):
+        """Test that a post the platform returns in an unusable shape fails its job instead of leaving it publishing."""
+        class BrokenAdapter(MockAdapter):
+            def publish(self, post):
+                return dict(super().publish(post), id=-1)
+
+        scheduler = start(data, BrokenAdapter)
+        job = scheduler.schedule('Twitter', 'broken')
+        assert wait_for(lambda: job.status == FAILED)
+        assert job.error.startswith('published, but the platform returned an invalid post')
+        scheduler.stop()
+
+    def test_many_pending_posts(self, data):
+        """Test that hundreds of thousands of pending posts are held in due order."""
+        scheduler = Scheduler(data, MockAdapter)
+        base = time.time() + 3600
+        scheduler.schedule_many(('Twitter', f'post {i}', base + (i * 7919) % 200000) for i in range(200000))
+        assert len(scheduler) == 200000
+        assert [job.due - base for job in scheduler.pending(3)] == [0, 1, 2]
+
+
+class TestScheduleStore:
+    """Tests for schedulers of several processes sharing a ScheduleStore."""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / 'schedule.db')
+
+    def test_jobs_are_seen_and_cancelled_everywhere(self, path):
+        """Test that a job accepted by one scheduler is listed, looked up and cancelled through another."""
+        data = SocialMediaData()
+        owner = Scheduler(data, MockAdapter, store=ScheduleStore(path, 'default'))
+        other = Scheduler(SocialMediaData(), MockAdapter, store=ScheduleStore(path, 'default'))
+        elsewhere = Scheduler(SocialMediaData(), MockAdapter, store=ScheduleStore(path, 'other'))
+        later = owner.schedule('Twitter', 'later', time.time() + 600)
+        soon = owner.schedule('Twitter', 'never', time.time() + 0.1)
+        mine = other.schedule('TikTok', 'mine', time.time() + 300)
+        assert len({later.id, soon.id, mine.id}) == 3
+        assert [job.content for job in other.pending()] == ['never', 'mine', 'later']
+        assert other.count() == 3 and len(other) == 1 and elsewhere.count() == 0
+        assert other.get(later.id).status == PENDING and elsewhere.get(later.id) is None
+
+        assert other.cancel(soon.id) and not other.cancel(soon.id)
+        assert owner.get(soon.id).status == CANCELLED
+        owner.start()
+        assert wait_for(lambda: soon.status == CANCELLED)
+        assert 'never' not in {post['content'] for post in data.recent_posts}
+        now = owner.schedule('Twitter', 'now')
+        assert wait_for(lambda: other.get(now.id).status == PUBLISHED)
+        assert other.get(now.id).post_id == now.post_id and now.post_id in data.posts
+        owner.stop()
+
+    def test_jobs_of_exited_processes_are_adopted(self, path):
+        """Test that a new scheduler takes over an exited process's pending jobs and fails its unfinished ones."""
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                capture_output=True, text=True).stdout.strip()
+        store = ScheduleStore(path, 'default')
+        Scheduler(SocialMediaData(), MockAdapter, store=store).schedule_many(
+            [('Twitter', 'orphan', time.time()), ('Twitter', 'interrupted', time.time())])
+        store._conn.execute("UPDATE scheduled SET owner = ?", (f'{exited}:0000',))
+        store._conn.execute("UPDATE scheduled SET status = ? WHERE content = 'interrupted'", (PUBLISHING,))
+        store._conn.commit()
+
+        data = SocialMediaData()
+        scheduler = Scheduler(data, MockAdapter, store=ScheduleStore(path, 'default')).start()
+        assert wait_for(lambda: scheduler.count() == 0 and len(scheduler) == 0)
+        scheduler.stop()
+        orphan, interrupted = store.get(1), store.get(2)
+        assert orphan.status == PUBLISHED and orphan.post_id in data.posts
+        assert (interrupted.status, interrupted.error) == (FAILED, 'server process exited while publishing')
+
+    def test_published_posts_reach_every_process(self, path):
+        """Test that posts one scheduler publishes are added to the data of the others, with ids that never collide."""
+        first, second = SocialMediaData(), SocialMediaData()
+        assert first.next_post_id == second.next_post_id
+        publishers = [Scheduler(data, MockAdapter, store=ScheduleStore(path, 'default'), poll=0.05).start()
+                      for data in (first, second)]
+        jobs = [publishers[i % 2].schedule('Twitter', f'shared {i}') for i in range(6)]
+        contents = {f'shared {i}' for i in range(6)}
+
+        def published(data):
+            return {post.content: post.id for post in data.posts.posts.values() if post.content in contents}
+        assert wait_for(lambda: len(published(first)) == len(published(second)) == 6)
+        assert published(first) == published(second) == {job.content: job.post_id for job in jobs}
+        assert len(set(published(first).values())) == 6
+        later = SocialMediaData()
+        reloaded = Scheduler(later, MockAdapter, store=ScheduleStore(path, 'default'), poll=0.05).start()
+        assert wait_for(lambda: published(later) == published(first))
+        for scheduler in publishers + [reloaded]:
+            scheduler.stop()
+
+    def test_owners_without_a_heartbeat_are_adopted(self, path):
+        """Test that a live process id with a stale heartbeat (a reused id) is adopted from, and a fresh one is not."""
+        stale = ScheduleStore(path, 'default', timeout=0.2)
+        live = ScheduleStore(path, 'default', timeout=0.2)
+        Scheduler(SocialMediaData(), MockAdapter, store=stale).schedule('Twitter', 'stale', time.time() + 600)
+        Scheduler(SocialMediaData(), MockAdapter, store=live).schedule('Twitter', 'live', time.time() + 600)
+        assert stale.owner != live.owner and stale.owner.split(':')[0] == str(os.getpid())
+        time.sleep(0.3)
+        live.heartbeat()
+        scheduler = Scheduler(SocialMediaData(), MockAdapter, store=ScheduleStore(path, 'default', timeout=0.2),
+                              poll=0.05).start()
+        assert wait_for(lambda: len(scheduler) == 1)
+        assert [job.content for job in scheduler.jobs.values()] == ['stale']
+        live.close()
+        assert wait_for(lambda: len(scheduler) == 2)
+        scheduler.stop()
+
+    def test_start_schedulers(self, path, monkeypatch):
+        """Test that booting a process starts the schedulers of the default tenant and of tenants with jobs."""
+        exited = ScheduleStore(path, 'acme')
+        Scheduler(SocialMediaData(), MockAdapter, store=exited).schedule('Twitter', 'orphan', time.time())
+        exited.close()
+        monkeypatch.setenv('DASHBOARD_SCHEDULE_DB', path)
+        registry = TenantRegistry(lambda tenant, accounts: dashboard.DashboardState(SocialMediaData(), tenant=tenant))
+        registry.register('acme', 'Twitter', 1)
+        app = dashboard.create_app(SocialMediaData(), registry)
+        dashboard.start_schedulers(app)
+        acme = registry.get('acme')
+        assert acme.loaded and app.extensions['dashboard']._scheduler is not None
+        assert wait_for(lambda: acme.scheduler.get(1).status == PUBLISHED)
+        for state in (acme, app.extensions['dashboard']):
+            state.close()
+
+
+class TestScheduleEndpoint:
+    """Tests for /api/schedule."""
+
+    @pytest.fixture
+    def client(self):
+        return dashboard.create_app(SocialMediaData()).test_client()
+
+    def test_schedule_and_publish(self, client):
+        """Test that a scheduled post is published and appears in /api/posts."""
+        response = client.post('/api/schedule', json={'platform': 'Twitter', 'content': 'Hello', 'delay': 0})
+        assert response.status_code == 201
+        job = response.get_json()['posts'][0]
+        assert wait_for(lambda: client.get(f"/api/schedule/{job['id']}").get_json()['status'] == PUBLISHED)
+        assert client.get('/api/posts').get_json()[0]['content'] == 'Hello'
+
+    def test_list_and_cancel(self, client):
+        """Test that pending posts are listed soonest first and can be cancelled."""
+        response = client.post('/api/schedule', json=[
+            {'platform': 'Twitter', 'content': 'second', 'delay': 600},
+            {'platform': 'TikTok', 'content': 'first', 'at': '2099-01-01T00:00:00'},
+        ])
+        ids = [job['id'] for job in response.get_json()['posts']]
+        listing = client.get('/api/schedule').get_json()
+        assert listing['pending'] == 2
+        assert [job['content'] for job in listing['posts']] == ['second', 'first']
+        assert client.delete(f'/api/schedule/{ids[0]}').get_json()['status'] == CANCELLED
+        assert client.delete(f'/api/schedule/{ids[0]}').status_code == 409
+        assert client.get('/api/schedule/999999').status_code == 404
+
+    @pytest.mark.parametrize('body', [
+        {'platform': 'MySpace', 'content': 'x'},
+        {'platform': 'Twitter', 'content': ' '},
+        {'platform': 'Twitter', 'content': 'x', 'at': 'tomorrow'},
+        {'platform': 'Twitter', 'content': 'x', 'at': 1e300},
+        {'platform': 'Twitter', 'content': 'x', 'at': True},
+        {'platform': 'Twitter', 'content': 'x', 'delay': 1e20},
+        {'platform': 'Twitter', 'content': 'x', 'delay': 'nan'},
+        {'platform': 'Twitter', 'content': 'x', 'delay': '-inf'},
+        [{'platform': 'Twitter', 'content': 'ok', 'delay': 600}, {'platform': 'Twitter', 'content': 'x', 'delay': 'inf'}],
+        'not an object',
+    ])
+    def test_invalid_posts(self, client, body):
+        """Test that invalid posts are rejected with 400 and nothing is queued."""
+        response = client.post('/api/schedule', json=body)
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+        listing = client.get('/api/schedule')
+        assert listing.status_code == 200 and listing.get_json()['pending'] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
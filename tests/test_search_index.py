@@ -0,0 +1,126 @@
+"""
+Tests for the post search index
+"""
+
+import pytest
+import os
+import sys
+import random
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from posts_index import Post, PostIndex, to_epoch_us
+from search_index import SearchIndex, intersect, tokenize
+
+WORDS = ['launch', 'update', 'tips', 'event', 'release']
+
+
+def make_posts(n, seed=0):
+    rng = random.Random(seed)
+    return [Post.from_dict({
+        'id': i + 1,
+        'platform': rng.choice(['A', 'B', 'C']),
+        'content': f"Post {i + 1} about {rng.choice(WORDS)} #{rng.choice(WORDS)} @{rng.choice(['ann', 'bob'])}",
+        'timestamp': f'2024-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00',
+        'likes': 0, 'comments': 0, 'shares': 0, 'engagement_rate': 0.0,
+    }) for i in range(n)]
+
+
+def matching(posts, terms, platform=None, since=None, until=None):
+    """The brute-force answer, newest first."""
+    found = [p for p in posts
+             if terms <= tokenize(p.content)
+             and (platform is None or p.platform == platform)
+             and (since is None or p.timestamp >= to_epoch_us(since))
+             and (until is None or p.timestamp < to_epoch_us(until))]
+    return sorted(found, key=lambda p: (p.timestamp, p.id), reverse=True)
+
+
+class TestTokenize:
+    """Tests for tokenize."""
+
+    def test_words_hashtags_and_mentions(self):
+        """Test that content terms are lowercased and tags are also indexed as words."""
+        assert tokenize('Big #Launch today, thanks @Ann!') == {'big', '#launch', 'launch', 'today', 'thanks',
+                                                             '@ann', 'ann'}
+
+    def test_query_terms_are_not_expanded(self):
+        """Test that a hashtag query only matches the hashtag."""
+        assert tokenize('#launch news', expand=False) == {'#launch', 'news'}
+
+
+class TestSearchIndex:
+    """Tests for SearchIndex and PostIndex.search."""
+
+    def test_intersect(self):
+        """Test the sorted intersection against Python sets."""
+        rng = np.random.default_rng(0)
+        a = np.unique(rng.integers(0, 1000, 300))
+        b = np.unique(rng.integers(0, 1000, 40))
+        assert intersect(a, b).tolist() == sorted(set(a.tolist()) & set(b.tolist()))
+        assert len(intersect(a, b[:0])) == 0
+
+    @pytest.mark.parametrize('query,platform,since,until', [
+        ('launch', None, None, None),
+        ('#launch', 'B', None, None),
+        ('tips @ann', None, '2024-01-10', '2024-01-20T12:00:00'),
+        ('release #event @bob', 'A', '2024-01-05', None),
+        ('missing', None, None, None),
+    ])
+    def test_matches_brute_force(self, query, platform, since, until):
+        """Test combined term, platform and time range queries."""
+        posts = make_posts(600)
+        index = PostIndex(posts)
+        since, until = [None if v is None else datetime.fromisoformat(v) for v in (since, until)]
+        expected = matching(posts, tokenize(query, expand=False), platform,
+                            since and to_epoch_us(since), until and to_epoch_us(until))
+        total, page = index.search(query, 1000, platform=platform, since=since, until=until)
+        assert total == len(expected)
+        assert page == expected
+
+    def test_paging(self):
+        """Test that the after cursor walks every match once."""
+        posts = make_posts(300)
+        index = PostIndex(posts)
+        seen, after = [], None
+        while True:
+            total, page = index.search('#tips', 7, after)
+            if not page:
+                break
+            seen.extend(page)
+            after = page[-1].id
+        assert seen == matching(posts, {'#tips'})
+
+    def test_incremental_updates(self):
+        """Test that added, replaced and re-added posts are searchable once built."""
+        posts = make_posts(200)
+        index = PostIndex(posts[:100])
+        index.search('launch')
+        index.add(posts[100:])
+        changed = Post.from_dict(dict(posts[0].to_dict(), content='now about #giveaway'))
+        index.add([changed])
+        current = [changed] + posts[1:]
+        for query in ['launch', '#giveaway', 'about']:
+            assert index.search(query, 1000)[1] == matching(current, tokenize(query, expand=False))
+        index.add([posts[0]])
+        assert index.search('#giveaway')[0] == 0
+        assert posts[0] in index.search(f'post {posts[0].id}', 1000)[1]
+
+    def test_searches_as_of_an_earlier_count(self):
+        """Test that a search limited to a past document count ignores later and superseding posts."""
+        posts = make_posts(50)
+        index = SearchIndex(posts)
+        before = index.count
+        changed = Post.from_dict(dict(posts[0].to_dict(), content='now about #giveaway'))
+        index.add([changed] + make_posts(60)[50:])
+        assert len(index) == 60 and len(index.postings('post')) == 60
+        assert index.search({'post'}, count=before)[0] == 50
+        assert index.search({'#giveaway'}, count=before)[0] == 0
+        assert index.search({'#giveaway'})[1] == [posts[0].id]
+        assert index.search({'post'})[0] == 59
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
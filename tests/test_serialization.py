@@ -0,0 +1,53 @@
+"""
+Tests for JSON serialization
+"""
+
+import pytest
+import os
+import sys
+import json
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from serialization import dumps
+
+PAYLOAD = {
+    'floats': np.array([1.5, np.nan, 3.0]),
+    'ints': np.arange(3, dtype=np.int32),
+    'strided': np.arange(6, dtype=np.int64)[::2],
+    'scalar': np.float64(2.5),
+    'when': datetime(2024, 1, 2, 3, 4, 5),
+}
+EXPECTED = {
+    'floats': [1.5, None, 3.0],
+    'ints': [0, 1, 2],
+    'strided': [0, 2, 4],
+    'scalar': 2.5,
+    'when': '2024-01-02T03:04:05',
+}
+
+
+class TestSerialization:
+    """Tests for dumps with and without orjson."""
+
+    def test_numpy_and_datetimes(self):
+        """Test that NumPy values and datetimes encode to plain JSON."""
+        assert json.loads(dumps(PAYLOAD)) == EXPECTED
+
+    def test_stdlib_fallback(self, monkeypatch):
+        """Test that the stdlib path produces the same JSON."""
+        monkeypatch.setattr(serialization, 'orjson', None)
+        assert json.loads(dumps(PAYLOAD)) == EXPECTED
+
+    def test_unsupported_type(self):
+        """Test that unknown objects are rejected."""
+        with pytest.raises(TypeError):
+            dumps({'x': object()})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,203 @@
+"""
+Tests for the app factory and the production server entry point
+"""
+
+import pytest
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+import serve
+from dashboard import SocialMediaData, create_app
+
+
+@contextmanager
+def running_server(*argv):
+    """Run serve.py with ``argv`` on a free local port and yield its url."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    env = {name: value for name, value in os.environ.items()
+           if name not in ('DASHBOARD_MAX_STREAMS', 'DASHBOARD_SCHEDULE_DB')}
+    server = subprocess.Popen([sys.executable, serve.__file__, '--host', '127.0.0.1', '--port', str(port), *argv],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        assert serve.wait_until_ready(url)
+        yield url
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+class TestCreateApp:
+    """Tests for the application factory."""
+
+    def test_apps_serve_their_own_data(self):
+        """Test that each app serves the data it was created with."""
+        first, second = SocialMediaData(), SocialMediaData()
+        second.update_account('Twitter', followers=1)
+        a = create_app(first).test_client().get('/api/stats').get_json()
+        b = create_app(second).test_client().get('/api/stats').get_json()
+        assert a['Twitter']['followers'] == first.accounts['Twitter']['followers']
+        assert b['Twitter']['followers'] == 1
+
+    def test_apps_have_separate_caches_and_broadcasters(self):
+        """Test that apps do not share response caches or subscribers."""
+        first, second = create_app(SocialMediaData()), create_app(SocialMediaData())
+        state_a, state_b = first.extensions['dashboard'], second.extensions['dashboard']
+        assert state_a.cache is not state_b.cache
+        subscription = state_a.broadcaster.subscribe()
+        state_a.data.touch('resync', {})
+        assert subscription.get(timeout=1) is not None
+        assert len(state_b.broadcaster) == 0
+
+    def test_module_app_aliases(self):
+        """Test that the module-level names point at the default app's state."""
+        state = dashboard.app.extensions['dashboard']
+        assert dashboard.social_data is state.data
+        assert dashboard.response_cache is state.cache
+        assert dashboard.broadcaster is state.broadcaster
+
+
+class TestStreamLimit:
+    """Tests for the per-process cap on open event streams."""
+
+    def test_streams_over_the_limit_get_503(self, monkeypatch):
+        """Test that streams past DASHBOARD_MAX_STREAMS are refused until one closes."""
+        monkeypatch.setenv('DASHBOARD_MAX_STREAMS', '1')
+        app = create_app(SocialMediaData())
+        client = app.test_client()
+        first = client.get('/api/stream', buffered=False)
+        assert first.status_code == 200
+        refused = client.get('/api/stream', buffered=False)
+        assert refused.status_code == 503 and refused.headers['Retry-After']
+        assert client.get('/api/stats').status_code == 200
+        first.close()
+        assert len(app.extensions['streams']) == 0
+        assert len(app.extensions['dashboard'].broadcaster) == 0
+        assert client.get('/api/stream', buffered=False).status_code == 200
+
+    def test_unlimited_by_default(self, monkeypatch):
+        """Test that without DASHBOARD_MAX_STREAMS streams are not capped."""
+        monkeypatch.delenv('DASHBOARD_MAX_STREAMS', raising=False)
+        client = create_app(SocialMediaData()).test_client()
+        responses = [client.get('/api/stream', buffered=False) for _ in range(5)]
+        assert all(response.status_code == 200 for response in responses)
+
+    @pytest.mark.skipif(serve.BaseApplication is None, reason="gunicorn not installed")
+    def test_more_streams_than_threads(self):
+        """Test that a worker holding more open streams than threads still answers requests."""
+        streams = []
+        with running_server('--workers', '1', '--threads', '4') as url:
+            try:
+                statuses = []
+                for _ in range(6):
+                    try:
+                        streams.append(urllib.request.urlopen(url + '/api/stream', timeout=5))
+                        statuses.append(streams[-1].status)
+                    except urllib.error.HTTPError as error:
+                        statuses.append(error.code)
+                assert statuses == [200, 200, 503, 503, 503, 503]
+                for _ in range(4):
+                    with urllib.request.urlopen(url + '/api/stats', timeout=5) as response:
+                        assert response.status == 200
+            finally:
+                for response in streams:
+                    response.close()
+
+
+@pytest.mark.skipif(serve.BaseApplication is None, reason="gunicorn not installed")
+def test_workers_share_scheduled_posts():
+    """Test that every worker answers for and cancels posts another worker scheduled."""
+    with running_server('--workers', '3', '--threads', '2') as url:
+        request = urllib.request.Request(url + '/api/schedule', method='POST', headers={
+            'Content-Type': 'application/json'}, data=json.dumps(
+            [{'platform': 'Twitter', 'content': f'post {i}', 'delay': 600} for i in range(3)]).encode())
+        with urllib.request.urlopen(request, timeout=5) as response:
+            ids = [job['id'] for job in json.load(response)['posts']]
+        for _ in range(10):
+            for job_id in ids:
+                with urllib.request.urlopen(f'{url}/api/schedule/{job_id}', timeout=5) as response:
+                    assert json.load(response)['status'] == 'pending'
+            with urllib.request.urlopen(url + '/api/schedule', timeout=5) as response:
+                assert json.load(response)['pending'] == 3
+        cancel = urllib.request.Request(f'{url}/api/schedule/{ids[0]}', method='DELETE')
+        with urllib.request.urlopen(cancel, timeout=5) as response:
+            assert json.load(response)['status'] == 'cancelled'
+        with urllib.request.urlopen(url + '/api/schedule', timeout=5) as response:
+            assert json.load(response)['pending'] == 2
+
+
+@pytest.mark.skipif(serve.BaseApplication is None, reason="gunicorn not installed")
+def test_workers_show_posts_another_worker_published():
+    """Test that a post published by one worker is listed by every worker."""
+    with running_server('--workers', '3', '--threads', '2') as url:
+        request = urllib.request.Request(url + '/api/schedule', method='POST', headers={
+            'Content-Type': 'application/json'}, data=json.dumps({'platform': 'Twitter', 'content': 'everywhere'}).encode())
+        with urllib.request.urlopen(request, timeout=5) as response:
+            job_id = json.load(response)['posts'][0]['id']
+        deadline = time.monotonic() + 10
+        while True:
+            with urllib.request.urlopen(f'{url}/api/schedule/{job_id}', timeout=5) as response:
+                if json.load(response)['status'] == 'published':
+                    break
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+        time.sleep(2)
+        for _ in range(20):
+            with urllib.request.urlopen(url + '/api/posts?limit=1', timeout=5) as response:
+                assert json.load(response)[0]['content'] == 'everywhere'
+
+
+class TestServeOptions:
+    """Tests for serve.py argument handling."""
+
+    def test_defaults(self):
+        """Test that the defaults preload the app and use threaded workers on port 8000."""
+        options = serve.gunicorn_options(serve.parse_args([]))
+        assert options['bind'] == '0.0.0.0:8000'
+        assert options['worker_class'] == 'gthread'
+        assert options['preload_app'] is True
+        assert options['workers'] >= 1
+
+    def test_worker_settings(self):
+        """Test that worker, thread and recycling flags reach gunicorn."""
+        args = serve.parse_args(['--workers', '3', '--threads', '16', '--max-requests', '1000',
+                                 '--no-preload', '--port', '9000'])
+        options = serve.gunicorn_options(args)
+        assert (options['workers'], options['threads']) == (3, 16)
+        assert (options['max_requests'], options['max_requests_jitter']) == (1000, 100)
+        assert options['preload_app'] is False
+        assert options['bind'].endswith(':9000')
+
+    def test_environment_defaults(self, monkeypatch):
+        """Test that WEB_CONCURRENCY and DASHBOARD_THREADS set the defaults."""
+        monkeypatch.setenv('WEB_CONCURRENCY', '5')
+        monkeypatch.setenv('DASHBOARD_THREADS', '2')
+        args = serve.parse_args([])
+        assert (args.workers, args.threads) == (5, 2)
+
+    def test_max_streams(self, monkeypatch):
+        """Test that a worker keeps half its threads free of streams unless told otherwise."""
+        monkeypatch.delenv('DASHBOARD_MAX_STREAMS', raising=False)
+        assert serve.max_streams(serve.parse_args(['--threads', '8'])) == 4
+        assert serve.max_streams(serve.parse_args(['--threads', '8', '--max-streams', '6'])) == 6
+        monkeypatch.setenv('DASHBOARD_MAX_STREAMS', '2')
+        assert serve.max_streams(serve.parse_args([])) == 2
+
+    @pytest.mark.skipif(serve.BaseApplication is None, reason="gunicorn not installed")
+    def test_gunicorn_config(self):
+        """Test that the options are accepted by gunicorn's config."""
+        application = serve.DashboardApplication(serve.gunicorn_options(serve.parse_args(['--threads', '4'])))
+        assert application.cfg.threads == 4
+        assert application.cfg.worker_class_str == 'gthread'
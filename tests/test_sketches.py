@@ -0,0 +1,153 @@
+"""
+Tests for the HyperLogLog and t-digest sketches
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from sketches import (SketchStore, digest_compress, digest_merge, digest_quantiles, hll_estimate,
+                      hll_registers)
+
+DAY = np.datetime64('2024-03-01', 'D')
+
+
+class TestHyperLogLog:
+    """Tests for the HyperLogLog helpers."""
+
+    @pytest.mark.parametrize('n', [0, 1, 100, 10000, 300000])
+    def test_estimate_is_within_a_few_percent(self, n):
+        """Test distinct counts from empty through the linear counting range to large sets."""
+        ids = np.random.default_rng(n).choice(10 ** 12, n, replace=False)
+        assert hll_estimate(hll_registers(ids)) == pytest.approx(n, rel=0.06, abs=1)
+
+    def test_duplicates_do_not_count(self):
+        """Test that repeated ids leave the registers unchanged."""
+        ids = np.arange(5000)
+        assert np.array_equal(hll_registers(np.concatenate([ids, ids[::-1]])), hll_registers(ids))
+
+    def test_merge_is_the_sketch_of_the_union(self):
+        """Test that the elementwise max of two sketches equals the sketch of both id sets."""
+        a, b = np.arange(0, 8000), np.arange(6000, 20000)
+        merged = np.maximum(hll_registers(a), hll_registers(b))
+        assert np.array_equal(merged, hll_registers(np.union1d(a, b)))
+
+
+class TestTDigest:
+    """Tests for the t-digest helpers."""
+
+    def test_small_digests_are_exact(self):
+        """Test that few values are kept as they are."""
+        values = np.array([5.0, 1.0, 3.0])
+        means, weights = digest_compress(values, np.ones(3))
+        assert means.tolist() == [1.0, 3.0, 5.0] and weights.tolist() == [1, 1, 1]
+        assert digest_quantiles(means, weights, [0.5])[0] == 3.0
+        assert np.isnan(digest_quantiles(*digest_merge([]))).all()
+
+    def test_merged_daily_digests_track_exact_percentiles(self):
+        """Test that merging many small digests keeps p50, p90 and p99 close."""
+        values = np.random.default_rng(0).lognormal(0.0, 1.0, 100000)
+        days = [digest_compress(chunk, np.ones(len(chunk))) for chunk in np.array_split(values, 365)]
+        weeks = [digest_merge(days[i:i + 7]) for i in range(0, len(days), 7)]
+        means, weights = digest_merge(weeks)
+        assert len(means) <= 110
+        assert weights.sum() == len(values)
+        assert digest_quantiles(means, weights) == pytest.approx(np.percentile(values, [50, 90, 99]), rel=0.02)
+
+
+class TestSketchStore:
+    """Tests for SketchStore."""
+
+    def test_query_merges_days_and_platforms(self):
+        """Test per-bucket, window and per-platform audiences and percentiles."""
+        store = SketchStore()
+        rng = np.random.default_rng(1)
+        audiences = {}
+        for platform, offset in [('A', 0), ('B', 20000)]:
+            for day in range(10):
+                ids = offset + rng.integers(0, 30000, 4000)
+                audiences.setdefault(platform, []).append(ids)
+                store.add_audience(platform, DAY + day, ids)
+            store.add_engagement(platform, DAY + np.arange(10).repeat(5), np.arange(50.0))
+        starts = DAY + np.array([0, 5])
+        result = store.query(['A', 'B'], starts, DAY + 9)
+
+        for bucket, days in enumerate([slice(0, 5), slice(5, 10)]):
+            exact = np.unique(np.concatenate(audiences['A'][days] + audiences['B'][days]))
+            assert result['audience'][bucket] == pytest.approx(len(exact), rel=0.06)
+            assert result['samples'][bucket] == 50
+        assert result['total']['audience'] == pytest.approx(
+            len(np.unique(np.concatenate(audiences['A'] + audiences['B']))), rel=0.06)
+        assert result['by_platform']['B'] == pytest.approx(len(np.unique(np.concatenate(audiences['B']))),
+                                                           rel=0.06)
+        assert result['total']['samples'] == 100
+        assert result['total']['engagement_p50'] == pytest.approx(np.percentile(np.arange(50.0), 50), abs=1)
+
+    def test_missing_data_is_nan(self):
+        """Test that buckets and platforms without sketches report no audience."""
+        store = SketchStore()
+        store.add_engagement('A', [DAY], [1.0])
+        result = store.query(['A', 'missing'], DAY + np.array([0, 1]), DAY + 1)
+        assert np.isnan(result['audience']).all() and np.isnan(result['total']['audience'])
+        assert result['samples'].tolist() == [1, 0]
+        assert np.isnan(result['engagement_p99'][1])
+        assert result['by_platform'] == {}
+
+    def test_out_of_order_days(self):
+        """Test that days added out of order are kept sorted with their registers."""
+        store = SketchStore()
+        for day in [5, 1, 3]:
+            store.add_audience('A', DAY + day, np.arange(day * 100))
+        table = store.tables['A']
+        assert table.days == sorted(table.days)
+        assert store.query(['A'], [DAY + 3], DAY + 3)['total']['audience'] == pytest.approx(300, rel=0.06)
+
+    def test_copies_leave_the_original_alone(self):
+        """Test that writes to a copy copy its tables instead of changing the shared ones."""
+        store = SketchStore()
+        store.add_audience('A', DAY, np.arange(100))
+        store.add_engagement('A', [DAY], [1.0])
+        copy = store.copy()
+        copy.add_audience('A', DAY, np.arange(100, 1000))
+        copy.add_engagement('A', [DAY, DAY + 1], [2.0, 3.0])
+        copy.add_audience('B', DAY, np.arange(10))
+        assert copy.tables['A'] is not store.tables['A'] and 'B' not in store.tables
+        before, after = store.query(['A'], [DAY], DAY + 1), copy.query(['A'], [DAY], DAY + 1)
+        assert before['total']['audience'] == pytest.approx(100, rel=0.06) and before['total']['samples'] == 1
+        assert after['total']['audience'] == pytest.approx(1000, rel=0.06) and after['total']['samples'] == 3
+
+    def test_copies_share_untouched_days(self):
+        """Test that a write to a copy copies only the registers of the days it changes."""
+        store = SketchStore()
+        for day in range(5):
+            store.add_audience('A', DAY + day, np.arange(day * 100, day * 100 + 50))
+        store.add_engagement('A', [DAY + 5], [1.0])
+        copy = store.copy()
+        copy.add_audience('A', DAY + 2, np.arange(1000, 2000))
+        copy.add_audience('A', DAY + 5, np.arange(10))
+        original, changed = store.tables['A'], copy.tables['A']
+        shared = [a is b for a, b in zip(original._registers, changed._registers)]
+        assert shared == [True, True, False, True, True, False]
+        assert not original._registers[5].any() and not original.audience[5]
+        assert store.query(['A'], [DAY + 2], DAY + 2)['total']['audience'] == pytest.approx(50, rel=0.06)
+        assert copy.query(['A'], [DAY + 2], DAY + 2)['total']['audience'] == pytest.approx(1050, rel=0.06)
+
+    def test_synthetic_audiences(self):
+        """Test that simulated audiences load as one sketch per analytics row."""
+        dataset = synthetic.generate(3, days=7, posts=0, seed=0, audience=True)
+        store = dataset['analytics']
+        sketches = SketchStore()
+        sketches.add_audience_registers(store.platforms, store.codes, store.dates, dataset['audience'])
+        result = sketches.query(store.platforms, [store.dates.min()], store.dates.max())
+        daily_reach = store.columns['reach'][store.codes == 0]
+        assert result['by_platform'][store.platforms[0]] >= daily_reach.max() * 0.8
+        assert result['total']['audience'] < store.columns['reach'].sum()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
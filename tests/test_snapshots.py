@@ -0,0 +1,155 @@
+"""
+Tests for copy-on-write data snapshots
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import bench_snapshots
+from dashboard import SocialMediaData
+from posts_index import Post
+
+
+@pytest.fixture
+def data():
+    return SocialMediaData()
+
+
+def new_post(content, **fields):
+    return dict({'platform': 'Twitter', 'content': content, 'timestamp': '2030-01-01T00:00:00', 'likes': 1,
+                 'comments': 0, 'shares': 0, 'engagement_rate': 1.0}, **fields)
+
+
+class TestSnapshots:
+    """Tests for SocialMediaData snapshots and batches."""
+
+    def test_writes_leave_older_snapshots_alone(self, data):
+        """Test that a snapshot taken before writes still reads its own version of every component."""
+        old = data.snapshot
+        accounts = {platform: dict(fields) for platform, fields in old.accounts.items()}
+        rows, posts = len(old.analytics), old.posts.recent(100)
+        week = old.rollups.query('Twitter', 'week', old.analytics.dates[0], old.analytics.last_date())
+        data.update_account('Twitter', followers=1)
+        data.update_account('Mastodon', followers=2, color='#000')
+        date = old.analytics.last_date()
+        data.append_analytics([{'date': str(date), 'platform': 'Twitter', 'followers': 5, 'engagement': 50.0,
+                                'reach': 5, 'posts': 5}])
+        data.add_posts([new_post('new #zephyr')])
+
+        assert old.accounts == accounts and 'Mastodon' not in old.platforms
+        assert len(old.analytics) == rows and old.posts.recent(100) == posts
+        for name, series in old.rollups.query('Twitter', 'week', old.analytics.dates[0], date).items():
+            np.testing.assert_array_equal(series, week[name])
+        assert data.version == old.version + 4
+        assert data.accounts['Mastodon']['followers'] == 2 and len(data.analytics) == rows + 1
+
+    def test_older_snapshots_search_their_own_posts(self, data):
+        """Test that a snapshot searches the posts it has, however the shared index grew since."""
+        data.add_posts([new_post('first #zephyr', id=1000)])
+        old = data.snapshot
+        assert old.posts.search('#zephyr')[0] == 1
+        data.add_posts([new_post('replaced #quokka', id=1000), new_post('second #zephyr')])
+        assert old.posts.search('#zephyr')[0] == 1 and old.posts.search('#quokka')[0] == 0
+        assert data.posts.search('#zephyr')[1][0].content == 'second #zephyr'
+        assert data.posts.search('#quokka')[0] == 1
+
+    def test_index_built_after_a_replacement(self, data):
+        """Test that a snapshot searched only after one of its posts was replaced still finds the old post."""
+        data.add_posts([new_post('first #zephyr', id=1000)])
+        old = data.snapshot
+        data.add_posts([new_post('replaced #quokka', id=1000)])
+        assert old.posts.search('#zephyr')[0] == 1 and old.posts.search('#quokka')[0] == 0
+        assert data.posts.search('#zephyr')[0] == 0 and data.posts.search('#quokka')[0] == 1
+
+    def test_writes_do_not_build_the_search_index(self, data):
+        """Test that writes before the first search leave the index unbuilt, and it is exact for every snapshot once built."""
+        snapshots = [data.snapshot]
+        for i in range(3):
+            data.add_posts([new_post(f'write {i} #zephyr', id=1000), new_post(f'extra {i} #zephyr')])
+            snapshots.append(data.snapshot)
+        assert data.posts._search.index is None
+        assert [snapshot.posts.search('#zephyr')[0] for snapshot in snapshots] == [0, 2, 3, 4]
+        assert [snapshot.posts.search('write')[0] for snapshot in snapshots] == [0, 1, 1, 1]
+        assert snapshots[1].posts.search('write')[1][0].content == 'write 0 #zephyr'
+
+    def test_index_built_after_writes(self, data):
+        """Test that the search index built from a newer snapshot serves older ones too."""
+        old = data.snapshot
+        data.add_posts([new_post('later #zephyr')])
+        assert old.posts.search('later')[0] == 0
+        assert data.posts.search('later')[0] == 1
+
+    def test_batch_publishes_once(self, data):
+        """Test that a batch is invisible until it ends and then tells listeners in order."""
+        events = []
+        data.listeners.append(lambda event, payload: events.append((event, payload['version'])))
+        before = data.snapshot
+        with data.batch():
+            data.update_account('Twitter', followers=1)
+            data.add_posts([new_post('batched')])
+            assert data.snapshot is before and not events
+        assert data.version == before.version + 2
+        assert events == [('accounts', before.version + 1), ('posts', before.version + 2)]
+        assert data.accounts['Twitter']['followers'] == 1 and data.posts.recent(1)[0].content == 'batched'
+
+    def test_failed_batch_is_discarded(self, data):
+        """Test that an exception in a batch drops all of its writes and events."""
+        events = []
+        data.listeners.append(lambda event, payload: events.append(event))
+        data.posts.search_index
+        before = data.snapshot
+        with pytest.raises(RuntimeError):
+            with data.batch():
+                data.update_account('Twitter', followers=1)
+                data.add_posts([new_post('lost #zephyr')])
+                raise RuntimeError("boom")
+        assert data.snapshot is before and not events
+        data.add_posts([new_post('kept #zephyr')])
+        assert [post.content for post in data.posts.search('#zephyr', 10)[1]] == ['kept #zephyr']
+
+    def test_sketches_are_copied_on_write(self, data):
+        """Test that audience and engagement sketches written after a snapshot, or in a failed batch, stay out of it."""
+        old = data.snapshot
+        date = old.analytics.last_date()
+        before = old.sketches.query(['Twitter'], [date], date)['total']
+        data.add_audience('Twitter', date, np.arange(10 ** 6, 10 ** 6 + 5000))
+        data.add_posts([new_post('new', timestamp=f'{date}T12:00:00')])
+        with pytest.raises(RuntimeError):
+            with data.batch():
+                data.add_posts([new_post('lost', timestamp=f'{date}T12:00:00')])
+                raise RuntimeError("boom")
+        assert old.sketches.query(['Twitter'], [date], date)['total'] == pytest.approx(before, nan_ok=True)
+        after = data.sketches.query(['Twitter'], [date], date)['total']
+        assert after['samples'] == before['samples'] + 1 and after['audience'] > before['audience']
+
+    def test_unchanged_posts_are_shared(self, data):
+        """Test that a write to one component shares the others with the previous snapshot."""
+        before = data.snapshot
+        data.update_account('Twitter', followers=1)
+        assert data.posts is before.posts and data.analytics is before.analytics
+        assert data.accounts['Facebook'] is before.accounts['Facebook']
+        data.add_posts([Post(None, 'Twitter', 'x', '2030-01-01T00:00:00', 0, 0, 0, 0.0)])
+        assert data.posts is not before.posts and data.rollups is before.rollups
+
+    def test_empty_add_is_a_no_op(self, data):
+        """Test that adding no posts publishes no snapshot and tells no listener."""
+        before, events = data.snapshot, []
+        data.listeners.append(lambda event, payload: events.append(event))
+        data.add_posts([])
+        assert data.snapshot is before and events == []
+
+    def test_concurrent_readers_see_consistent_snapshots(self, data):
+        """Test that readers never see a partial write while writers update accounts, posts and analytics."""
+        result = bench_snapshots.stress(data, readers=4, duration=1.0)
+        assert result['problems'] == []
+        assert result['reads'] > 0 and result['reads_per_s'] > 0
+        assert all(count > 0 for count in result['writes'].values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
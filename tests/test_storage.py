@@ -0,0 +1,105 @@
+"""
+Tests for the persistent storage backends
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from storage import NumpyBackend, SQLiteBackend, open_storage
+
+
+@pytest.fixture(params=['sqlite', 'npy'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        storage = SQLiteBackend(str(tmp_path / 'dashboard.db'))
+    else:
+        storage = NumpyBackend(str(tmp_path / 'columns'))
+    yield storage
+    storage.close()
+
+
+class TestStorage:
+    """Tests shared by both backends."""
+
+    def test_empty_backend_loads_none(self, backend):
+        """Test that a fresh backend reports no data."""
+        assert backend.load() is None
+
+    def test_roundtrip_through_social_media_data(self, backend):
+        """Test that generated data is persisted and reloaded intact."""
+        original = dashboard.SocialMediaData(backend)
+        reloaded = dashboard.SocialMediaData(backend)
+        assert reloaded.accounts == original.accounts
+        assert reloaded.platforms == original.platforms
+        assert reloaded.analytics_data == original.analytics_data
+        assert reloaded.recent_posts == original.recent_posts
+        assert reloaded.next_post_id == original.next_post_id
+
+    def test_writes_go_through(self, backend):
+        """Test that mutators persist their changes."""
+        data = dashboard.SocialMediaData(backend)
+        data.update_account('Twitter', followers=1)
+        data.append_analytics([{'date': '2001-01-01', 'platform': 'Twitter', 'followers': 1,
+                                'engagement': 1.0, 'reach': 1, 'posts': 1}])
+        data.add_posts([{'platform': 'Twitter', 'content': 'hello', 'timestamp': '2001-01-01T00:00:00',
+                         'likes': 0, 'comments': 0, 'shares': 0, 'engagement_rate': 0.0}])
+        reloaded = dashboard.SocialMediaData(backend)
+        assert reloaded.accounts['Twitter']['followers'] == 1
+        assert str(reloaded.analytics.dates[reloaded.analytics.platform_slice('Twitter')][0]) == '2001-01-01'
+        assert reloaded.recent_posts[-1]['content'] == 'hello'
+
+    def test_save_accounts(self, backend):
+        """Test that accounts saved in bulk update existing ones and keep their order."""
+        backend.save_account('Twitter', {'followers': 1})
+        backend.save_accounts({'TikTok': {'followers': 2}, 'Twitter': {'followers': 3}})
+        accounts = backend.load()['accounts']
+        assert list(accounts) == ['Twitter', 'TikTok']
+        assert accounts['Twitter'] == {'followers': 3}
+
+    def test_regenerating_replaces_stored_data(self, backend):
+        """Test that generate_mock_data does not accumulate duplicates."""
+        data = dashboard.SocialMediaData(backend)
+        rows = len(data.analytics)
+        data.generate_mock_data()
+        assert len(dashboard.SocialMediaData(backend).analytics) == rows
+
+
+class TestBackends:
+    """Backend-specific behaviour."""
+
+    def test_sqlite_wal_and_indexes(self, tmp_path):
+        """Test that the SQLite backend uses WAL and indexes its lookups."""
+        backend = SQLiteBackend(str(tmp_path / 'dashboard.db'))
+        assert backend._conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        indexes = {row[1] for row in backend._conn.execute("SELECT * FROM sqlite_master WHERE type = 'index'")}
+        assert {'analytics_platform_date', 'posts_timestamp'} <= indexes
+
+    def test_numpy_backend_is_memory_mapped(self, tmp_path):
+        """Test that loaded columns are read-only memory maps."""
+        backend = NumpyBackend(str(tmp_path / 'columns'))
+        dashboard.SocialMediaData(backend)
+        data = dashboard.SocialMediaData(backend)
+        assert isinstance(data.analytics.columns['reach'], np.memmap)
+        assert not data.analytics.columns['reach'].flags.writeable
+        # Appending copies instead of writing into the shared map
+        data.append_analytics([{'date': '2001-01-01', 'platform': 'Facebook', 'followers': 1,
+                                'engagement': 1.0, 'reach': 1, 'posts': 1}])
+        assert data.analytics.platform_slice('Facebook').stop - data.analytics.platform_slice('Facebook').start == 31
+
+    def test_open_storage(self, tmp_path):
+        """Test storage URLs."""
+        assert open_storage(None) is None
+        assert isinstance(open_storage(f'sqlite://{tmp_path}/x.db'), SQLiteBackend)
+        assert isinstance(open_storage(f'npy://{tmp_path}/x'), NumpyBackend)
+        with pytest.raises(ValueError):
+            open_storage('redis://localhost')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,94 @@
+"""
+Tests for the synthetic data generator
+"""
+
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+import synthetic
+from ingestion import MockAdapter
+from storage import NumpyBackend
+
+
+class TestGenerate:
+    """Tests for synthetic.generate."""
+
+    def test_seeded(self):
+        """Test that a seed always produces the same dataset."""
+        end = date(2024, 6, 30)
+        a = synthetic.generate(8, 60, 100, seed=7, end=end)
+        b = synthetic.generate(8, 60, 100, seed=7, end=end)
+        assert a['accounts'] == b['accounts']
+        for name, values in a['analytics'].columns.items():
+            np.testing.assert_array_equal(values, b['analytics'].columns[name])
+        assert [post.to_dict() for post in a['posts']] == [post.to_dict() for post in b['posts']]
+        assert str(a['analytics'].last_date()) == '2024-06-30'
+        assert synthetic.generate(8, 60, 100, seed=8, end=end)['accounts'] != a['accounts']
+
+    def test_shape(self):
+        """Test that every account has one row per day up to today and posts fall in the range."""
+        dataset = synthetic.generate(12, 90, 500, seed=1)
+        store = dataset['analytics']
+        assert len(store) == 12 * 90
+        assert len(store.platforms) == len(set(store.platforms)) == 12
+        assert store.last_date() == np.datetime64(synthetic.datetime.now().date(), 'D')
+        assert np.all(np.diff(store.offsets) == 90)
+        posts = dataset['posts']
+        assert [post.id for post in posts] == list(range(1, 501))
+        assert {post.platform for post in posts} <= set(store.platforms)
+        first_day = (store.dates.min() - np.datetime64('1970-01-01', 'D')).astype(np.int64) * 86400 * 10 ** 6
+        assert min(post.timestamp for post in posts) >= first_day
+
+    def test_counters_match_the_latest_day(self):
+        """Test that account counters are the last analytics row, and mock platforms keep theirs."""
+        dataset = synthetic.generate(['Facebook', 'Mastodon'], 30, 0, seed=2)
+        store = dataset['analytics']
+        for name, counters in dataset['accounts'].items():
+            assert counters['followers'] == store.columns['followers'][store.tail(name, 1)][0]
+        assert dataset['accounts']['Facebook']['followers'] == MockAdapter.ACCOUNTS['Facebook']['followers']
+        assert dataset['accounts']['Facebook']['color'] == MockAdapter.ACCOUNTS['Facebook']['color']
+        assert dataset['accounts']['Mastodon']['color'] == synthetic.DEFAULT_COLOR
+
+    def test_distributions(self):
+        """Test that followers trend and likes are heavy-tailed."""
+        dataset = synthetic.generate(200, 365, 20000, seed=3)
+        followers = dataset['analytics'].columns['followers'].reshape(200, 365)
+        assert (followers > 0).all()
+        assert np.median(followers[:, -1] / followers[:, 0]) > 1.2
+        likes = np.array([post.likes for post in dataset['posts']])
+        assert likes.max() > 20 * np.median(likes)
+        assert all(post.comments <= post.likes for post in dataset['posts'])
+
+    def test_audience_pools_of_any_size(self):
+        """Test that audiences are drawn when a large account comes before a small one."""
+        profiles = {'followers': np.array([100000.0, 100.0])}
+        codes = np.array([0, 1], dtype=np.int32)
+        registers = synthetic.audience_registers(np.random.default_rng(0), profiles, codes, np.array([50000, 50]))
+        assert registers.shape == (2, 1 << synthetic.PRECISION) and (registers > 0).any(axis=1).all()
+
+
+class TestSave:
+    """Tests for writing generated data to storage."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that a saved dataset loads back unchanged."""
+        backend = NumpyBackend(str(tmp_path / 'columns'))
+        dataset = synthetic.generate(6, 45, 50, seed=4)
+        synthetic.save(dataset, backend)
+        loaded = dashboard.SocialMediaData(backend)
+        assert loaded.accounts == dataset['accounts']
+        np.testing.assert_array_equal(loaded.analytics.columns['reach'], dataset['analytics'].columns['reach'])
+        assert len(loaded.posts) == 50
+
+    def test_mock_data(self):
+        """Test that the default mock data is 30 days and 20 posts for the platforms."""
+        data = dashboard.SocialMediaData(platforms=['Twitter', 'TikTok'])
+        assert len(data.analytics) == 60
+        assert len(data.posts) == 20
+        assert list(data.accounts) == ['Twitter', 'TikTok']
@@ -0,0 +1,143 @@
+"""
+Tests for the tenant registry and tenant-scoped routes
+"""
+
+import pytest
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from tenants import TenantRegistry
+
+
+def loader(tenant, accounts):
+    return {'tenant': tenant, 'labels': [account['label'] for account in accounts]}
+
+
+class TestTenantRegistry:
+    """Tests for TenantRegistry."""
+
+    def test_lazy_loading(self):
+        """Test that a tenant is loaded on first use only, with its accounts."""
+        registry = TenantRegistry(loader)
+        registry.register('acme', 'Twitter', 1, handle='@acme')
+        registry.register('acme', 'TikTok', 2)
+        assert registry.loaded() == []
+        value = registry.get('acme')
+        assert value == {'tenant': 'acme', 'labels': ['Twitter', 'TikTok']}
+        assert registry.get('acme') is value
+        assert registry.loads == 1
+        assert registry.accounts[('acme', 'Twitter', '1')]['handle'] == '@acme'
+
+    def test_labels_disambiguate_accounts_on_one_platform(self):
+        """Test that accounts sharing a platform get platform/account_id labels."""
+        registry = TenantRegistry(loader)
+        registry.register('acme', 'Twitter', 'main')
+        registry.register('acme', 'Twitter', 'support')
+        registry.register('acme', 'Twitter', 'main', handle='@acme')
+        assert [a['label'] for a in registry.accounts_of('acme')] == ['Twitter/main', 'Twitter/support']
+
+    def test_unknown_and_invalid_tenants(self):
+        """Test that unknown tenants raise KeyError and unsafe names are rejected."""
+        registry = TenantRegistry(loader)
+        with pytest.raises(KeyError):
+            registry.get('nobody')
+        with pytest.raises(ValueError):
+            registry.register('../etc', 'Twitter', 1)
+
+    def test_memory_is_bounded(self):
+        """Test that only max_loaded tenants stay loaded however many are registered."""
+        unloaded = []
+        registry = TenantRegistry(loader, max_loaded=8, unload=unloaded.append)
+        for i in range(1000):
+            registry.register(f't{i}', 'Twitter', 1)
+        for i in range(1000):
+            registry.get(f't{i}')
+        assert len(registry) == 1000
+        assert registry.loaded() == [f't{i}' for i in range(992, 1000)]
+        assert registry.evictions == len(unloaded) == 992
+
+    def test_lru_order(self):
+        """Test that a recently used tenant survives eviction."""
+        registry = TenantRegistry(loader, max_loaded=2)
+        for tenant in ('a', 'b', 'c'):
+            registry.register(tenant, 'Twitter', 1)
+        registry.get('a')
+        registry.get('b')
+        registry.get('a')
+        registry.get('c')
+        assert registry.loaded() == ['a', 'c']
+
+    def test_pinned_and_busy_tenants_are_kept(self):
+        """Test that pinned tenants and busy ones are not evicted."""
+        registry = TenantRegistry(loader, max_loaded=2, busy=lambda value: value.get('busy'))
+        registry.put('default', {'tenant': 'default'}, pinned=True)
+        registry.register('a', 'Twitter', 1)
+        registry.register('b', 'Twitter', 1)
+        registry.register('c', 'Twitter', 1)
+        registry.get('a')['busy'] = True
+        registry.get('b')
+        registry.get('c')
+        assert registry.loaded() == ['default', 'a', 'c']
+
+    def test_register_file(self, tmp_path):
+        """Test that accounts are registered from a JSON file."""
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'tenant': 'acme', 'platform': 'Twitter', 'account_id': 1, 'handle': '@acme'},
+            {'tenant': 'globex', 'platform': 'LinkedIn', 'account_id': 'globex'},
+        ]))
+        registry = TenantRegistry(loader)
+        registry.register_file(path)
+        assert registry.tenants() == ['acme', 'globex']
+
+
+@pytest.fixture
+def client():
+    registry = dashboard.create_registry()
+    registry.register('acme', 'Twitter', 'main')
+    registry.register('acme', 'Twitter', 'support')
+    registry.register('acme', 'TikTok', 'acme')
+    return dashboard.create_app(dashboard.SocialMediaData(), registry).test_client()
+
+
+class TestTenantRoutes:
+    """Tests for the /t/<tenant>/ routes."""
+
+    def test_tenant_data(self, client):
+        """Test that a tenant's endpoints serve that tenant's accounts."""
+        assert list(client.get('/t/acme/api/stats').get_json()) == ['Twitter/main', 'Twitter/support', 'TikTok']
+        data = client.get('/t/acme/api/dashboard').get_json()
+        assert [p['name'] for p in data['analytics']['platforms']] == ['Twitter/main', 'Twitter/support', 'TikTok']
+        assert {post['platform'] for post in data['posts']} <= {'Twitter/main', 'Twitter/support', 'TikTok'}
+
+    def test_default_tenant(self, client):
+        """Test that / and /t/default/ serve the default dataset."""
+        assert client.get('/t/default/api/stats').get_json() == client.get('/api/stats').get_json()
+
+    def test_unknown_tenant(self, client):
+        """Test that an unknown tenant is a JSON 404."""
+        response = client.get('/t/nobody/api/posts')
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'unknown tenant: nobody'}
+
+    def test_tenants_share_the_static_page(self, client):
+        """Test that every tenant gets the same page, which finds its API from the URL."""
+        page = client.get('/t/acme/')
+        assert page.status_code == 200
+        assert page.data == client.get('/').data
+        assert client.get('/t/nobody/').status_code == 404
+
+    def test_tenants_are_cached_separately(self, client):
+        """Test that a change to one tenant does not touch another's responses."""
+        etag = client.get('/t/acme/api/stats').headers['ETag']
+        dashboard_state = client.application.extensions['dashboard']
+        dashboard_state.data.update_account('Twitter', followers=1)
+        assert client.get('/t/acme/api/stats', headers={'If-None-Match': etag}).status_code == 304
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,96 @@
+"""
+Unit tests for the trend computations
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_store import AnalyticsStore
+from trends import compute_trends, forward_fill, rolling_mean, zscores
+
+END = np.datetime64('2024-03-31')
+
+
+def make_store(days=60, platforms=('A', 'B')):
+    store = AnalyticsStore(platforms)
+    rows = []
+    for p, platform in enumerate(platforms):
+        for i in range(days):
+            rows.append({
+                'date': str(END - (days - 1 - i)),
+                'platform': platform,
+                'followers': 1000 * (p + 1) + 10 * i,
+                'engagement': 5.0 + (i % 2),
+                'reach': 100 * (p + 1),
+                'posts': 1,
+            })
+    store.append(rows)
+    return store
+
+
+class TestPrimitives:
+    """Tests for the grid helpers."""
+
+    def test_rolling_mean_skips_gaps(self):
+        """Test that the trailing mean ignores missing days."""
+        grid = np.array([[1.0, np.nan, 3.0, 5.0]])
+        assert rolling_mean(grid, 2).tolist() == [[1.0, 1.0, 3.0, 4.0]]
+
+    def test_forward_fill(self):
+        """Test that gaps take the last seen value and leading gaps stay empty."""
+        filled = forward_fill(np.array([[np.nan, 2.0, np.nan, 4.0, np.nan]]))
+        assert np.array_equal(filled, [[np.nan, 2.0, 2.0, 4.0, 4.0]], equal_nan=True)
+
+    def test_zscores_use_only_previous_days(self):
+        """Test that a spike is scored against the baseline before it."""
+        values = np.tile([4.0, 6.0], 10)
+        values[-1] = 25.0
+        scores = zscores(values[None, :], baseline=8)
+        assert scores[0, -1] == pytest.approx(20.0)
+        assert np.isnan(scores[0, :7]).all()
+
+
+class TestComputeTrends:
+    """Tests for compute_trends."""
+
+    def test_growth(self):
+        """Test day-over-day and week-over-week follower growth for every platform."""
+        trends = compute_trends(make_store(), END)
+        assert trends['followers'].tolist() == [1590, 2590]
+        assert trends['followers_dod'].tolist() == [10, 10]
+        assert trends['followers_wow'].tolist() == [70, 70]
+        assert trends['followers_dod_pct'][0] == pytest.approx(10 / 1580 * 100)
+
+    def test_series_shape_and_values(self):
+        """Test that series cover the last ``days`` days for every platform."""
+        trends = compute_trends(make_store(), END, days=10, window=2)
+        assert str(trends['dates'][-1]) == '2024-03-31'
+        assert trends['engagement_ma'].shape == (2, 10)
+        assert np.allclose(trends['engagement_ma'], 5.5)
+        assert np.allclose(trends['reach_ma'][1], 200)
+
+    def test_anomaly_flags(self):
+        """Test that an engagement spike on the last day is flagged."""
+        store = make_store()
+        store.columns['engagement'][store.tail('B', 1)] = 50.0
+        trends = compute_trends(store, END)
+        assert trends['anomaly'][:, -1].tolist() == [False, True]
+        assert not trends['anomaly'][:, :-1].any()
+
+    def test_missing_history(self):
+        """Test that platforms without data yield NaN instead of failing."""
+        store = make_store(days=3, platforms=('A',))
+        store.code_for('Empty')
+        trends = compute_trends(store, END)
+        assert np.isnan(trends['followers'][1])
+        assert np.isnan(trends['followers_wow'][0])
+        assert trends['followers_dod'][0] == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
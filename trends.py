@@ -0,0 +1,114 @@
+"""
+Trends
+Rolling means, follower growth and engagement anomalies for every platform at once.
+"""
+
+import numpy as np
+
+GROWTH_PERIODS = {'dod': 1, 'wow': 7}
+
+
+def dense_grids(store, columns, start, days):
+    """Scatter columns into ``(platforms, days)`` float grids, NaN where missing."""
+    rows = store.rows_between(start, start + (days - 1))
+    cells = store.codes[rows].astype(np.int64) * days + (store.dates[rows] - start).astype(np.int64)
+    grids = {}
+    for column in columns:
+        grid = np.full(len(store.platforms) * days, np.nan)
+        grid[cells] = store.columns[column][rows]
+        grids[column] = grid.reshape(len(store.platforms), days)
+    return grids
+
+
+def forward_fill(grid):
+    """Carry the last seen value of each row forward over NaN gaps."""
+    valid = ~np.isnan(grid)
+    index = np.where(valid, np.arange(grid.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = grid[np.arange(grid.shape[0])[:, None], index]
+    # Leading gaps have nothing to carry
+    filled[np.maximum.accumulate(valid, axis=1) == 0] = np.nan
+    return filled
+
+
+def _window_sums(values, window, offset):
+    # Prefix sums padded with ``window`` zeros, so every window is a slice
+    n = values.shape[1]
+    sums = np.zeros((values.shape[0], n + window + 1))
+    np.cumsum(values, axis=1, out=sums[:, window + 1:])
+    return sums[:, offset + window:offset + window + n] - sums[:, offset:offset + n]
+
+
+def window_stats(grid, window, include_current=True):
+    """Per-cell count, mean and standard deviation over a trailing window.
+
+    The window for column ``i`` ends at ``i`` (or ``i - 1`` when
+    ``include_current`` is false) and NaN cells are skipped, so all
+    platforms are handled by a handful of cumulative sums.
+    """
+    valid = ~np.isnan(grid)
+    values = np.where(valid, grid, 0.0)
+    offset = 1 if include_current else 0
+    counts = _window_sums(valid.astype(np.float64), window, offset)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = _window_sums(values, window, offset) / counts
+        variance = _window_sums(values * values, window, offset) / counts - means * means
+    return counts, means, np.sqrt(np.maximum(variance, 0.0))
+
+
+def rolling_mean(grid, window):
+    """Trailing mean over ``window`` days, skipping gaps."""
+    return window_stats(grid, window)[1]
+
+
+def zscores(grid, baseline, min_periods=7):
+    """Score each day against the ``baseline`` days before it."""
+    counts, means, stds = window_stats(grid, baseline, include_current=False)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = (grid - means) / stds
+    scores[(counts < min_periods) | (stds == 0)] = np.nan
+    return scores
+
+
+def growth(followers, periods):
+    """Absolute and percent change of the last column over ``periods`` days."""
+    latest = followers[:, -1]
+    previous = followers[:, -1 - periods] if followers.shape[1] > periods else np.full(len(latest), np.nan)
+    change = latest - previous
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent = np.where(previous > 0, change / previous * 100, np.nan)
+    return change, percent
+
+
+def compute_trends(store, end, days=30, window=7, baseline=28, threshold=3.0):
+    """Compute trend series and latest values for every platform in ``store``.
+
+    Returns ``dates`` (the last ``days`` days up to ``end``) and arrays with
+    one row per platform: the ``*_ma`` rolling means and ``engagement_z``
+    z-scores as ``(platforms, days)`` grids, ``anomaly`` flags where
+    ``|z| >= threshold``, and the latest ``followers`` with their day-over-day
+    and week-over-week ``followers_<period>`` and ``followers_<period>_pct``
+    growth.
+    """
+    end = np.datetime64(end, 'D')
+    history = days + max(window, baseline, max(GROWTH_PERIODS.values()))
+    start = end - (history - 1)
+
+    grids = dense_grids(store, ('engagement', 'reach', 'followers'), start, history)
+    engagement = grids['engagement']
+    followers = forward_fill(grids['followers'])
+
+    scores = zscores(engagement, baseline)
+    with np.errstate(invalid='ignore'):
+        anomaly = np.abs(scores) >= threshold
+    trends = {
+        'dates': np.arange(end - (days - 1), end + 1),
+        'engagement_ma': rolling_mean(engagement, window)[:, -days:],
+        'reach_ma': rolling_mean(grids['reach'], window)[:, -days:],
+        'engagement_z': scores[:, -days:],
+        'anomaly': anomaly[:, -days:],
+        'followers': followers[:, -1],
+    }
+    for name, periods in GROWTH_PERIODS.items():
+        trends[f'followers_{name}'], trends[f'followers_{name}_pct'] = growth(followers, periods)
+    return trends